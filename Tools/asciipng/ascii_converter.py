@@ -13,7 +13,7 @@ def convert_to_ascii(image_path, width=100, contrast=1.0, chars=None):
     Convert image to ASCII art
     
     Args:
-        image_path: Path to image file
+        image_path: Path to image file, or an already loaded PIL Image
         width: Width of ASCII output (default: 100)
         contrast: Contrast adjustment (default: 1.0)
         chars: ASCII characters to use (default: dense to light)
@@ -27,7 +27,10 @@ def convert_to_ascii(image_path, width=100, contrast=1.0, chars=None):
     
     try:
         # Open and convert to grayscale
-        image = Image.open(image_path).convert('L')
+        if isinstance(image_path, Image.Image):
+            image = image_path.convert('L')
+        else:
+            image = Image.open(image_path).convert('L')
         
         # Calculate height to maintain aspect ratio
         orig_width, orig_height = image.size
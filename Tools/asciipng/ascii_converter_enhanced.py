@@ -9,6 +9,10 @@ import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 import cv2
 
+# Capture width per ASCII column when grabbing straight from the agent:
+# sharpening and edge detection need some detail beyond the final size
+CAPTURE_OVERSAMPLE = 4
+
 def enhance_image(image, brightness=2.0, contrast=0.95, sharpness=9):
     """Apply enhancements based on provided settings"""
     # Brightness (200% = 2.0)
@@ -45,6 +49,8 @@ def convert_to_ascii_enhanced(image_path, width=141, settings=None):
     """
     Convert image to ASCII with enhanced settings
     
+    image_path may be a file path or an already loaded PIL Image.
+    
     Default settings based on provided configuration:
     - Characters: 141 width
     - Brightness: 200% (2.0)
@@ -66,7 +72,10 @@ def convert_to_ascii_enhanced(image_path, width=141, settings=None):
     
     try:
         # Open and convert to grayscale
-        image = Image.open(image_path).convert('L')
+        if isinstance(image_path, Image.Image):
+            image = image_path.convert('L')
+        else:
+            image = Image.open(image_path).convert('L')
         
         # Apply enhancements
         image = enhance_image(image, 
@@ -15,7 +15,7 @@ from typing import List, Tuple
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from windows_control import WindowsControl
-from ascii_converter_enhanced import convert_to_ascii_enhanced
+from ascii_converter_enhanced import convert_to_ascii_enhanced, CAPTURE_OVERSAMPLE
 from ascii_ui_comprehensive import ComprehensiveUIDetector
 from ascii_diff import compute_ascii_diff, highlight_differences
 
@@ -31,15 +31,19 @@ class ASCIIMonitor:
         
     def take_ascii_screenshot(self) -> Tuple[str, dict]:
         """Take screenshot and convert to ASCII"""
-        # Take screenshot
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"/tmp/monitor_{timestamp}.png"
-        
         try:
-            self.win.screenshot(filename)
+            # Small grayscale frame; after the first poll only changed tiles are sent
+            image, info = self.win.screenshot_delta(target_width=self.width * CAPTURE_OVERSAMPLE,
+                                                    grayscale=True, format='raw')
+            if image is None:
+                return None, {}
+            
+            # Nothing moved: reuse the last conversion and detection
+            if not info['changed_tiles'] and self.previous_ascii is not None:
+                return self.previous_ascii, self.previous_elements
             
             # Convert to ASCII
-            ascii_art = convert_to_ascii_enhanced(filename, self.width)
+            ascii_art = convert_to_ascii_enhanced(image, self.width)
             
             # Detect UI elements if enabled
             elements = {}
@@ -48,9 +52,6 @@ class ASCIIMonitor:
                 ascii_art = result['annotated']
                 elements = result['element_types']
             
-            # Clean up temp file
-            os.remove(filename)
-            
             return ascii_art, elements
             
         except Exception as e:
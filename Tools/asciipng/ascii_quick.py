@@ -13,7 +13,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from windows_control import WindowsControl
-from ascii_converter_enhanced import convert_to_ascii_enhanced
+from ascii_converter_enhanced import convert_to_ascii_enhanced, CAPTURE_OVERSAMPLE
 from ascii_ui_comprehensive import ComprehensiveUIDetector
 
 def take_screenshot(filename=None):
@@ -26,8 +26,13 @@ def take_screenshot(filename=None):
     win.screenshot(filename)
     return filename
 
+def capture_screen_image(width=100):
+    """Grab a grayscale frame sized for the ASCII width straight from the agent"""
+    win = WindowsControl()
+    return win.screenshot_image(target_width=width * CAPTURE_OVERSAMPLE, grayscale=True, format='raw')
+
 def convert_and_detect(image_path, width=100, detect_ui=True, save_output=False):
-    """Convert image to ASCII and optionally detect UI elements"""
+    """Convert image (path or PIL Image) to ASCII and optionally detect UI elements"""
     
     # Convert to ASCII with enhanced settings
     ascii_art = convert_to_ascii_enhanced(image_path, width)
@@ -50,7 +55,10 @@ def convert_and_detect(image_path, width=100, detect_ui=True, save_output=False)
     
     # Save if requested
     if save_output:
-        output_file = image_path.replace('.png', '_ascii.txt')
+        if isinstance(image_path, str):
+            output_file = image_path.replace('.png', '_ascii.txt')
+        else:
+            output_file = f"ascii_screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}_ascii.txt"
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(output)
         print(f"\nSaved to: {output_file}")
@@ -78,8 +86,9 @@ def main():
             image_path = args.image
         else:
             print("Taking screenshot...")
-            image_path = take_screenshot()
-            print(f"Screenshot saved: {image_path}")
+            image_path = capture_screen_image(args.width)
+            if image_path is None:
+                raise RuntimeError("Could not get screenshot")
         
         # Convert and display
         print(f"\nConverting to ASCII (width={args.width})...")
@@ -24,18 +24,18 @@ def ascii_screenshot(width=100, save_original=False):
         # Initialize Windows control
         win = WindowsControl()
         
-        # Take screenshot
-        temp_file = "temp_ascii_screenshot.png"
-        win.screenshot(temp_file)
+        if save_original:
+            # Keep the full-resolution PNG on disk
+            temp_file = "temp_ascii_screenshot.png"
+            win.screenshot(temp_file)
+            return convert_to_ascii(temp_file, width)
         
-        # Convert to ASCII
-        ascii_art = convert_to_ascii(temp_file, width)
+        # Let the agent downscale to the output width and send raw grayscale pixels
+        image = win.screenshot_image(target_width=width, grayscale=True, format='raw')
+        if image is None:
+            return "Error: Could not get screenshot"
         
-        # Clean up unless requested to save
-        if not save_original and os.path.exists(temp_file):
-            os.remove(temp_file)
-        
-        return ascii_art
+        return convert_to_ascii(image, width)
         
     except Exception as e:
         return f"Error: {str(e)}"
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Platform backends for the Windows Agent
+Request handling only reaches the desktop through a DesktopBackend: screen
+capture, mouse and keys, processes, PowerShell, windows, text entry and wait
+probes. Win32Backend drives a real Windows session; the simulated backend in
+sim_backend.py lets the same agent run headless on Linux.
+"""
+
+import importlib
+from abc import ABC, abstractmethod
+
+# name -> (module, class); modules are imported only when selected
+BACKENDS = {
+    'win32': ('desktop_backend', 'Win32Backend'),
+    'sim': ('sim_backend', 'SimBackend')
+}
+
+class ProcessNotFound(LookupError):
+    """No process with that PID"""
+
+class ProcessAccessDenied(PermissionError):
+    """Not allowed to signal that process"""
+
+class DesktopBackend(ABC):
+    """Desktop operations used by the agent's handlers
+
+    Subclasses also set the parts the agent wires into its helpers:
+    window_provider (WindowProvider), text_injector (TextInjector),
+    wait_probes (WaitProbes) and powershell (a PowerShellPool or anything
+    with execute, warm, snapshot and close). The operations below are
+    abstract, so a backend missing one fails when load_backend builds it.
+    """
+
+    name = None
+    window_provider = None
+    text_injector = None
+    wait_probes = None
+    powershell = None
+
+    @abstractmethod
+    def grab(self, box=None):
+        """Screen region (left, top, right, bottom), or the whole screen, as a PIL image"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def move_mouse(self, x, y, duration):
+        """Move the pointer to (x, y) over `duration` seconds"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def click(self, x, y, button, clicks):
+        """Click at (x, y), or where the pointer is when x or y is None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def press(self, key):
+        """Press and release one key"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def hotkey(self, keys):
+        """Hold keys down in order, then release them in reverse"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def processes(self):
+        """Running processes as dicts with pid, name, cpu_percent and memory_percent"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def kill_process(self, pid, force=False):
+        """Terminate (or kill) a process; raises ProcessNotFound or ProcessAccessDenied"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def run_powershell_once(self, command, timeout):
+        """Run a command in a fresh PowerShell process
+
+        Returns a dict with stdout, stderr, returncode, host ('spawned')
+        and elapsed_ms; raises subprocess.TimeoutExpired or TimeoutError
+        once timeout seconds pass.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        if self.powershell is not None:
+            self.powershell.close()
+
+class Win32Backend(DesktopBackend):
+    """DesktopBackend for a real Windows session (pyautogui, ImageGrab, psutil, pywin32)"""
+
+    name = 'win32'
+
+    def __init__(self, powershell_pool_size=2, powershell_max_commands=200):
+        import psutil
+        import pyautogui
+        from PIL import ImageGrab
+        from powershell_host import PowerShellPool, run_powershell_once
+        from text_input import Win32TextInjector
+        from waits import DesktopWaitProbes
+        from window_registry import Win32WindowProvider
+
+        # Disable pyautogui failsafe for better control
+        pyautogui.FAILSAFE = False
+        self.psutil = psutil
+        self.pyautogui = pyautogui
+        self.image_grab = ImageGrab
+        self._run_powershell_once = run_powershell_once
+
+        self.powershell = PowerShellPool(size=powershell_pool_size, max_commands=powershell_max_commands)
+        self.window_provider = Win32WindowProvider()
+        self.text_injector = Win32TextInjector()
+        self.wait_probes = DesktopWaitProbes(self.window_provider)
+
+    def grab(self, box=None):
+        return self.image_grab.grab(bbox=box) if box else self.image_grab.grab()
+
+    def move_mouse(self, x, y, duration):
+        self.pyautogui.moveTo(x, y, duration=duration)
+
+    def click(self, x, y, button, clicks):
+        if x is not None and y is not None:
+            self.pyautogui.click(x, y, button=button, clicks=clicks)
+        else:
+            self.pyautogui.click(button=button, clicks=clicks)
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+    def hotkey(self, keys):
+        self.pyautogui.hotkey(*keys)
+
+    def processes(self):
+        psutil = self.psutil
+        processes = []
+        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
+            try:
+                processes.append(proc.info)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return processes
+
+    def kill_process(self, pid, force=False):
+        psutil = self.psutil
+        try:
+            proc = psutil.Process(pid)
+            if force:
+                proc.kill()
+            else:
+                proc.terminate()
+
+            # Wait a bit for process to die
+            try:
+                proc.wait(timeout=3)
+            except psutil.TimeoutExpired:
+                pass
+        except psutil.NoSuchProcess:
+            raise ProcessNotFound(pid)
+        except psutil.AccessDenied:
+            raise ProcessAccessDenied(pid)
+
+    def run_powershell_once(self, command, timeout):
+        return self._run_powershell_once(command, timeout)
+
+def load_backend(name, **options):
+    """Instantiate a backend by name ('win32' or 'sim')"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}' (expected one of {', '.join(BACKENDS)})")
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)(**options)
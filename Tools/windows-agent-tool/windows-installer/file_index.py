@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+File name index for the Windows Agent
+Keeps the names under a few configured roots in memory so "where is X.exe"
+is a lookup instead of a recursive directory walk. Each directory is stored
+with the modification time it had when scanned; a refresh stats every known
+directory and rescans only those whose time moved (an entry was added,
+removed or renamed in it). Searches run over one newline-joined string of
+lowercased names, so a glob or substring query is a single regex or find
+pass in C, whatever the number of files.
+"""
+
+import bisect
+import os
+import re
+import threading
+import time
+
+# Where "Discord.exe" and game executables usually live
+DEFAULT_ROOTS = (
+    '%LOCALAPPDATA%',
+    '%APPDATA%\\Microsoft\\Windows\\Start Menu',
+    '%ProgramData%\\Microsoft\\Windows\\Start Menu',
+    '%ProgramFiles%',
+    '%ProgramFiles(x86)%'
+)
+DEFAULT_LIMIT = 100
+SEARCH_MODES = ('auto', 'glob', 'substring')
+
+class IndexNotReady(Exception):
+    """The first build of the index hasn't finished"""
+
+def glob_to_regex(pattern):
+    """Regex matching whole lines of the name blob that fit a glob (* ? [...])"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '*':
+            out.append('[^\n]*')
+        elif c == '?':
+            out.append('[^\n]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', ']') else i + 1)
+            if end == -1:
+                out.append('\\[')
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile('^' + ''.join(out) + '$', re.MULTILINE)
+
+class DirectoryNode:
+    __slots__ = ('mtime', 'files', 'dirs')
+
+    def __init__(self, mtime, files, dirs):
+        self.mtime = mtime
+        self.files = files
+        self.dirs = dirs
+
+class Snapshot:
+    """Search view of the index: lowercased names joined by newlines plus where each came from"""
+
+    def __init__(self, directories):
+        names = []
+        entries = []
+        for path, node in directories.items():
+            for name in node.files:
+                names.append(name)
+                entries.append((path, name, False))
+            for name in node.dirs:
+                names.append(name)
+                entries.append((path, name, True))
+        # Lowercase per name: some characters grow ('İ' is two code points
+        # lowercased), so offsets must come from the lowered names
+        lowered = [name.lower() for name in names]
+        self.blob = '\n'.join(lowered)
+        self.starts = []
+        offset = 0
+        for name in lowered:
+            self.starts.append(offset)
+            offset += len(name) + 1
+        self.entries = entries
+
+    def entry_at(self, offset):
+        return self.entries[bisect.bisect_right(self.starts, offset) - 1]
+
+    def glob(self, regex):
+        for match in regex.finditer(self.blob):
+            yield self.entry_at(match.start())
+
+    def substring(self, text):
+        blob = self.blob
+        seen = -1
+        position = blob.find(text)
+        while position != -1:
+            index = bisect.bisect_right(self.starts, position) - 1
+            if index != seen:
+                seen = index
+                yield self.entries[index]
+            # Carry on from the next name
+            following = self.starts[index + 1] if index + 1 < len(self.starts) else len(blob)
+            position = blob.find(text, following)
+
+class FileIndex:
+    """In-memory index of file and directory names under a set of roots"""
+
+    def __init__(self, roots=()):
+        self.roots = []
+        self._directories = {}
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {'refreshes': 0, 'last_refresh_ms': None, 'last_scanned': 0, 'last_reused': 0,
+                      'errors': 0, 'refreshed_at': None}
+        self.set_roots(roots)
+
+    def set_roots(self, roots):
+        """Use these roots (~ and %VAR% expanded, missing ones dropped); takes effect on the next refresh"""
+        resolved = []
+        for root in roots:
+            path = os.path.abspath(os.path.expandvars(os.path.expanduser(root)))
+            if os.path.isdir(path) and path not in resolved:
+                resolved.append(path)
+        with self._lock:
+            self.roots = resolved
+        return resolved
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    def _scan(self, path):
+        dirs = []
+        files = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False) and not getattr(entry, 'is_junction', bool)():
+                        dirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    files.append(entry.name)
+        return dirs, files
+
+    def refresh(self, full=False):
+        """Bring the index up to date; only directories whose mtime changed are read again"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            previous = self._directories
+            directories = {}
+            scanned = reused = errors = 0
+            pending = list(self.roots)
+            while pending:
+                path = pending.pop()
+                if path in directories:
+                    continue
+                try:
+                    mtime = os.stat(path).st_mtime
+                    node = previous.get(path)
+                    if full or node is None or node.mtime != mtime:
+                        dirs, files = self._scan(path)
+                        node = DirectoryNode(mtime, files, dirs)
+                        scanned += 1
+                    else:
+                        reused += 1
+                except OSError:
+                    errors += 1
+                    continue
+                directories[path] = node
+                pending.extend(os.path.join(path, name) for name in node.dirs)
+
+            changed = scanned or directories.keys() != previous.keys() or self._snapshot is None
+            snapshot = Snapshot(directories) if changed else self._snapshot
+            with self._lock:
+                self._directories = directories
+                self._snapshot = snapshot
+            self.stats.update({
+                'refreshes': self.stats['refreshes'] + 1,
+                'last_refresh_ms': round((time.perf_counter() - start) * 1000, 2),
+                'last_scanned': scanned,
+                'last_reused': reused,
+                'errors': errors,
+                'refreshed_at': time.time()
+            })
+            return dict(self.stats)
+
+    def search(self, query, mode='auto', under=None, entry_type='all', limit=DEFAULT_LIMIT):
+        """Entries whose name matches query (a glob, or a substring; case-insensitive)
+
+        under keeps only paths inside that directory. Matches are stat'ed
+        as they are returned, so size and modified are current and entries
+        deleted since the last refresh are left out. Returns (matches,
+        total matching names, whether the list was cut at limit).
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise IndexNotReady('The file index is still being built')
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SEARCH_MODES)}")
+        query = query.lower()
+        if not query or '\n' in query:
+            raise ValueError('query must be a non-empty name pattern')
+        if mode == 'glob' or mode == 'auto' and any(c in query for c in '*?['):
+            candidates = snapshot.glob(glob_to_regex(query))
+        else:
+            candidates = snapshot.substring(query)
+
+        prefix = None
+        if under:
+            prefix = os.path.normcase(os.path.abspath(os.path.expandvars(os.path.expanduser(under))))
+            prefix = prefix.rstrip(os.sep) + os.sep
+
+        matches = []
+        total = 0
+        for directory, name, is_dir in candidates:
+            if entry_type == 'file' and is_dir or entry_type == 'dir' and not is_dir:
+                continue
+            if prefix and not (os.path.normcase(directory) + os.sep).startswith(prefix):
+                continue
+            total += 1
+            if len(matches) >= limit:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                total -= 1
+                continue
+            matches.append({'name': name, 'path': path, 'is_dir': is_dir,
+                            'size': stat.st_size, 'modified': stat.st_mtime})
+        return matches, total, total > len(matches)
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            'roots': list(self.roots),
+            'ready': snapshot is not None,
+            'directories': len(self._directories),
+            'entries': len(snapshot.entries) if snapshot else 0,
+            **self.stats
+        }
+
+    def start(self, interval):
+        """Build now and refresh every interval seconds, in a background thread"""
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"File index refresh failed: {e}")
+                if interval <= 0 or self._stop.wait(interval):
+                    return
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
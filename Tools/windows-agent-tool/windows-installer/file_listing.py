@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Directory listings for the Windows Agent
+One os.scandir pass per directory (on Windows the type, size and times come
+with the directory read, so no per-entry stat), optional recursion with a
+depth limit, filters applied before anything is serialized, and resumable
+cursors: entries come out depth-first with siblings sorted by name, so a
+listing can restart after any path without rescanning what came before it
+"""
+
+import base64
+import fnmatch
+import json
+import os
+
+ENTRY_TYPES = ('all', 'file', 'dir')
+
+def encode_cursor(parts):
+    return base64.urlsafe_b64encode(json.dumps(parts).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Path components of the last entry a previous page returned"""
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(parts, list) or not all(isinstance(part, str) for part in parts):
+        raise ValueError('Invalid cursor')
+    return tuple(parts)
+
+class ListingFilter:
+    """Which entries a listing returns (directories are walked either way)
+
+    pattern is a glob matched against the name, or against the path
+    relative to the listed directory when it contains a slash; extensions
+    are matched without case; sizes are bytes; times are epoch seconds.
+    """
+
+    def __init__(self, pattern=None, extensions=None, min_size=None, max_size=None,
+                 modified_after=None, modified_before=None, entry_type='all'):
+        if entry_type not in ENTRY_TYPES:
+            raise ValueError(f"type must be one of {', '.join(ENTRY_TYPES)}")
+        self.pattern = pattern.replace('\\', '/') if pattern else None
+        self.extensions = tuple('.' + ext.lower().lstrip('.') for ext in extensions or ()) or None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = modified_after
+        self.modified_before = modified_before
+        self.entry_type = entry_type
+        self.needs_stat = any(v is not None for v in (min_size, max_size, modified_after, modified_before))
+
+    @classmethod
+    def from_request(cls, data):
+        extensions = data.get('extensions')
+        if isinstance(extensions, str):
+            extensions = [ext for ext in extensions.split(',') if ext]
+        number = lambda key: float(data[key]) if data.get(key) is not None else None
+        return cls(pattern=data.get('pattern'), extensions=extensions,
+                   min_size=number('min_size'), max_size=number('max_size'),
+                   modified_after=number('modified_after'), modified_before=number('modified_before'),
+                   entry_type=data.get('type', 'all'))
+
+    def matches(self, name, rel, is_dir, stat):
+        if self.entry_type == 'file' and is_dir or self.entry_type == 'dir' and not is_dir:
+            return False
+        if self.pattern and not fnmatch.fnmatch(rel if '/' in self.pattern else name, self.pattern):
+            return False
+        if self.extensions and (is_dir or not name.lower().endswith(self.extensions)):
+            return False
+        if stat is None:
+            return True
+        if self.min_size is not None and stat.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stat.st_size > self.max_size:
+            return False
+        if self.modified_after is not None and stat.st_mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and stat.st_mtime > self.modified_before:
+            return False
+        return True
+
+class Listing:
+    """One listing of root: iterate for entry dicts; counters fill in as it goes"""
+
+    def __init__(self, root, recursive=False, max_depth=None, listing_filter=None, cursor=None, limit=None):
+        self.root = root
+        # Depth 0 is the entries of root itself
+        self.max_depth = (max_depth if max_depth is not None else float('inf')) if recursive else 0
+        self.filter = listing_filter or ListingFilter()
+        self.after = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+        self.count = 0
+        self.scanned = 0
+        self.errors = 0
+        self.next_cursor = None
+
+    def _entries(self, path, parts, depth):
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            self.errors += 1
+            return
+        after = self.after
+        for entry in entries:
+            key = parts + (entry.name,)
+            # Whole subtrees sorted before the cursor were returned already
+            inside_cursor = after is not None and after[:len(key)] == key
+            if after is not None and key <= after and not inside_cursor:
+                continue
+            self.scanned += 1
+            try:
+                is_dir = entry.is_dir()
+                descend = is_dir and depth < self.max_depth and not entry.is_symlink() and \
+                    not getattr(entry, 'is_junction', bool)()
+            except OSError:
+                self.errors += 1
+                continue
+            if after is None or key > after:
+                yield entry, key, is_dir
+            if descend:
+                yield from self._entries(entry.path, key, depth + 1)
+
+    def __iter__(self):
+        check = self.filter
+        last = None
+        for entry, key, is_dir in self._entries(self.root, (), 0):
+            rel = '/'.join(key)
+            if not check.needs_stat and not check.matches(entry.name, rel, is_dir, None):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                self.errors += 1
+                continue
+            if check.needs_stat and not check.matches(entry.name, rel, is_dir, stat):
+                continue
+            if self.limit is not None and self.count >= self.limit:
+                # There is more: the next page starts after the last entry sent
+                self.next_cursor = encode_cursor(list(last))
+                return
+            self.count += 1
+            last = key
+            yield {
+                'name': entry.name,
+                'path': entry.path,
+                'rel': rel,
+                'is_dir': is_dir,
+                'size': stat.st_size,
+                'modified': stat.st_mtime
+            }
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Block signatures and patches for delta file sync
+The agent describes each file it already has as per-block checksums (an
+rsync-style rolling weak checksum plus a short blake2b), the client answers
+with a patch of block copies and new bytes, and the agent rebuilds the file
+from its old copy and the patch, checking the result before it replaces it
+"""
+
+import hashlib
+import os
+import struct
+from itertools import accumulate
+
+# Patch records: 'C' first block, block count | 'L' length, bytes
+OP_COPY = b'C'
+OP_LITERAL = b'L'
+OP_HEADER = struct.Struct('>II')
+LENGTH = struct.Struct('>I')
+
+MIN_BLOCK = 512
+MAX_BLOCK = 64 * 1024
+# Modification times closer than this count as equal in the quick check
+MTIME_TOLERANCE = 0.001
+# Rebuilt files are written here and moved over the target once verified
+SYNC_SUFFIX = '.sync'
+READ_CHUNK = 1024 * 1024
+
+class PatchMismatch(ValueError):
+    """The rebuilt file doesn't have the size or digest the client expected"""
+
+def block_size_for(size):
+    """About sqrt(size) bytes per block, a multiple of 128 between MIN_BLOCK and MAX_BLOCK"""
+    block = (int(size ** 0.5) + 127) & ~127
+    return max(MIN_BLOCK, min(MAX_BLOCK, block))
+
+def weak_checksum(block):
+    """rsync's checksum: a = sum of bytes, b = sum of running sums, both mod 2^16"""
+    return (sum(block) & 0xffff) | (sum(accumulate(block)) & 0xffff) << 16
+
+def strong_checksum(block):
+    return hashlib.blake2b(block, digest_size=8).hexdigest()
+
+def new_digest():
+    """Whole-file digest (client and agent must agree on it)"""
+    return hashlib.blake2b(digest_size=32)
+
+def file_signature(path, block_size=None):
+    """size, mtime, block_size, digest and weak/strong checksums per block of a file"""
+    stat = os.stat(path)
+    block_size = block_size or block_size_for(stat.st_size)
+    digest = new_digest()
+    weak = []
+    strong = []
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+            weak.append(weak_checksum(block))
+            strong.append(strong_checksum(block))
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'block_size': block_size,
+        'digest': digest.hexdigest(),
+        'weak': weak,
+        'strong': strong
+    }
+
+def resolve(root, rel):
+    """Path of a '/'-separated relative path under root; refuses to leave root"""
+    parts = [part for part in rel.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or os.path.isabs(rel) or ':' in parts[0]:
+        raise ValueError(f'Invalid relative path: {rel}')
+    return os.path.join(root, *parts)
+
+def signatures(root, files, checksum=False):
+    """What the agent has for each relative path the client offers
+
+    files maps rel -> {'size', 'mtime'}. Each answer is 'missing', 'same'
+    (size and mtime match, unless checksum is set) or a file_signature.
+    """
+    result = {}
+    for rel, local in files.items():
+        path = resolve(root, rel)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            result[rel] = 'missing'
+            continue
+        if not os.path.isfile(path):
+            raise ValueError(f'Not a file: {rel}')
+        if not checksum and stat.st_size == local.get('size') and \
+                abs(stat.st_mtime - local.get('mtime', -1)) < MTIME_TOLERANCE:
+            result[rel] = 'same'
+        else:
+            result[rel] = file_signature(path)
+    return result
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    while len(data) < n:
+        more = stream.read(n - len(data))
+        if not more:
+            raise ValueError('Patch ended early')
+        data += more
+    return data
+
+def _patch_blocks(stream, base_path, block_size):
+    """Rebuilt content from a patch stream, in pieces"""
+    base = open(base_path, 'rb') if base_path and os.path.exists(base_path) else None
+    try:
+        while True:
+            op = stream.read(1)
+            if not op:
+                return
+            if op == OP_COPY:
+                first, count = OP_HEADER.unpack(_read_exact(stream, OP_HEADER.size))
+                if base is None:
+                    raise ValueError('Patch copies blocks but there is no existing file')
+                base.seek(first * block_size)
+                remaining = count * block_size
+                while remaining:
+                    data = base.read(min(remaining, READ_CHUNK))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    yield data
+            elif op == OP_LITERAL:
+                remaining = LENGTH.unpack(_read_exact(stream, LENGTH.size))[0]
+                while remaining:
+                    data = stream.read(min(remaining, READ_CHUNK))
+                    if not data:
+                        raise ValueError('Patch ended early')
+                    remaining -= len(data)
+                    yield data
+            else:
+                raise ValueError(f'Unknown patch record {op!r}')
+    finally:
+        if base:
+            base.close()
+
+def _whole_body(stream):
+    while True:
+        data = stream.read(READ_CHUNK)
+        if not data:
+            return
+        yield data
+
+def apply_patch(path, stream, size, digest, mtime=None, block_size=None, whole=False):
+    """Rebuild path from its current content and a patch read from stream
+
+    With whole=True the stream is the complete new content instead. The
+    result must have the given size and digest, otherwise PatchMismatch is
+    raised and path is left as it was; on success mtime is applied.
+    """
+    partial = path + SYNC_SUFFIX
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    pieces = _whole_body(stream) if whole else _patch_blocks(stream, path, block_size)
+    written = 0
+    hasher = new_digest()
+    try:
+        with open(partial, 'wb') as f:
+            for data in pieces:
+                f.write(data)
+                hasher.update(data)
+                written += len(data)
+        if written != size or hasher.hexdigest() != digest:
+            raise PatchMismatch(f'Rebuilt {written} bytes, digest {hasher.hexdigest()[:16]}; '
+                                f'expected {size} bytes, digest {digest[:16]}')
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return written
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tile-based frame deltas for the Windows Agent
+Remembers tile hashes of the last frame sent to each client session and
+reports only the tiles that changed since then
+"""
+
+import hashlib
+import json
+import struct
+import threading
+from collections import OrderedDict
+
+DEFAULT_TILE_SIZE = 64
+MAX_SESSIONS = 16
+
+def tile_boxes(width, height, tile_size):
+    """(left, top, right, bottom) boxes covering the frame row by row"""
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+def tile_hashes(img, boxes):
+    """Short content hash for every tile box"""
+    return [hashlib.blake2b(img.crop(box).tobytes(), digest_size=8).digest() for box in boxes]
+
+class DeltaSessions:
+    """Per-session tile hashes of the last frame each client reconstructed
+
+    Each frame gets an increasing id. A client sends the id of the frame it
+    holds (base); if that is not the frame stored for its session (first
+    call, lost response, size/mode change) it gets a full keyframe.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def diff(self, session, base, img, tile_size=DEFAULT_TILE_SIZE):
+        """Return (keyframe, frame_id, changed boxes) for a new frame"""
+        boxes = tile_boxes(img.width, img.height, tile_size)
+        layout = (img.size, img.mode, tile_size)
+        # One pass over the whole frame settles the common idle case
+        digest = hashlib.blake2b(img.tobytes(), digest_size=16).digest()
+
+        with self._lock:
+            previous = self._sessions.pop(session, None)
+            frame_id = self._next_id
+            self._next_id += 1
+
+        usable = previous is not None and previous['id'] == base and previous['layout'] == layout
+        if usable and previous['digest'] == digest:
+            hashes = previous['hashes']
+            changed = []
+        else:
+            hashes = tile_hashes(img, boxes)
+            if usable:
+                changed = [box for box, old, new in zip(boxes, previous['hashes'], hashes) if old != new]
+            else:
+                changed = boxes
+
+        with self._lock:
+            self._sessions[session] = {'id': frame_id, 'layout': layout, 'digest': digest, 'hashes': hashes}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        return not usable, frame_id, changed
+
+    def drop(self, session):
+        """Forget a session's frame"""
+        with self._lock:
+            self._sessions.pop(session, None)
+
+def pack_delta(meta, payloads):
+    """Frame a delta response: 4-byte header length, JSON header, tile payloads"""
+    header = json.dumps(meta).encode('utf-8')
+    return b''.join([struct.pack('>I', len(header)), header] + payloads)
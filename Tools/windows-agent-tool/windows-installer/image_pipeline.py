@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Screenshot image pipeline for the Windows Agent
+Downscale, grayscale and encode captured frames before they leave the agent
+"""
+
+import hashlib
+import json
+import math
+from io import BytesIO
+
+from PIL import Image
+
+# format name -> (PIL format, MIME type); 'raw' ships the pixel buffer as-is
+IMAGE_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+    'raw': (None, 'application/octet-stream')
+}
+
+def target_size(width, height, data):
+    """Output size from target_width/target_height/max_pixels options
+
+    A single target dimension keeps the aspect ratio; max_pixels only ever
+    shrinks the frame.
+    """
+    target_width = data.get('target_width')
+    target_height = data.get('target_height')
+    max_pixels = data.get('max_pixels')
+
+    if target_width and target_height:
+        return int(target_width), int(target_height)
+    if target_width:
+        target_width = int(target_width)
+        return target_width, max(1, round(height * target_width / width))
+    if target_height:
+        target_height = int(target_height)
+        return max(1, round(width * target_height / height)), target_height
+    if max_pixels and width * height > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+        return max(1, int(width * scale)), max(1, int(height * scale))
+    return width, height
+
+def transform_image(img, data):
+    """Apply grayscale and resize options to a captured frame"""
+    if data.get('grayscale') and img.mode != 'L':
+        img = img.convert('L')
+
+    size = target_size(img.width, img.height, data)
+    if size != img.size:
+        # BOX is a fast, alias-free filter for the large downscales used here
+        img = img.resize(size, Image.Resampling.BOX)
+    return img
+
+def encode_image(img, data=None):
+    """Encode a frame; returns (bytes, format name, MIME type)"""
+    data = data or {}
+    fmt = str(data.get('format', 'png')).lower()
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f'Unsupported format: {fmt}')
+    pil_format, mimetype = IMAGE_FORMATS[fmt]
+
+    if pil_format is None:
+        return img.tobytes(), fmt, mimetype
+
+    options = {}
+    if pil_format == 'PNG':
+        options['compress_level'] = int(data.get('compress_level', 6))
+    else:
+        options['quality'] = int(data.get('quality', 85))
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue(), fmt, mimetype
+
+def frame_etag(img, data=None):
+    """Content hash of a processed frame plus the options that shape its encoding"""
+    data = data or {}
+    encoding = {key: data.get(key) for key in ('format', 'quality', 'compress_level')}
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{img.mode}:{img.width}x{img.height}:'.encode('utf-8'))
+    digest.update(json.dumps(encoding, sort_keys=True).encode('utf-8'))
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+def image_headers(img, source_size, fmt):
+    """Metadata headers describing an encoded frame"""
+    return {
+        'X-Image-Width': str(img.width),
+        'X-Image-Height': str(img.height),
+        'X-Image-Mode': img.mode,
+        'X-Image-Format': fmt,
+        'X-Source-Width': str(source_size[0]),
+        'X-Source-Height': str(source_size[1])
+    }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Request metrics for the Windows Agent
+Per-route counters and latency histograms plus per-stage timings (capture,
+encode, spawn, ...) rendered as Prometheus text or JSON
+"""
+
+import bisect
+import threading
+import time
+
+# Histogram upper bounds in seconds; +Inf is implicit
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram (not thread-safe; Metrics holds the lock)"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self):
+        """Count plus mean, max and estimated percentiles in ms"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+class Metrics:
+    """Process-wide metrics store; observe calls are a lock plus a bisect"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}   # (route, method) -> Histogram
+        self._codes = {}      # (route, method, code) -> count
+        self._errors = {}     # (route, method) -> count of 5xx replies
+        self._stages = {}     # (operation, stage) -> Histogram
+        self.started = time.time()
+
+    def observe_request(self, route, method, code, seconds):
+        key = (route, method)
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+            code_key = (route, method, code)
+            self._codes[code_key] = self._codes.get(code_key, 0) + 1
+            if code >= 500:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def observe_stage(self, operation, stage, seconds):
+        key = (operation, stage)
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = Histogram()
+            histogram.observe(seconds)
+
+    def to_json(self, gauges=None):
+        """Routes and stages as nested dicts with percentile summaries
+
+        gauges: {name: (help text, [(labels dict, value), ...])}, sampled by the caller.
+        """
+        with self._lock:
+            routes = {}
+            for (route, method), histogram in self._requests.items():
+                entry = histogram.summary()
+                entry['errors'] = self._errors.get((route, method), 0)
+                entry['codes'] = {str(code): n for (r, m, code), n in self._codes.items()
+                                  if r == route and m == method}
+                routes[f'{method} {route}'] = entry
+
+            stages = {}
+            for (operation, stage), histogram in self._stages.items():
+                stages.setdefault(operation, {})[stage] = histogram.summary()
+
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'routes': routes,
+            'stages': stages,
+            'gauges': {name: [dict(labels, value=value) for labels, value in samples]
+                       for name, (_, samples) in (gauges or {}).items()}
+        }
+
+    def to_prometheus(self, gauges=None):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def histogram_lines(name, labels, histogram):
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), histogram.counts):
+                cumulative += n
+                le = bound if bound == '+Inf' else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        with self._lock:
+            lines.append('# HELP agent_requests_total Requests handled, by route, method and status code')
+            lines.append('# TYPE agent_requests_total counter')
+            for (route, method, code), n in sorted(self._codes.items()):
+                lines.append(f'agent_requests_total{{route="{route}",method="{method}",code="{code}"}} {n}')
+
+            lines.append('# HELP agent_request_errors_total Requests answered with a 5xx status')
+            lines.append('# TYPE agent_request_errors_total counter')
+            for (route, method), n in sorted(self._errors.items()):
+                lines.append(f'agent_request_errors_total{{route="{route}",method="{method}"}} {n}')
+
+            lines.append('# HELP agent_request_duration_seconds Time spent handling a request')
+            lines.append('# TYPE agent_request_duration_seconds histogram')
+            for (route, method), histogram in sorted(self._requests.items()):
+                histogram_lines('agent_request_duration_seconds', f'route="{route}",method="{method}"', histogram)
+
+            lines.append('# HELP agent_stage_duration_seconds Time spent in one stage of an operation')
+            lines.append('# TYPE agent_stage_duration_seconds histogram')
+            for (operation, stage), histogram in sorted(self._stages.items()):
+                histogram_lines('agent_stage_duration_seconds', f'operation="{operation}",stage="{stage}"', histogram)
+
+        for name, (help_text, samples) in sorted((gauges or {}).items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+        lines.append('# HELP agent_uptime_seconds Seconds since the agent started')
+        lines.append('# TYPE agent_uptime_seconds gauge')
+        lines.append(f'agent_uptime_seconds {time.time() - self.started:.1f}')
+        return '\n'.join(lines) + '\n'
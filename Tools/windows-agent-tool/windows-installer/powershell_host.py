@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Persistent PowerShell hosts for the Windows Agent
+Keeps long-lived powershell.exe workers fed over stdin/stdout so commands
+skip the interpreter start-up cost of a fresh process per call
+"""
+
+import base64
+import json
+import queue
+import secrets
+import subprocess
+import threading
+import time
+
+# Worker loop run inside each host. It announces itself with READY_LINE,
+# then takes one request per line: a token and base64 (UTF-8) of the
+# command. The reply is one line, REPLY_MARKER + token + compact JSON with
+# stdout, stderr and returncode; anything else on stdout (a native exe
+# writing to the inherited handle, a host banner) is skipped by the reader.
+# Commands run in a runspace of their own with every stream captured (*>&1)
+# and [Console]::Out redirected, so `exit` ends the command rather than the
+# host. The streams are split the way a fresh powershell.exe -Command
+# writes them: output, Write-Host and console writes to stdout; errors,
+# warnings, verbose and debug (with their WARNING:/VERBOSE:/DEBUG: prefix)
+# to stderr. Output is formatted at 120 columns, the default console width.
+READY_LINE = '#ps-ready'
+REPLY_MARKER = '#ps-reply '
+
+HOST_SCRIPT = r'''
+$utf8 = New-Object System.Text.UTF8Encoding $false
+[Console]::OutputEncoding = $utf8
+$stdin = New-Object System.IO.StreamReader ([Console]::OpenStandardInput()), $utf8
+$replies = [Console]::Out
+$home0 = (Get-Location).Path
+$wrapper = 'param($command, $dir) $global:LASTEXITCODE = 0; $Error.Clear(); Set-Location -LiteralPath $dir; & ([scriptblock]::Create($command)) *>&1'
+$runspace = $null
+$replies.WriteLine('#ps-ready')
+$replies.Flush()
+while ($true) {
+    $line = $stdin.ReadLine()
+    if ($line -eq $null) { break }
+    $token, $payload = $line.Split(' ', 2)
+    $command = $utf8.GetString([Convert]::FromBase64String($payload))
+    if ($runspace -eq $null -or $runspace.RunspaceStateInfo.State -ne 'Opened') {
+        $runspace = [runspacefactory]::CreateRunspace()
+        $runspace.Open()
+    }
+    $console = New-Object System.IO.StringWriter
+    [Console]::SetOut($console)
+    $ps = [powershell]::Create()
+    $ps.Runspace = $runspace
+    $stdout = ''
+    $stderr = ''
+    $rc = 0
+    try {
+        $records = @($ps.AddScript($wrapper).AddArgument($command).AddArgument($home0).Invoke())
+        $outs = New-Object System.Collections.ArrayList
+        $errs = New-Object System.Text.StringBuilder
+        $failed = $false
+        foreach ($record in $records) {
+            if ($record -is [System.Management.Automation.ErrorRecord]) {
+                $failed = $true
+                [void]$errs.Append(($record | Out-String -Width 120))
+            } elseif ($record -is [System.Management.Automation.WarningRecord]) {
+                [void]$errs.AppendLine('WARNING: ' + $record.Message)
+            } elseif ($record -is [System.Management.Automation.VerboseRecord]) {
+                [void]$errs.AppendLine('VERBOSE: ' + $record.Message)
+            } elseif ($record -is [System.Management.Automation.DebugRecord]) {
+                [void]$errs.AppendLine('DEBUG: ' + $record.Message)
+            } elseif ($record -is [System.Management.Automation.InformationRecord]) {
+                # Write-Host is shown; Write-Information stays hidden as it is by default
+                if ($record.Tags -contains 'PSHOST') { [void]$outs.Add([string]$record.MessageData) }
+            } else {
+                [void]$outs.Add($record)
+            }
+        }
+        $stdout = $console.ToString() + ($outs | Out-String -Width 120)
+        $stderr = $errs.ToString()
+        $code = $runspace.SessionStateProxy.GetVariable('LASTEXITCODE')
+        if ($code) { $rc = $code } elseif ($failed) { $rc = 1 }
+    } catch {
+        $stdout = $console.ToString()
+        $stderr = ($_ | Out-String -Width 120)
+        $rc = 1
+    } finally {
+        [Console]::SetOut($replies)
+        $ps.Dispose()
+    }
+    $reply = @{ stdout = [string]$stdout; stderr = [string]$stderr; returncode = [int]$rc }
+    $replies.WriteLine('#ps-reply ' + $token + ' ' + ($reply | ConvertTo-Json -Compress))
+    $replies.Flush()
+}
+'''
+
+def _encoded_command(script):
+    return base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+
+# Command lines for a pooled host and for the one-process-per-command path
+HOST_ARGS = [
+    'powershell.exe', '-NoLogo', '-NoProfile', '-NonInteractive',
+    '-ExecutionPolicy', 'Bypass', '-EncodedCommand', _encoded_command(HOST_SCRIPT)
+]
+ONCE_ARGS = ['powershell.exe', '-ExecutionPolicy', 'Bypass', '-NoProfile', '-Command']
+
+class PowerShellHostError(Exception):
+    """The host process died or replied with something unreadable"""
+
+def run_powershell_once(command, timeout=30, once_args=None):
+    """Run a command in a fresh PowerShell process (the original spawn-per-call path)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        list(once_args or ONCE_ARGS) + [command],
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+    return {
+        'stdout': result.stdout,
+        'stderr': result.stderr,
+        'returncode': result.returncode,
+        'host': 'spawned',
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+class PowerShellWorker:
+    """One long-lived PowerShell host process"""
+
+    def __init__(self, host_args=None, startup_timeout=30):
+        start = time.perf_counter()
+        self.process = subprocess.Popen(
+            list(host_args or HOST_ARGS),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding='utf-8',
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        self.commands = 0
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+        # Wait for the ready line so start-up cost is measured here, not in the first command
+        try:
+            self._wait_for(lambda line: line.rstrip('\r\n') == READY_LINE, startup_timeout)
+        except (TimeoutError, PowerShellHostError):
+            self.kill()
+            raise PowerShellHostError('PowerShell host failed to start')
+        self.spawn_ms = (time.perf_counter() - start) * 1000
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def _read_replies(self):
+        # Readline can't time out on a pipe, so a thread feeds a queue instead
+        for line in self.process.stdout:
+            self._replies.put(line)
+        self._replies.put(None)
+
+    def _wait_for(self, wanted, timeout):
+        """First line that wanted() accepts; every line before it is console noise"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._replies.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError('Command timed out')
+            if line is None:
+                raise PowerShellHostError('PowerShell host exited during command')
+            if wanted(line):
+                return line
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, command, timeout):
+        """Send one command and wait for its reply; raises TimeoutError or PowerShellHostError"""
+        token = secrets.token_hex(8)
+        payload = base64.b64encode(command.encode('utf-8')).decode('ascii')
+        try:
+            self.process.stdin.write(f'{token} {payload}\n')
+            self.process.stdin.flush()
+        except OSError as e:
+            raise PowerShellHostError(f'PowerShell host is gone: {e}')
+
+        # Replies to earlier commands carry other tokens and are skipped too
+        prefix = f'{REPLY_MARKER}{token} '
+        line = self._wait_for(lambda line: line.startswith(prefix), timeout)
+        self.commands += 1
+        try:
+            reply = json.loads(line[len(prefix):])
+        except ValueError:
+            raise PowerShellHostError(f'Malformed reply from PowerShell host: {line[:200]!r}')
+        return reply
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def kill(self):
+        self.process.kill()
+
+class PowerShellPool:
+    """Pool of PowerShell hosts with per-command timeouts and recycling
+
+    Workers are started on demand up to `size`. A worker is replaced after
+    `max_commands` commands, after a timeout (it is killed mid-command) and
+    after any host error, so one bad command never poisons later ones.
+    """
+
+    def __init__(self, size=2, max_commands=200, host_args=None):
+        self.size = size
+        self.max_commands = max_commands
+        self.host_args = host_args
+        self._idle = []
+        self._lock = threading.Lock()
+        # Signalled whenever a worker goes idle or a slot frees up
+        self._changed = threading.Condition(self._lock)
+        self._workers = 0
+        self._closed = False
+        self.stats = {'commands': 0, 'spawned': 0, 'recycled': 0, 'timeouts': 0, 'host_errors': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _acquire(self, timeout):
+        """Take an idle worker, start a new one if below size, or wait for either"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                if self._closed:
+                    raise PowerShellHostError('PowerShell pool is closed')
+                if self._idle:
+                    return self._idle.pop()
+                if self._workers < self.size:
+                    self._workers += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError('No PowerShell host available')
+                self._changed.wait(remaining)
+
+        try:
+            worker = PowerShellWorker(self.host_args)
+        except Exception:
+            self._free_slot()
+            raise
+        self._count('spawned')
+        return worker
+
+    def _free_slot(self):
+        with self._changed:
+            self._workers -= 1
+            self._changed.notify()
+
+    def _discard(self, worker, kill=False):
+        if kill:
+            worker.kill()
+        else:
+            worker.close()
+        self._free_slot()
+
+    def _release(self, worker):
+        if self._closed or not worker.alive():
+            self._discard(worker)
+        elif worker.commands >= self.max_commands:
+            self._count('recycled')
+            self._discard(worker)
+        else:
+            with self._changed:
+                self._idle.append(worker)
+                self._changed.notify()
+
+    def execute(self, command, timeout=30):
+        """Run a command on a pooled host; returns stdout, stderr, returncode and timings"""
+        start = time.perf_counter()
+        worker = self._acquire(timeout)
+        acquired = time.perf_counter()
+        spawn_ms = worker.spawn_ms if worker.commands == 0 else 0.0
+
+        try:
+            reply = worker.run(command, timeout)
+        except TimeoutError:
+            self._count('timeouts')
+            self._discard(worker, kill=True)
+            raise
+        except PowerShellHostError:
+            self._count('host_errors')
+            self._discard(worker, kill=True)
+            raise
+        self._count('commands')
+        self._release(worker)
+
+        end = time.perf_counter()
+        reply.update({
+            'host': 'pooled',
+            'worker_pid': worker.pid,
+            'spawn_ms': round(spawn_ms, 2),
+            'wait_ms': round((acquired - start) * 1000, 2),
+            'exec_ms': round((end - acquired) * 1000, 2),
+            'elapsed_ms': round((end - start) * 1000, 2)
+        })
+        return reply
+
+    def warm(self):
+        """Start hosts up front so early commands don't pay start-up"""
+        workers = []
+        try:
+            while len(workers) < self.size:
+                with self._lock:
+                    if self._workers >= self.size:
+                        break
+                    self._workers += 1
+                try:
+                    workers.append(PowerShellWorker(self.host_args))
+                except Exception:
+                    self._free_slot()
+                    raise
+                self._count('spawned')
+        finally:
+            with self._changed:
+                self._idle.extend(workers)
+                self._changed.notify_all()
+
+    def snapshot(self):
+        """Pool counters plus current worker counts"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['workers'] = self._workers
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        stats['max_commands'] = self.max_commands
+        return stats
+
+    def close(self):
+        """Stop all idle workers; busy ones stop when released"""
+        with self._changed:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._changed.notify_all()
+        for worker in idle:
+            self._discard(worker)
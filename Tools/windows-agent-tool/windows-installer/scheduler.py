@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Request scheduler for the Windows Agent
+Input-affecting requests run one at a time in priority order; read-only
+requests, long waits and writes (PowerShell, file writes, uploads, sync
+patches, deletes, kills) each run in parallel up to a bounded number of
+slots
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Lower runs sooner; requests may override the default with X-Agent-Priority
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+DEFAULT_MAX_WAIT = 30.0
+WAIT_SAMPLES = 1024
+
+class SchedulerBusy(Exception):
+    """A request waited longer than the lane's max_wait for a slot"""
+
+class Lane:
+    """Priority-ordered admission to a fixed number of execution slots
+
+    Requests run on their own (server) threads; a lane only decides when
+    each may start. Within one priority, requests start in arrival order.
+    """
+
+    def __init__(self, name, slots=1, max_wait=DEFAULT_MAX_WAIT):
+        self.name = name
+        self.slots = slots
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.stats = {'completed': 0, 'rejected': 0, 'max_depth': 0, 'max_wait_ms': 0.0}
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_NORMAL):
+        """Hold one execution slot; yields the time spent queued in ms"""
+        ticket = (priority, next(self._seq))
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.max_wait
+
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self._waiting))
+            while self._waiting[0] != ticket or self._active >= self.slots:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self.stats['rejected'] += 1
+                    self._cond.notify_all()
+                    raise SchedulerBusy(f'{self.name} queue busy for {self.max_wait:.0f}s')
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            self._active += 1
+            wait_ms = (time.perf_counter() - start) * 1000
+            self._waits.append(wait_ms)
+            self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], wait_ms)
+            # The next ticket may fit in a free slot too
+            self._cond.notify_all()
+
+        try:
+            yield wait_ms
+        finally:
+            with self._cond:
+                self._active -= 1
+                self.stats['completed'] += 1
+                self._cond.notify_all()
+
+    def snapshot(self):
+        """Depth, active slots and queue-wait percentiles"""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['depth'] = len(self._waiting)
+            stats['active'] = self._active
+            waits = sorted(self._waits)
+        stats['slots'] = self.slots
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 2)
+        if waits:
+            stats['wait_ms'] = {
+                'p50': round(waits[len(waits) // 2], 2),
+                'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2),
+                'mean': round(sum(waits) / len(waits), 2)
+            }
+        else:
+            stats['wait_ms'] = {'p50': 0.0, 'p95': 0.0, 'mean': 0.0}
+        return stats
+
+class Scheduler:
+    """The agent's lanes: one serialized input lane, a pool of read slots, a
+    separate pool for long-blocking /wait requests so they can't starve reads,
+    and a pool for requests that change state on disk or run commands"""
+
+    def __init__(self, read_slots=4, wait_slots=4, write_slots=4, max_wait=DEFAULT_MAX_WAIT):
+        self.lanes = {
+            'input': Lane('input', slots=1, max_wait=max_wait),
+            'read': Lane('read', slots=read_slots, max_wait=max_wait),
+            'wait': Lane('wait', slots=wait_slots, max_wait=max_wait),
+            'write': Lane('write', slots=write_slots, max_wait=max_wait)
+        }
+
+    def slot(self, lane, priority=PRIORITY_NORMAL):
+        return self.lanes[lane].slot(priority)
+
+    def snapshot(self):
+        return {name: lane.snapshot() for name, lane in self.lanes.items()}
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+Simulated desktop backend for the Windows Agent
+A virtual framebuffer with scripted windows and content, a fake process
+table and a fake PowerShell, so the agent's request handling, scheduling
+and serialization run (and can be load-tested) on Linux without a display:
+
+    CLAUDE_AGENT_BACKEND=sim python windows_agent.py
+
+CLAUDE_AGENT_SIM_SCRIPT names a JSON desktop script (see SimDesktop.load)
+and CLAUDE_AGENT_SIM_LATENCY a JSON object of per-operation delays in
+seconds (see LATENCY_KEYS); without one every operation runs at
+in-memory speed.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from PIL import Image, ImageDraw
+
+from desktop_backend import DesktopBackend, ProcessNotFound, ProcessAccessDenied
+from text_input import TextInjector
+from waits import WaitProbes
+from window_registry import WindowProvider
+
+# Operations that can be given a simulated cost
+LATENCY_KEYS = ('capture', 'input', 'windows', 'window_action', 'processes',
+                'powershell', 'powershell_spawn')
+
+DEFAULT_SIZE = (1920, 1080)
+TASKBAR_HEIGHT = 40
+TITLE_HEIGHT = 24
+LINE_HEIGHT = 14
+BACKGROUND = (0, 90, 158)
+TASKBAR = (32, 32, 32)
+
+# Shown when no script is given
+DEFAULT_SCRIPT = {
+    'windows': [
+        {'title': 'Steam', 'process': 'steam.exe', 'rect': [80, 60, 1100, 700], 'color': [23, 29, 37],
+         'text': 'STORE  LIBRARY  COMMUNITY\nDownloads: 2 items queued'},
+        {'title': 'Discord', 'process': 'Discord.exe', 'rect': [400, 200, 1000, 640], 'color': [54, 57, 63],
+         'text': '#general\nready when you are'},
+        {'title': 'Untitled - Notepad', 'process': 'notepad.exe', 'rect': [700, 380, 760, 480],
+         'color': [255, 255, 255]},
+        {'title': 'Spotify', 'process': 'Spotify.exe', 'rect': [200, 500, 900, 420], 'color': [18, 18, 18],
+         'text': 'Now playing'}
+    ],
+    'processes': ['svchost.exe', 'svchost.exe', 'dwm.exe', 'RuntimeBroker.exe']
+}
+
+class SimDesktop:
+    """Windows, processes, pointer and clipboard of the simulated session
+
+    Everything is mutable from scripts and benchmarks (open_window,
+    exit_process, paint, ...); the frame is re-rendered only after a change.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = tuple(size)
+        self.lock = threading.RLock()
+        self.windows = {}        # hwnd -> window dict, top of the Z-order first
+        self.processes = {}      # pid -> process dict
+        self.overlays = []       # (box, colour) painted over everything
+        self.mouse = (0, 0)
+        self.focused = None
+        self.clipboard = None
+        self.keys = []           # keys and hotkeys pressed, most recent last
+        self._next_hwnd = 0x10010
+        self._next_pid = 1000
+        self._frame = None
+        self.spawn_process('System', protected=True, pid=4)
+        self.spawn_process('explorer.exe')
+
+    def _changed(self):
+        self._frame = None
+
+    # Script
+
+    def load(self, script):
+        """Set up from a script dict:
+
+        {"size": [1920, 1080],
+         "windows": [{"title": "Steam", "process": "steam.exe", "rect": [x, y, width, height],
+                      "color": [r, g, b], "text": "line 1\\nline 2", "state": "normal"}],
+         "processes": ["svchost.exe"]}
+        Windows are listed top of the Z-order first.
+        """
+        with self.lock:
+            if script.get('size'):
+                self.size = tuple(script['size'])
+            for name in script.get('processes', []):
+                self.spawn_process(name)
+            for spec in reversed(script.get('windows', [])):
+                self.open_window(spec['title'], process=spec.get('process'), rect=spec.get('rect'),
+                                 color=spec.get('color'), text=spec.get('text', ''),
+                                 state=spec.get('state', 'normal'), visible=spec.get('visible', True))
+            self._changed()
+
+    # Processes
+
+    def spawn_process(self, name, protected=False, pid=None):
+        with self.lock:
+            if pid is None:
+                pid = self._next_pid
+                self._next_pid += 4
+            self.processes[pid] = {
+                'pid': pid,
+                'name': name,
+                'protected': protected,
+                # Stable, plausible figures so listings look like a real table
+                'cpu_percent': round((pid * 7919 % 1000) / 100, 1),
+                'memory_percent': round((pid * 104729 % 500) / 100, 2)
+            }
+            return pid
+
+    def exit_process(self, pid):
+        """End a process and close its windows; False if there was none"""
+        with self.lock:
+            if self.processes.pop(pid, None) is None:
+                return False
+            for hwnd in [h for h, w in self.windows.items() if w['pid'] == pid]:
+                self.close_window(hwnd)
+            return True
+
+    def find_processes(self, name):
+        name = name.lower()
+        names = {name, name + '.exe'}
+        with self.lock:
+            return [pid for pid, proc in self.processes.items() if proc['name'].lower() in names]
+
+    # Windows
+
+    def open_window(self, title, process=None, pid=None, rect=None, color=None, text='',
+                    state='normal', visible=True):
+        """Open a window on top of the Z-order (and its process, unless pid is given)"""
+        with self.lock:
+            if pid is None:
+                pid = self.spawn_process(process or title.split(' - ')[-1].replace(' ', '') + '.exe')
+            hwnd = self._next_hwnd
+            self._next_hwnd += 4
+            count = len(self.windows)
+            x, y, width, height = rect or (100 + 30 * (count % 10), 80 + 30 * (count % 10), 800, 600)
+            window = {
+                'hwnd': hwnd,
+                'title': title,
+                'pid': pid,
+                'visible': visible,
+                'state': state,
+                'rect': (x, y, x + width, y + height),
+                'color': tuple(color or (240, 240, 240)),
+                'text': text
+            }
+            self.windows = {hwnd: window, **self.windows}
+            if visible and state != 'minimized':
+                self.focused = hwnd
+            self._changed()
+            return hwnd
+
+    def close_window(self, hwnd):
+        with self.lock:
+            if self.windows.pop(hwnd, None) is None:
+                return False
+            if self.focused == hwnd:
+                self.focused = next((h for h, w in self.windows.items()
+                                     if w['visible'] and w['state'] != 'minimized'), None)
+            self._changed()
+            return True
+
+    def rename(self, hwnd, title):
+        with self.lock:
+            self.windows[hwnd]['title'] = title
+            self._changed()
+
+    def set_text(self, hwnd, text):
+        with self.lock:
+            self.windows[hwnd]['text'] = text
+            self._changed()
+
+    def raise_window(self, hwnd):
+        with self.lock:
+            window = self.windows.pop(hwnd)
+            self.windows = {hwnd: window, **self.windows}
+            self.focused = hwnd
+            self._changed()
+
+    def set_state(self, hwnd, state):
+        with self.lock:
+            self.windows[hwnd]['state'] = state
+            if state == 'minimized':
+                if self.focused == hwnd:
+                    self.focused = None
+                self._changed()
+            else:
+                self.raise_window(hwnd)
+
+    def window_at(self, x, y):
+        """Topmost visible window under a point"""
+        with self.lock:
+            for hwnd, window in self.windows.items():
+                if not window['visible'] or window['state'] == 'minimized':
+                    continue
+                left, top, right, bottom = self.window_rect(window)
+                if left <= x < right and top <= y < bottom:
+                    return hwnd
+        return None
+
+    def window_rect(self, window):
+        if window['state'] == 'maximized':
+            return (0, 0, self.size[0], self.size[1] - TASKBAR_HEIGHT)
+        return window['rect']
+
+    # Screen
+
+    def paint(self, box, color):
+        """Fill (left, top, right, bottom) with a colour above all windows"""
+        with self.lock:
+            self.overlays.append((tuple(box), tuple(color)))
+            self._changed()
+
+    def clear_paint(self):
+        with self.lock:
+            self.overlays = []
+            self._changed()
+
+    def _render(self):
+        image = Image.new('RGB', self.size, BACKGROUND)
+        draw = ImageDraw.Draw(image)
+        width, height = self.size
+        draw.rectangle((0, height - TASKBAR_HEIGHT, width, height), fill=TASKBAR)
+
+        # Bottom of the Z-order first so the top window ends up drawn last
+        for window in reversed(list(self.windows.values())):
+            if not window['visible'] or window['state'] == 'minimized':
+                continue
+            left, top, right, bottom = self.window_rect(window)
+            active = window['hwnd'] == self.focused
+            draw.rectangle((left, top, right - 1, bottom - 1), fill=window['color'], outline=(90, 90, 90))
+            draw.rectangle((left, top, right - 1, top + TITLE_HEIGHT),
+                           fill=(0, 120, 215) if active else (200, 200, 200))
+            draw.text((left + 8, top + 6), window['title'], fill=(255, 255, 255) if active else (0, 0, 0))
+            ink = (0, 0, 0) if sum(window['color']) > 382 else (230, 230, 230)
+            for i, line in enumerate(window['text'].split('\n')):
+                y = top + TITLE_HEIGHT + 8 + i * LINE_HEIGHT
+                if y + LINE_HEIGHT > bottom:
+                    break
+                draw.text((left + 8, y), line, fill=ink)
+
+        for box, color in self.overlays:
+            draw.rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=color)
+        return image
+
+    def frame(self):
+        """Current framebuffer (shared; callers must not modify it)"""
+        with self.lock:
+            if self._frame is None:
+                self._frame = self._render()
+            return self._frame
+
+    # Input
+
+    def type_text(self, text):
+        """Append text to the focused window's content"""
+        with self.lock:
+            if self.focused in self.windows:
+                window = self.windows[self.focused]
+                window['text'] += text.replace('\r\n', '\n').replace('\r', '\n')
+                self._changed()
+
+    def press(self, key):
+        with self.lock:
+            self.keys.append(key)
+            key = key.lower()
+            if key in ('enter', 'return'):
+                self.type_text('\n')
+            elif key == 'tab':
+                self.type_text('\t')
+            elif key == 'backspace' and self.focused in self.windows:
+                window = self.windows[self.focused]
+                window['text'] = window['text'][:-1]
+                self._changed()
+            elif len(key) == 1:
+                self.type_text(key)
+
+    def hotkey(self, keys):
+        keys = [k.lower() for k in keys]
+        with self.lock:
+            self.keys.append('+'.join(keys))
+            if keys == ['ctrl', 'v'] and self.clipboard:
+                self.type_text(self.clipboard)
+            elif keys == ['alt', 'f4'] and self.focused is not None:
+                self.close_window(self.focused)
+
+    def click(self, x, y):
+        with self.lock:
+            self.mouse = (x, y)
+            hwnd = self.window_at(x, y)
+            if hwnd is not None and hwnd != self.focused:
+                self.raise_window(hwnd)
+
+class SimWindowProvider(WindowProvider):
+    """WindowProvider over the simulated desktop"""
+
+    def __init__(self, desktop, backend):
+        self.desktop = desktop
+        self.backend = backend
+
+    def enumerate(self):
+        self.backend.delay('windows')
+        with self.desktop.lock:
+            return [{'hwnd': w['hwnd'], 'title': w['title'], 'pid': w['pid'], 'visible': w['visible']}
+                    for w in self.desktop.windows.values()]
+
+    def title(self, hwnd):
+        window = self.desktop.windows.get(hwnd)
+        return window['title'] if window else None
+
+    def describe(self, hwnd):
+        with self.desktop.lock:
+            window = self.desktop.windows[hwnd]
+            left, top, right, bottom = self.desktop.window_rect(window)
+            state = window['state']
+        return {
+            'rect': {
+                'left': left,
+                'top': top,
+                'right': right,
+                'bottom': bottom,
+                'width': right - left,
+                'height': bottom - top
+            },
+            'state': state
+        }
+
+    def show(self, hwnd, action):
+        self.backend.delay('window_action')
+        desktop = self.desktop
+        with desktop.lock:
+            window = desktop.windows[hwnd]
+            if action == 'focus':
+                if window['state'] == 'minimized':
+                    window['state'] = 'normal'
+                desktop.raise_window(hwnd)
+            else:
+                desktop.set_state(hwnd, {'maximize': 'maximized', 'minimize': 'minimized',
+                                         'restore': 'normal'}[action])
+
+class SimTextInjector(TextInjector):
+    """TextInjector that types into the simulated desktop's focused window"""
+
+    def __init__(self, desktop, backend):
+        self.desktop = desktop
+        self.backend = backend
+
+    def type_keys(self, text, interval):
+        for char in text:
+            self.backend.delay('input')
+            self.desktop.type_text(char)
+            time.sleep(interval)
+
+    def send_unicode(self, text):
+        self.backend.delay('input')
+        self.desktop.type_text(text)
+
+    def get_clipboard(self):
+        return self.desktop.clipboard
+
+    def set_clipboard(self, text):
+        self.desktop.clipboard = text
+
+    def paste(self):
+        self.backend.delay('input')
+        self.desktop.hotkey(['ctrl', 'v'])
+
+class SimWaitProbes(WaitProbes):
+    """WaitProbes over the simulated desktop"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def grab(self, box):
+        return self.backend.grab(box)
+
+    def windows(self):
+        return self.backend.window_provider.enumerate()
+
+    def window_state(self, hwnd):
+        window = self.backend.desktop.windows.get(hwnd)
+        return window['state'] if window else None
+
+    def processes(self):
+        with self.backend.desktop.lock:
+            return [(pid, proc['name'].lower()) for pid, proc in self.backend.desktop.processes.items()]
+
+class SimPowerShell:
+    """Stand-in for PowerShellPool: a handful of cmdlets acting on the simulated desktop
+
+    Understands Start-Process, Stop-Process, Get-Process, Start-Sleep,
+    Get-Date, Write-Output/echo, Write-Error and exit; statements can be
+    joined with ';'. Anything else fails like an unknown command would.
+    The first command on each of `size` hosts pays the powershell_spawn delay.
+    """
+
+    def __init__(self, desktop, backend, size=2, max_commands=200):
+        self.desktop = desktop
+        self.backend = backend
+        self.size = size
+        self.max_commands = max_commands
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._warm = 0
+        self._busy = 0
+        self.stats = {'commands': 0, 'spawned': 0, 'recycled': 0, 'timeouts': 0, 'host_errors': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _statement(self, statement, deadline):
+        """(stdout, stderr, returncode, exit) for one statement"""
+        words = statement.split()
+        verb = words[0].lower()
+        args = [w.strip('"\'') for w in words[1:]]
+
+        if verb == 'start-sleep':
+            value = float(next(a for a in args if not a.startswith('-')))
+            seconds = value / 1000 if '-milliseconds' in (a.lower() for a in args) else value
+            if time.perf_counter() + seconds > deadline:
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+                raise TimeoutError('Command timed out')
+            time.sleep(seconds)
+            return '', '', 0, False
+        if verb == 'start-process':
+            target = next((a for a in args if not a.startswith('-')), '')
+            # steam://open/games -> steam, C:\\Windows\\notepad.exe -> notepad
+            name = target.split(':', 1)[0] if '://' in target else re.split(r'[\\/]', target)[-1]
+            stem = os.path.splitext(name)[0] or 'app'
+            self.desktop.open_window(stem.capitalize(), process=stem + '.exe')
+            return '', '', 0, False
+        if verb == 'stop-process':
+            lowered = [a.lower() for a in args]
+            if '-id' in lowered:
+                pids = [int(args[lowered.index('-id') + 1])]
+            elif '-name' in lowered:
+                pids = self.desktop.find_processes(args[lowered.index('-name') + 1])
+            else:
+                pids = []
+            quiet = 'silentlycontinue' in lowered
+            if not pids and not quiet:
+                return '', 'Stop-Process : Cannot find a process with the given name or id.\n', 1, False
+            for pid in pids:
+                self.desktop.exit_process(pid)
+            return '', '', 0, False
+        if verb == 'get-process':
+            with self.desktop.lock:
+                rows = sorted(self.desktop.processes.values(), key=lambda p: p['name'].lower())
+            lines = ['   Id ProcessName', '   -- -----------']
+            lines += [f"{p['pid']:5} {os.path.splitext(p['name'])[0]}" for p in rows]
+            return '\n'.join(lines) + '\n', '', 0, False
+        if verb == 'get-date':
+            return datetime.now().strftime('%A, %B %d, %Y %I:%M:%S %p') + '\n', '', 0, False
+        if verb in ('write-output', 'echo', 'write-host'):
+            return ' '.join(args) + '\n', '', 0, False
+        if verb == 'write-error':
+            return '', ' '.join(args) + '\n', 1, False
+        if verb == 'exit':
+            return '', '', int(args[0]) if args else 0, True
+        return '', (f"{words[0]} : The term '{words[0]}' is not recognized as the name of a cmdlet, "
+                    f"function, script file, or operable program.\n"), 1, False
+
+    def run(self, command, timeout):
+        """(stdout, stderr, returncode) for a command line"""
+        deadline = time.perf_counter() + timeout
+        self.backend.delay('powershell')
+        stdout, stderr, rc = [], [], 0
+        for statement in (s.strip() for s in command.split(';')):
+            if not statement:
+                continue
+            out, err, rc, stop = self._statement(statement, deadline)
+            stdout.append(out)
+            stderr.append(err)
+            if stop:
+                break
+        return ''.join(stdout), ''.join(stderr), rc
+
+    def execute(self, command, timeout=30):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError('No PowerShell host available')
+        acquired = time.perf_counter()
+        try:
+            with self._lock:
+                self._busy += 1
+                spawn = self._warm < self.size
+                if spawn:
+                    self._warm += 1
+                    self.stats['spawned'] += 1
+            spawn_ms = 0.0
+            if spawn:
+                self.backend.delay('powershell_spawn')
+                spawn_ms = (time.perf_counter() - acquired) * 1000
+            try:
+                stdout, stderr, rc = self.run(command, timeout)
+            except TimeoutError:
+                self._count('timeouts')
+                with self._lock:
+                    self._warm -= 1
+                raise
+            self._count('commands')
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._slots.release()
+
+        end = time.perf_counter()
+        return {
+            'stdout': stdout,
+            'stderr': stderr,
+            'returncode': rc,
+            'host': 'pooled',
+            'worker_pid': os.getpid(),
+            'spawn_ms': round(spawn_ms, 2),
+            'wait_ms': round((acquired - start) * 1000, 2),
+            'exec_ms': round((end - acquired) * 1000, 2),
+            'elapsed_ms': round((end - start) * 1000, 2)
+        }
+
+    def run_once(self, command, timeout):
+        start = time.perf_counter()
+        self.backend.delay('powershell_spawn')
+        stdout, stderr, rc = self.run(command, timeout)
+        return {
+            'stdout': stdout,
+            'stderr': stderr,
+            'returncode': rc,
+            'host': 'spawned',
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def warm(self):
+        with self._lock:
+            while self._warm < self.size:
+                self._warm += 1
+                self.stats['spawned'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['workers'] = self._warm
+            stats['idle'] = self._warm - self._busy
+        stats['size'] = self.size
+        stats['max_commands'] = self.max_commands
+        return stats
+
+    def close(self):
+        pass
+
+class SimBackend(DesktopBackend):
+    """DesktopBackend over a SimDesktop; scriptable and display-free"""
+
+    name = 'sim'
+
+    def __init__(self, powershell_pool_size=2, powershell_max_commands=200, script=None, latency=None):
+        """
+        Args:
+            script: Desktop script dict (default: $CLAUDE_AGENT_SIM_SCRIPT, else DEFAULT_SCRIPT)
+            latency: Seconds per operation (default: $CLAUDE_AGENT_SIM_LATENCY, else none)
+        """
+        if script is None:
+            path = os.environ.get('CLAUDE_AGENT_SIM_SCRIPT')
+            if path:
+                with open(path) as f:
+                    script = json.load(f)
+            else:
+                script = DEFAULT_SCRIPT
+        if latency is None:
+            latency = json.loads(os.environ.get('CLAUDE_AGENT_SIM_LATENCY') or '{}')
+        unknown = set(latency) - set(LATENCY_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown latency keys: {', '.join(sorted(unknown))} "
+                             f"(expected {', '.join(LATENCY_KEYS)})")
+        self.latency = latency
+
+        self.desktop = SimDesktop()
+        self.desktop.load(script)
+        self.powershell = SimPowerShell(self.desktop, self, powershell_pool_size, powershell_max_commands)
+        self.window_provider = SimWindowProvider(self.desktop, self)
+        self.text_injector = SimTextInjector(self.desktop, self)
+        self.wait_probes = SimWaitProbes(self)
+
+    def delay(self, operation):
+        seconds = self.latency.get(operation)
+        if seconds:
+            time.sleep(seconds)
+
+    def grab(self, box=None):
+        self.delay('capture')
+        frame = self.desktop.frame()
+        if box:
+            return frame.crop(box)
+        return frame.copy()
+
+    def move_mouse(self, x, y, duration):
+        self.delay('input')
+        # Simulated pointers don't need to travel
+        self.desktop.mouse = (x, y)
+
+    def click(self, x, y, button, clicks):
+        self.delay('input')
+        if x is None or y is None:
+            x, y = self.desktop.mouse
+        self.desktop.click(x, y)
+
+    def press(self, key):
+        self.delay('input')
+        self.desktop.press(key)
+
+    def hotkey(self, keys):
+        self.delay('input')
+        self.desktop.hotkey(keys)
+
+    def processes(self):
+        self.delay('processes')
+        with self.desktop.lock:
+            return [{'pid': p['pid'], 'name': p['name'], 'cpu_percent': p['cpu_percent'],
+                     'memory_percent': p['memory_percent']} for p in self.desktop.processes.values()]
+
+    def kill_process(self, pid, force=False):
+        with self.desktop.lock:
+            process = self.desktop.processes.get(pid)
+            if process is None:
+                raise ProcessNotFound(pid)
+            if process['protected']:
+                raise ProcessAccessDenied(pid)
+            self.desktop.exit_process(pid)
+
+    def run_powershell_once(self, command, timeout):
+        return self.powershell.run_once(command, timeout)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Template matching for the Windows Agent
+Finds small registered images (icons, buttons) on screen with coarse-to-fine
+normalized cross-correlation: a full search on a downscaled pyramid level,
+then refinement of the best candidates at each finer level. Pure numpy and
+Pillow, so it runs against saved screenshots anywhere:
+
+    python template_match.py screenshot.png template.png [threshold]
+"""
+
+import base64
+import sys
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_MATCHES = 5
+MAX_LEVELS = 4
+# Coarsest level still has to leave the template this many pixels per side
+MIN_TEMPLATE_SIDE = 16
+# A level is only used if, scaled back up, it still correlates this well with
+# the full template; fine text drops below and is searched at full resolution
+MIN_DETAIL_KEPT = 0.75
+# Candidates carried from the coarse search into refinement, per wanted match
+CANDIDATES_PER_MATCH = 8
+# Coarse scores run well below full-resolution ones (detail is blurred away),
+# so candidates are the best peaks above this fraction of the threshold
+COARSE_FLOOR = 0.5
+# Search radius (pixels at the finer level) around each upscaled candidate
+REFINE_RADIUS = 2
+MAX_TEMPLATES = 64
+MAX_TEMPLATE_PIXELS = 512 * 512
+
+class TemplateError(ValueError):
+    """A template that can't be matched (flat, too large, larger than the search area)"""
+
+def to_gray(image):
+    """float32 luminance array of a PIL image"""
+    return np.asarray(image.convert('L'), dtype=np.float32)
+
+def downscale(gray):
+    """Half-size array: [1, 2, 1] blur on both axes, then every other pixel
+
+    The blur keeps scores stable when a template sits at an odd offset from
+    the screen's sampling grid; plain 2x2 averaging loses text-heavy
+    templates at coarse levels.
+    """
+    height, width = gray.shape
+    padded = np.pad(gray, 1, mode='edge')
+    # Only the kept columns and rows are ever computed
+    cols = (padded[:, 0:width:2] + 2 * padded[:, 1:width + 1:2] + padded[:, 2:width + 2:2]) * 0.25
+    return (cols[0:height:2] + 2 * cols[1:height + 1:2] + cols[2:height + 2:2]) * 0.25
+
+def pyramid(gray, levels):
+    """[full, half, quarter, ...] with `levels` extra levels"""
+    result = [gray]
+    for _ in range(levels):
+        result.append(downscale(result[-1]))
+    return result
+
+def detail_kept(full, coarse):
+    """Correlation between a template and a coarse level scaled back up to it"""
+    factor = full.shape[0] // coarse.shape[0]
+    upscaled = np.kron(coarse, np.ones((factor, factor), dtype=np.float32))
+    upscaled = np.pad(upscaled, [(0, max(0, n - u)) for n, u in zip(full.shape, upscaled.shape)], mode='edge')
+    a = full - full.mean()
+    b = upscaled[:full.shape[0], :full.shape[1]]
+    b = b - b.mean()
+    norm = np.sqrt((a * a).sum() * (b * b).sum())
+    return float((a * b).sum() / norm) if norm else 0.0
+
+def template_pyramid(gray):
+    """Pyramid of a template, as deep as it stays large and detailed enough"""
+    levels = [gray]
+    while len(levels) <= MAX_LEVELS and min(gray.shape) // 2 ** len(levels) >= MIN_TEMPLATE_SIDE:
+        coarse = downscale(levels[-1])
+        if detail_kept(gray, coarse) < MIN_DETAIL_KEPT:
+            break
+        levels.append(coarse)
+    return levels
+
+def _fast_len(n):
+    """Smallest 2^a * 3^b * 5^c >= n; FFTs of these sizes are several times faster"""
+    best = 1 << (n - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+def _window_sums(values, height, width):
+    """Sum over every height x width window, via an integral image"""
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+def ncc_map(image, template):
+    """Zero-mean normalized cross-correlation at every placement (FFT numerator)
+
+    Returns an (H - h + 1, W - w + 1) array of scores in [-1, 1]; windows
+    with no contrast score 0.
+    """
+    h, w = template.shape
+    if h > image.shape[0] or w > image.shape[1]:
+        raise TemplateError('Template is larger than the search area')
+    t = template.astype(np.float64) - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+    if t_norm == 0:
+        raise TemplateError('Template has no contrast')
+
+    # Correlation = convolution with the flipped template
+    shape = (_fast_len(image.shape[0] + h - 1), _fast_len(image.shape[1] + w - 1))
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(t[::-1, ::-1], shape)
+    numerator = np.fft.irfft2(spectrum, shape)[h - 1:image.shape[0], w - 1:image.shape[1]]
+
+    n = h * w
+    sums = _window_sums(image, h, w)
+    sq_sums = _window_sums(image.astype(np.float64) ** 2, h, w)
+    variance = np.maximum(sq_sums - sums * sums / n, 0)
+    denominator = np.sqrt(variance) * t_norm
+    scores = np.zeros_like(numerator)
+    # Flat windows would divide by ~0; leave them at 0
+    np.divide(numerator, denominator, out=scores, where=denominator > 1e-6 * t_norm * np.sqrt(n))
+    return np.clip(scores, -1.0, 1.0)
+
+def ncc_region(image, template, top, left, bottom, right):
+    """NCC scores for placements with top <= y < bottom and left <= x < right (direct)"""
+    h, w = template.shape
+    top, left = max(0, top), max(0, left)
+    bottom = min(bottom, image.shape[0] - h + 1)
+    right = min(right, image.shape[1] - w + 1)
+    if bottom <= top or right <= left:
+        return top, left, np.zeros((0, 0))
+
+    t = template.astype(np.float64) - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+    patch = image[top:bottom + h - 1, left:right + w - 1].astype(np.float64)
+    windows = sliding_window_view(patch, (h, w))
+    means = windows.mean(axis=(2, 3), keepdims=True)
+    centered = windows - means
+    numerator = np.einsum('ijkl,kl->ij', centered, t)
+    denominator = np.sqrt(np.einsum('ijkl,ijkl->ij', centered, centered)) * t_norm
+    scores = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=scores, where=denominator > 1e-6 * t_norm * np.sqrt(h * w))
+    return top, left, scores
+
+def peaks(scores, count, min_score, min_distance):
+    """Up to `count` best (score, y, x) at least min_distance apart, above min_score"""
+    scores = scores.copy()
+    found = []
+    while len(found) < count:
+        index = int(np.argmax(scores))
+        y, x = divmod(index, scores.shape[1])
+        score = float(scores[y, x])
+        if score < min_score:
+            break
+        found.append((score, y, x))
+        scores[max(0, y - min_distance):y + min_distance + 1, max(0, x - min_distance):x + min_distance + 1] = -np.inf
+    return found
+
+class Template:
+    """A registered template with its pyramid built once"""
+
+    def __init__(self, template_id, image):
+        self.id = template_id
+        gray = to_gray(image)
+        if gray.size > MAX_TEMPLATE_PIXELS:
+            raise TemplateError(f'Template larger than {MAX_TEMPLATE_PIXELS} pixels')
+        if gray.std() == 0:
+            raise TemplateError('Template has no contrast')
+        self.height, self.width = gray.shape
+        self.pyramid = template_pyramid(gray)
+        self.levels = len(self.pyramid) - 1
+
+def match_template(screen, template, threshold=DEFAULT_THRESHOLD, max_matches=DEFAULT_MAX_MATCHES,
+                   offset=(0, 0), screens=None):
+    """Ranked matches of a Template in a PIL image (or gray array)
+
+    Each match is {x, y, width, height, center, score} in screen pixels;
+    offset is added to coordinates (the origin of a cropped region).
+    screens: the screen's pyramid (MAX_LEVELS deep) when matching several
+    templates against one capture.
+    """
+    if screens is None:
+        gray = screen if isinstance(screen, np.ndarray) else to_gray(screen)
+        screens = pyramid(gray, template.levels)
+    gray = screens[0]
+    if template.height > gray.shape[0] or template.width > gray.shape[1]:
+        raise TemplateError('Template is larger than the search area')
+    levels = min(template.levels, len(screens) - 1)
+    while levels and any(s < t for s, t in zip(screens[levels].shape, template.pyramid[levels].shape)):
+        levels -= 1
+
+    # Full search only at the coarsest level
+    coarse = ncc_map(screens[levels], template.pyramid[levels])
+    spacing = max(1, min(template.pyramid[levels].shape) // 2)
+    candidates = [(y, x) for _, y, x in peaks(coarse, max_matches * CANDIDATES_PER_MATCH,
+                                               threshold * COARSE_FLOOR, spacing)]
+
+    # Refine each candidate on the way down to full resolution
+    for level in range(levels - 1, -1, -1):
+        refined = []
+        for y, x in candidates:
+            y, x = 2 * y, 2 * x
+            top, left, scores = ncc_region(screens[level], template.pyramid[level],
+                                           y - REFINE_RADIUS, x - REFINE_RADIUS,
+                                           y + REFINE_RADIUS + 2, x + REFINE_RADIUS + 2)
+            if scores.size:
+                dy, dx = np.unravel_index(int(np.argmax(scores)), scores.shape)
+                refined.append((top + int(dy), left + int(dx)))
+        candidates = list(dict.fromkeys(refined))
+
+    # Final scores at full resolution
+    if levels == 0:
+        scored = peaks(coarse, max_matches * CANDIDATES_PER_MATCH, threshold, spacing)
+    else:
+        scored = []
+        for y, x in candidates:
+            _, _, scores = ncc_region(gray, template.pyramid[0], y, x, y + 1, x + 1)
+            if scores.size and scores[0, 0] >= threshold:
+                scored.append((float(scores[0, 0]), y, x))
+
+    # Drop overlapping duplicates, best first
+    matches = []
+    for score, y, x in sorted(scored, reverse=True):
+        if any(abs(y - m['_y']) < template.height // 2 and abs(x - m['_x']) < template.width // 2 for m in matches):
+            continue
+        matches.append({'_y': y, '_x': x, 'score': round(score, 4)})
+        if len(matches) == max_matches:
+            break
+
+    ox, oy = offset
+    return [{
+        'x': m['_x'] + ox,
+        'y': m['_y'] + oy,
+        'width': template.width,
+        'height': template.height,
+        'center': [m['_x'] + ox + template.width // 2, m['_y'] + oy + template.height // 2],
+        'score': m['score']
+    } for m in matches]
+
+def decode_image(data):
+    """PIL image from base64 (optionally a data: URL)"""
+    if data.startswith('data:'):
+        data = data.split(',', 1)[1]
+    try:
+        image = Image.open(BytesIO(base64.b64decode(data)))
+        image.load()
+    except (ValueError, OSError) as e:
+        raise TemplateError(f'Could not decode image: {e}')
+    return image
+
+class TemplateStore:
+    """Registered templates by id, least recently used dropped past max_templates"""
+
+    def __init__(self, max_templates=MAX_TEMPLATES):
+        self.max_templates = max_templates
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, template_id, image):
+        template = Template(template_id, image)
+        with self._lock:
+            self._templates.pop(template_id, None)
+            self._templates[template_id] = template
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return template
+
+    def get(self, template_id):
+        """Template by id, or None if it was never registered (or was evicted)"""
+        with self._lock:
+            template = self._templates.get(template_id)
+            if template is not None:
+                self._templates.move_to_end(template_id)
+            return template
+
+    def remove(self, template_id):
+        with self._lock:
+            return self._templates.pop(template_id, None) is not None
+
+    def list(self):
+        with self._lock:
+            return [{'id': t.id, 'width': t.width, 'height': t.height, 'levels': t.levels}
+                    for t in self._templates.values()]
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python template_match.py <screenshot> <template> [threshold]")
+        sys.exit(1)
+    screen = Image.open(sys.argv[1])
+    template = Template('cli', Image.open(sys.argv[2]))
+    threshold = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_THRESHOLD
+    for match in match_template(screen, template, threshold):
+        print(f"{match['score']:.3f}  x={match['x']} y={match['y']}  center={tuple(match['center'])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Text entry for the Windows Agent
+/keyboard/type picks between per-key typing (paced, for apps that drop fast
+input), batched Unicode SendInput and clipboard paste with restore, and
+reports which mode ran and how long it took
+"""
+
+import time
+
+MODES = ('auto', 'keys', 'unicode', 'paste')
+
+# Texts at least this long are pasted; shorter ones are injected as Unicode
+PASTE_THRESHOLD = 200
+# Characters per SendInput call (two events each: key down and key up)
+UNICODE_BATCH = 64
+# Give the target window time to read the clipboard before it is restored
+# (default; slow targets can ask for more per call)
+PASTE_SETTLE = 0.05
+
+class TextInjector:
+    """Input backend used by TextTyper; the only part that touches the desktop"""
+
+    def type_keys(self, text, interval):
+        """Type one character at a time with a delay between keys"""
+        raise NotImplementedError
+
+    def send_unicode(self, text):
+        """Inject text as Unicode key events in one batch"""
+        raise NotImplementedError
+
+    def get_clipboard(self):
+        """Current clipboard text, or None if it holds no text"""
+        raise NotImplementedError
+
+    def set_clipboard(self, text):
+        """Replace the clipboard with text (None empties it)"""
+        raise NotImplementedError
+
+    def save_clipboard(self):
+        """Clipboard contents in a form restore_clipboard takes back; None if nothing could be saved
+
+        This default only keeps text, so a clipboard holding an image or
+        files saves as None and is left alone rather than emptied.
+        """
+        return self.get_clipboard()
+
+    def restore_clipboard(self, saved):
+        """Put back what save_clipboard returned"""
+        self.set_clipboard(saved)
+
+    def paste(self):
+        """Send Ctrl+V to the focused window"""
+        raise NotImplementedError
+
+class Win32TextInjector(TextInjector):
+    """TextInjector backed by pyautogui, SendInput and pywin32's clipboard"""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        import pyautogui
+        import win32clipboard
+        import win32con
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                        ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                        ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        class INPUTUNION(ctypes.Union):
+            # MOUSEINPUT is the largest member; it sets sizeof(INPUT)
+            _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [('type', wintypes.DWORD), ('union', INPUTUNION)]
+
+        self.ctypes = ctypes
+        self.INPUT = INPUT
+        self.pyautogui = pyautogui
+        self.win32clipboard = win32clipboard
+        self.win32con = win32con
+        self.user32 = ctypes.WinDLL('user32', use_last_error=True)
+
+    def _events(self, text):
+        """Key down/up pairs; newlines and tabs go as virtual keys so editors see Enter and Tab"""
+        INPUT = self.INPUT
+        KEYEVENTF_UNICODE = 0x0004
+        KEYEVENTF_KEYUP = 0x0002
+        events = []
+
+        def add(vk, scan, flags):
+            event = INPUT(type=1)   # INPUT_KEYBOARD
+            event.union.ki.wVk = vk
+            event.union.ki.wScan = scan
+            event.union.ki.dwFlags = flags
+            events.append(event)
+
+        for char in text:
+            if char in '\n\r\t':
+                vk = self.win32con.VK_RETURN if char != '\t' else self.win32con.VK_TAB
+                add(vk, 0, 0)
+                add(vk, 0, KEYEVENTF_KEYUP)
+                continue
+            # Characters outside the BMP go as their UTF-16 surrogate pair
+            encoded = char.encode('utf-16-le')
+            for i in range(0, len(encoded), 2):
+                unit = int.from_bytes(encoded[i:i + 2], 'little')
+                add(0, unit, KEYEVENTF_UNICODE)
+                add(0, unit, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)
+        return events
+
+    def type_keys(self, text, interval):
+        self.pyautogui.typewrite(text, interval=interval)
+
+    def send_unicode(self, text):
+        events = self._events(text)
+        if not events:
+            return
+        array = (self.INPUT * len(events))(*events)
+        sent = self.user32.SendInput(len(events), array, self.ctypes.sizeof(self.INPUT))
+        if sent != len(events):
+            raise OSError(f'SendInput injected {sent} of {len(events)} events '
+                          f'(error {self.ctypes.get_last_error()})')
+
+    def _open_clipboard(self, attempts=10):
+        # Another process may hold the clipboard for a moment
+        for attempt in range(attempts):
+            try:
+                self.win32clipboard.OpenClipboard()
+                return
+            except Exception:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.01)
+
+    def get_clipboard(self):
+        self._open_clipboard()
+        try:
+            if self.win32clipboard.IsClipboardFormatAvailable(self.win32con.CF_UNICODETEXT):
+                return self.win32clipboard.GetClipboardData(self.win32con.CF_UNICODETEXT)
+            return None
+        finally:
+            self.win32clipboard.CloseClipboard()
+
+    def set_clipboard(self, text):
+        self._open_clipboard()
+        try:
+            self.win32clipboard.EmptyClipboard()
+            if text is not None:
+                self.win32clipboard.SetClipboardData(self.win32con.CF_UNICODETEXT, text)
+        finally:
+            self.win32clipboard.CloseClipboard()
+
+    def save_clipboard(self):
+        # Every format that reads back as data: text, images (CF_DIB), HTML, RTF, ...
+        # Handle formats (CF_BITMAP and the like) come back synthesized from those
+        self._open_clipboard()
+        try:
+            saved = {}
+            fmt = self.win32clipboard.EnumClipboardFormats(0)
+            while fmt:
+                try:
+                    data = self.win32clipboard.GetClipboardData(fmt)
+                except Exception:
+                    data = None
+                if isinstance(data, (bytes, str)):
+                    saved[fmt] = data
+                fmt = self.win32clipboard.EnumClipboardFormats(fmt)
+            return saved
+        finally:
+            self.win32clipboard.CloseClipboard()
+
+    def restore_clipboard(self, saved):
+        self._open_clipboard()
+        try:
+            self.win32clipboard.EmptyClipboard()
+            for fmt, data in saved.items():
+                try:
+                    self.win32clipboard.SetClipboardData(fmt, data)
+                except Exception:
+                    pass
+        finally:
+            self.win32clipboard.CloseClipboard()
+
+    def paste(self):
+        self.pyautogui.hotkey('ctrl', 'v')
+
+class TextTyper:
+    """Chooses a text entry mode and times it"""
+
+    def __init__(self, injector, paste_threshold=PASTE_THRESHOLD, batch=UNICODE_BATCH,
+                 settle=PASTE_SETTLE):
+        self.injector = injector
+        self.paste_threshold = paste_threshold
+        self.batch = batch
+        self.settle = settle
+
+    def choose(self, text, mode='auto', interval=None):
+        """Mode that will be used for this text"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown typing mode '{mode}' (expected one of {', '.join(MODES)})")
+        if mode != 'auto':
+            return mode
+        # An explicit delay between keys means the caller wants paced typing
+        if interval:
+            return 'keys'
+        return 'paste' if len(text) >= self.paste_threshold else 'unicode'
+
+    def _unicode(self, text):
+        # Normalize first so a batch boundary can't split CRLF into two Enters
+        text = text.replace('\r\n', '\n')
+        for i in range(0, len(text), self.batch):
+            self.injector.send_unicode(text[i:i + self.batch])
+
+    def type(self, text, mode='auto', interval=None, settle=None):
+        """Enter text; returns the mode used, character count and duration
+
+        settle is how long a paste waits for the target to read the
+        clipboard before the previous contents go back (default
+        self.settle).
+        """
+        chosen = self.choose(text, mode, interval)
+        start = time.perf_counter()
+        fallback = None
+
+        if chosen == 'keys':
+            self.injector.type_keys(text, 0.05 if interval is None else interval)
+        elif chosen == 'unicode':
+            self._unicode(text)
+        else:
+            try:
+                previous = self.injector.save_clipboard()
+                self.injector.set_clipboard(text)
+            except Exception as e:
+                # Clipboard locked by another process: nothing was pasted, inject instead
+                if mode == 'paste':
+                    raise
+                fallback = str(e)
+                chosen = 'unicode'
+                self._unicode(text)
+            else:
+                # Put back what the clipboard held before, unless it couldn't be saved
+                try:
+                    self.injector.paste()
+                    time.sleep(self.settle if settle is None else settle)
+                finally:
+                    if previous is not None:
+                        self.injector.restore_clipboard(previous)
+
+        result = {
+            'mode': chosen,
+            'chars': len(text),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+        if fallback:
+            result['fallback_reason'] = fallback
+        return result
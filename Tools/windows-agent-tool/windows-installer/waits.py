@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Server-side waits for the Windows Agent
+/wait checks screen, window and process conditions locally at high
+frequency and returns as soon as one holds, instead of the client polling
+with screenshots
+"""
+
+import re
+import time
+
+from PIL import ImageChops
+
+DEFAULT_TIMEOUT = 10.0
+MAX_TIMEOUT = 120.0
+# Fastest the loop will spin; each condition also has its own minimum interval
+MIN_INTERVAL = 0.005
+
+WINDOW_STATES = ('appears', 'gone', 'changed', 'minimized', 'maximized', 'normal')
+PROCESS_STATES = ('running', 'started', 'exited')
+
+class WaitProbes:
+    """Desktop reads used by wait conditions; the only part that touches Windows"""
+
+    def grab(self, box):
+        """Screen region (left, top, right, bottom) as a PIL image"""
+        raise NotImplementedError
+
+    def windows(self):
+        """Fresh list of top-level windows as dicts with hwnd, title, pid and visible"""
+        raise NotImplementedError
+
+    def window_state(self, hwnd):
+        """'minimized', 'maximized' or 'normal'; None if the window is gone"""
+        raise NotImplementedError
+
+    def processes(self):
+        """Running processes as (pid, lower-cased name) pairs"""
+        raise NotImplementedError
+
+class DesktopWaitProbes(WaitProbes):
+    """WaitProbes backed by ImageGrab, the agent's window provider and psutil"""
+
+    def __init__(self, window_provider):
+        import psutil
+        from PIL import ImageGrab
+        self.psutil = psutil
+        self.image_grab = ImageGrab
+        self.window_provider = window_provider
+
+    def grab(self, box):
+        return self.image_grab.grab(bbox=box)
+
+    def windows(self):
+        # Straight from the provider: the registry's snapshot may be up to a TTL old
+        return self.window_provider.enumerate()
+
+    def window_state(self, hwnd):
+        if self.window_provider.title(hwnd) is None:
+            return None
+        return self.window_provider.describe(hwnd)['state']
+
+    def processes(self):
+        result = []
+        for proc in self.psutil.process_iter(['name']):
+            name = proc.info.get('name')
+            if name:
+                result.append((proc.pid, name.lower()))
+        return result
+
+def parse_color(value):
+    """(r, g, b) from [r, g, b] or '#rrggbb'"""
+    if isinstance(value, str):
+        value = value.lstrip('#')
+        if len(value) != 6:
+            raise ValueError(f"Colour must be '#rrggbb', got '{value}'")
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    if len(value) < 3:
+        raise ValueError('Colour must have three channels')
+    return tuple(int(c) for c in value[:3])
+
+def parse_box(data):
+    """(left, top, right, bottom) from region: [x, y, width, height] or x/y/width/height fields"""
+    region = data.get('region')
+    if region:
+        x, y, width, height = region
+    else:
+        x, y, width, height = (data.get(k) for k in ('x', 'y', 'width', 'height'))
+        if None in (x, y, width, height):
+            raise ValueError('region_change needs region: [x, y, width, height]')
+    if width <= 0 or height <= 0:
+        raise ValueError('Region width and height must be positive')
+    return (x, y, x + width, y + height)
+
+class Condition:
+    """One thing to wait for; start() takes a baseline, check() returns details once met"""
+
+    interval = 0.02
+
+    def start(self):
+        pass
+
+    def check(self):
+        raise NotImplementedError
+
+class PixelCondition(Condition):
+    """Pixel at (x, y) within `tolerance` of a colour on every channel"""
+
+    interval = 0.01
+
+    def __init__(self, probes, data):
+        self.probes = probes
+        self.x = int(data['x'])
+        self.y = int(data['y'])
+        self.color = parse_color(data['color'])
+        self.tolerance = int(data.get('tolerance', 0))
+
+    def check(self):
+        pixel = self.probes.grab((self.x, self.y, self.x + 1, self.y + 1)).convert('RGB').getpixel((0, 0))
+        if all(abs(a - b) <= self.tolerance for a, b in zip(pixel, self.color)):
+            return {'color': list(pixel)}
+        return None
+
+class RegionChangeCondition(Condition):
+    """More than `fraction` of a region's pixels moved by more than `tolerance` levels"""
+
+    interval = 0.02
+
+    def __init__(self, probes, data):
+        self.probes = probes
+        self.box = parse_box(data)
+        self.tolerance = int(data.get('tolerance', 8))
+        self.fraction = float(data.get('fraction', 0.0))
+        self.baseline = None
+
+    def start(self):
+        self.baseline = self.probes.grab(self.box).convert('RGB')
+
+    def check(self):
+        frame = self.probes.grab(self.box).convert('RGB')
+        if frame.size != self.baseline.size:
+            return {'changed_fraction': 1.0}
+        # Count pixels past the tolerance without leaving C: diff, threshold, histogram
+        diff = ImageChops.difference(frame, self.baseline).convert('L')
+        mask = diff.point(lambda v: 255 if v > self.tolerance else 0)
+        changed = mask.histogram()[255] / (frame.width * frame.height)
+        if changed > self.fraction:
+            return {'changed_fraction': round(changed, 4)}
+        return None
+
+class WindowCondition(Condition):
+    """A window whose title contains `title` (or matches regex `pattern`) appears, goes or changes state"""
+
+    interval = 0.05
+
+    def __init__(self, probes, data):
+        self.probes = probes
+        self.state = data.get('state', 'appears')
+        if self.state not in WINDOW_STATES:
+            raise ValueError(f"Unknown window state '{self.state}' (expected one of {', '.join(WINDOW_STATES)})")
+        if data.get('pattern'):
+            self.pattern = re.compile(data['pattern'], re.IGNORECASE)
+        elif data.get('title'):
+            self.pattern = re.compile(re.escape(data['title']), re.IGNORECASE)
+        else:
+            raise ValueError('window condition needs title or pattern')
+        self.baseline = {}
+
+    def _matches(self):
+        return [w for w in self.probes.windows() if w['visible'] and w['title'] and self.pattern.search(w['title'])]
+
+    def start(self):
+        if self.state == 'changed':
+            self.baseline = {w['hwnd']: self.probes.window_state(w['hwnd']) for w in self._matches()}
+
+    def check(self):
+        matches = self._matches()
+        if self.state == 'gone':
+            return {} if not matches else None
+        if self.state == 'appears':
+            if matches:
+                return {'hwnd': matches[0]['hwnd'], 'title': matches[0]['title']}
+            return None
+
+        if self.state == 'changed':
+            current = {w['hwnd']: w for w in matches}
+            for hwnd, before in self.baseline.items():
+                after = self.probes.window_state(hwnd) if hwnd in current else None
+                if after != before:
+                    return {'hwnd': hwnd, 'from': before, 'to': after or 'gone'}
+            for hwnd, window in current.items():
+                if hwnd not in self.baseline:
+                    return {'hwnd': hwnd, 'title': window['title'], 'from': 'absent',
+                            'to': self.probes.window_state(hwnd)}
+            return None
+
+        for window in matches:
+            if self.probes.window_state(window['hwnd']) == self.state:
+                return {'hwnd': window['hwnd'], 'title': window['title']}
+        return None
+
+class ProcessCondition(Condition):
+    """A process by name is running, newly started, or has exited"""
+
+    interval = 0.1
+
+    def __init__(self, probes, data):
+        self.probes = probes
+        name = data['name'].lower()
+        self.names = {name, name + '.exe'} if not name.endswith('.exe') else {name}
+        self.state = data.get('state', 'started')
+        if self.state not in PROCESS_STATES:
+            raise ValueError(f"Unknown process state '{self.state}' (expected one of {', '.join(PROCESS_STATES)})")
+        self.baseline = set()
+
+    def _pids(self):
+        return {pid for pid, name in self.probes.processes() if name in self.names}
+
+    def start(self):
+        self.baseline = self._pids()
+
+    def check(self):
+        pids = self._pids()
+        if self.state == 'running':
+            return {'pids': sorted(pids)} if pids else None
+        if self.state == 'started':
+            new = pids - self.baseline
+            return {'pids': sorted(new)} if new else None
+        # exited: every instance seen at the start (or any at all, if none was) is gone
+        remaining = pids & self.baseline if self.baseline else pids
+        return {'exited': sorted(self.baseline - pids)} if not remaining else None
+
+CONDITIONS = {
+    'pixel': PixelCondition,
+    'region_change': RegionChangeCondition,
+    'window': WindowCondition,
+    'process': ProcessCondition
+}
+
+def build_conditions(probes, specs):
+    """Condition objects for a list of {"type": ..., ...} specs"""
+    if not specs:
+        raise ValueError('No wait conditions given')
+    conditions = []
+    for spec in specs:
+        kind = spec.get('type')
+        if kind not in CONDITIONS:
+            raise ValueError(f"Unknown wait condition '{kind}' (expected one of {', '.join(CONDITIONS)})")
+        try:
+            conditions.append(CONDITIONS[kind](probes, spec))
+        except KeyError as e:
+            raise ValueError(f"{kind} condition needs {e.args[0]}")
+    return conditions
+
+def wait_for(conditions, timeout=DEFAULT_TIMEOUT, interval=None):
+    """Check conditions until one holds or timeout passes
+
+    Each condition is checked no more often than its own interval (or the
+    requested one, if larger); returns met, the index and details of the
+    condition that held, elapsed time and the number of checks made.
+    """
+    timeout = min(max(float(timeout), 0.0), MAX_TIMEOUT)
+    start = time.perf_counter()
+    deadline = start + timeout
+    for condition in conditions:
+        condition.start()
+
+    intervals = [max(condition.interval, interval or 0, MIN_INTERVAL) for condition in conditions]
+    due = [start] * len(conditions)
+    checks = 0
+    while True:
+        now = time.perf_counter()
+        for index, condition in enumerate(conditions):
+            if now < due[index]:
+                continue
+            checks += 1
+            details = condition.check()
+            if details is not None:
+                return {
+                    'met': True,
+                    'index': index,
+                    'details': details,
+                    'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+                    'checks': checks
+                }
+            due[index] = now + intervals[index]
+
+        now = time.perf_counter()
+        if now >= deadline:
+            return {
+                'met': False,
+                'index': None,
+                'details': None,
+                'elapsed_ms': round((now - start) * 1000, 2),
+                'checks': checks
+            }
+        time.sleep(max(0.0, min(min(due), deadline) - now))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Window registry for the Windows Agent
+One shared index of top-level windows (in Z-order, by hwnd and by pid) so
+/window/* lookups don't re-enumerate every window on each call
+"""
+
+import threading
+import time
+
+DEFAULT_TTL = 1.0
+
+class WindowProvider:
+    """Source of top-level windows; the registry only talks to this"""
+
+    def enumerate(self):
+        """All top-level windows in Z-order as dicts with hwnd, title, pid and visible"""
+        raise NotImplementedError
+
+    def title(self, hwnd):
+        """Current title of a window, or None if the handle is no longer a window"""
+        raise NotImplementedError
+
+    def describe(self, hwnd):
+        """Rect and show state of a window"""
+        raise NotImplementedError
+
+    def show(self, hwnd, action):
+        """Apply focus, maximize, minimize or restore to a window"""
+        raise NotImplementedError
+
+class Win32WindowProvider(WindowProvider):
+    """WindowProvider backed by pywin32"""
+
+    def __init__(self):
+        import win32con
+        import win32gui
+        import win32process
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.win32process = win32process
+
+    def enumerate(self):
+        win32gui = self.win32gui
+        windows = []
+
+        def enum_handler(hwnd, results):
+            try:
+                _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+                results.append({
+                    'hwnd': hwnd,
+                    'title': win32gui.GetWindowText(hwnd),
+                    'pid': pid,
+                    'visible': bool(win32gui.IsWindowVisible(hwnd))
+                })
+            except Exception:
+                pass
+            return True
+
+        win32gui.EnumWindows(enum_handler, windows)
+        return windows
+
+    def title(self, hwnd):
+        if not self.win32gui.IsWindow(hwnd):
+            return None
+        return self.win32gui.GetWindowText(hwnd)
+
+    def describe(self, hwnd):
+        rect = self.win32gui.GetWindowRect(hwnd)
+        is_minimized = self.win32gui.IsIconic(hwnd)
+        is_maximized = self.win32gui.IsZoomed(hwnd)
+        return {
+            'rect': {
+                'left': rect[0],
+                'top': rect[1],
+                'right': rect[2],
+                'bottom': rect[3],
+                'width': rect[2] - rect[0],
+                'height': rect[3] - rect[1]
+            },
+            'state': 'minimized' if is_minimized else 'maximized' if is_maximized else 'normal'
+        }
+
+    def show(self, hwnd, action):
+        win32gui = self.win32gui
+        win32con = self.win32con
+        if action == 'focus':
+            # Restore if minimized, then bring to foreground
+            if win32gui.IsIconic(hwnd):
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            win32gui.SetForegroundWindow(hwnd)
+        else:
+            show_cmd = {
+                'maximize': win32con.SW_MAXIMIZE,
+                'minimize': win32con.SW_MINIMIZE,
+                'restore': win32con.SW_RESTORE
+            }[action]
+            win32gui.ShowWindow(hwnd, show_cmd)
+
+class WindowRegistry:
+    """TTL-refreshed index of top-level windows
+
+    Lookups are served from the last enumeration. A snapshot older than
+    `ttl` is rebuilt; a hit is checked against the live title (one cheap
+    call) and a miss or stale hit triggers one early rebuild, so closed,
+    renamed and newly opened windows are picked up without a full scan on
+    every call.
+    invalidate() forces the next lookup to rebuild (e.g. from window events).
+    """
+
+    def __init__(self, provider, ttl=DEFAULT_TTL):
+        self.provider = provider
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._windows = []
+        self._by_hwnd = {}
+        self._by_pid = {}
+        self._built = None
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'stale': 0, 'refreshes': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def refresh(self):
+        """Rebuild the index from a fresh enumeration"""
+        windows = self.provider.enumerate()
+        by_hwnd = {}
+        by_pid = {}
+        for window in windows:
+            window['title_lower'] = window['title'].lower()
+            by_hwnd[window['hwnd']] = window
+            by_pid.setdefault(window['pid'], []).append(window)
+
+        with self._lock:
+            self._windows = windows
+            self._by_hwnd = by_hwnd
+            self._by_pid = by_pid
+            self._built = time.monotonic()
+            self.stats['refreshes'] += 1
+
+    def invalidate(self):
+        """Drop the snapshot so the next lookup re-enumerates"""
+        with self._lock:
+            self._built = None
+
+    def _age(self):
+        built = self._built
+        return float('inf') if built is None else time.monotonic() - built
+
+    def _ensure_fresh(self):
+        """Rebuild an expired snapshot; True if it was rebuilt"""
+        if self._age() > self.ttl:
+            self.refresh()
+            return True
+        return False
+
+    def windows(self, visible_only=False):
+        """Indexed windows in Z-order"""
+        self._ensure_fresh()
+        with self._lock:
+            windows = list(self._windows)
+        if visible_only:
+            windows = [w for w in windows if w['visible'] and w['title']]
+        return windows
+
+    def _match(self, title, pid):
+        """First indexed window in Z-order whose title contains title or whose PID is pid"""
+        pid = int(pid) if pid else None
+        with self._lock:
+            if not title:
+                matches = self._by_pid.get(pid)
+                return matches[0] if matches else None
+            needle = title.lower()
+            for window in self._windows:
+                if needle in window['title_lower'] or pid and window['pid'] == pid:
+                    return window
+        return None
+
+    def _still_valid(self, window, title, pid):
+        current = self.provider.title(window['hwnd'])
+        if current is None:
+            return False
+        return not title or title.lower() in current.lower() or bool(pid) and window['pid'] == int(pid)
+
+    def find(self, title=None, pid=None, hwnd=None):
+        """Handle of the window matching hwnd, else the first in Z-order matching title substring or PID
+
+        None if not found.
+        """
+        self._count('lookups')
+        if hwnd is not None:
+            # Handles are used directly; only check they still exist
+            hwnd = int(hwnd)
+            return hwnd if self.provider.title(hwnd) is not None else None
+        if not title and not pid:
+            return None
+
+        refreshed = self._ensure_fresh()
+        window = self._match(title, pid)
+        if window is not None:
+            if self._still_valid(window, title, pid):
+                self._count('hits')
+                return window['hwnd']
+            self._count('stale')
+        else:
+            self._count('misses')
+        if refreshed:
+            return None
+
+        # Closed, renamed or newly opened since the snapshot: look again
+        self.refresh()
+
+        window = self._match(title, pid)
+        return window['hwnd'] if window is not None else None
+
+    def snapshot(self):
+        """Lookup counters plus index size and age"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['windows'] = len(self._windows)
+        age = self._age()
+        stats['age_ms'] = None if age == float('inf') else round(age * 1000, 2)
+        stats['ttl'] = self.ttl
+        return stats
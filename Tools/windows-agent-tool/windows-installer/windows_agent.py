@@ -14,43 +14,99 @@ __features__ = {
 
 import os
 import sys
+import ast
 import json
 import base64
 import subprocess
 import socket
 import threading
 import time
+import atexit
 import shutil
 import tempfile
 import urllib.request
+import zipfile
 from io import BytesIO
+from collections import OrderedDict
 from datetime import datetime
 from functools import wraps
+from contextlib import contextmanager
 
-from flask import Flask, request, jsonify
-import pyautogui
-from PIL import ImageGrab
-import psutil
-import win32api
-import win32con
-import win32process
-import win32security
-import win32gui
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+from desktop_backend import load_backend, ProcessNotFound, ProcessAccessDenied
+from image_pipeline import transform_image, encode_image, image_headers, frame_etag
+from frame_delta import DeltaSessions, pack_delta, DEFAULT_TILE_SIZE
+from file_index import (FileIndex, IndexNotReady, DEFAULT_ROOTS as DEFAULT_INDEX_ROOTS,
+                        DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT)
+from file_listing import Listing, ListingFilter
+from file_sync import signatures as sync_signatures, resolve as resolve_sync_path, apply_patch, PatchMismatch
+from powershell_host import PowerShellHostError
+from window_registry import WindowRegistry
+from scheduler import Scheduler, SchedulerBusy, PRIORITY_NORMAL
+from metrics import Metrics
+from text_input import TextTyper
+from template_match import (TemplateStore, TemplateError, match_template, pyramid, to_gray, decode_image,
+                            MAX_LEVELS, DEFAULT_THRESHOLD, DEFAULT_MAX_MATCHES)
+from waits import build_conditions, wait_for, DEFAULT_TIMEOUT as DEFAULT_WAIT_TIMEOUT
 
 app = Flask(__name__)
 
 # Configuration
-PORT = 8765
-HOST = '0.0.0.0'  # Listen on all interfaces for WSL access
+PORT = int(os.environ.get('CLAUDE_AGENT_PORT', '8765'))
+HOST = os.environ.get('CLAUDE_AGENT_HOST', '0.0.0.0')  # All interfaces by default, for WSL access
 API_TOKEN = os.environ.get('CLAUDE_AGENT_TOKEN', 'claude-agent-2024')
+INFO_PATH = os.environ.get('CLAUDE_AGENT_INFO', '~/.claude_agent_info')
+# win32 drives this session; sim runs a simulated desktop (see sim_backend.py)
+BACKEND = os.environ.get('CLAUDE_AGENT_BACKEND', 'win32')
+POWERSHELL_POOL_SIZE = int(os.environ.get('CLAUDE_AGENT_PS_POOL', '2'))
+POWERSHELL_MAX_COMMANDS = int(os.environ.get('CLAUDE_AGENT_PS_MAX_COMMANDS', '200'))
+SERVER_THREADS = int(os.environ.get('CLAUDE_AGENT_THREADS', '16'))
+READ_SLOTS = int(os.environ.get('CLAUDE_AGENT_READ_SLOTS', '4'))
+WAIT_SLOTS = int(os.environ.get('CLAUDE_AGENT_WAIT_SLOTS', '4'))
+WRITE_SLOTS = int(os.environ.get('CLAUDE_AGENT_WRITE_SLOTS', '4'))
+# Directories /file/search indexes (os.pathsep-separated) and how often to refresh it (seconds)
+INDEX_ROOTS = os.environ.get('CLAUDE_AGENT_INDEX_ROOTS')
+INDEX_INTERVAL = float(os.environ.get('CLAUDE_AGENT_INDEX_INTERVAL', '300'))
+
+# Screen, input, processes, PowerShell and windows all go through the backend
+backend = load_backend(BACKEND, powershell_pool_size=POWERSHELL_POOL_SIZE,
+                       powershell_max_commands=POWERSHELL_MAX_COMMANDS)
+atexit.register(backend.close)
+
+# Last frame per client for /screenshot/delta
+delta_sessions = DeltaSessions()
+
+# Long-lived PowerShell hosts for /powershell
+ps_pool = backend.powershell
+
+# Shared window index for /window/* and /batch lookups
+window_provider = backend.window_provider
+window_registry = WindowRegistry(window_provider)
+
+# Registered images for /find/template
+template_store = TemplateStore()
+
+# Screen, window and process reads for /wait conditions
+wait_probes = backend.wait_probes
+
+# Input requests run one at a time in priority order; reads, waits and writes each share a few slots
+scheduler = Scheduler(read_slots=READ_SLOTS, wait_slots=WAIT_SLOTS, write_slots=WRITE_SLOTS)
+
+# Per-route and per-stage timings for /metrics
+metrics = Metrics()
 
-# Disable pyautogui failsafe for better control
-pyautogui.FAILSAFE = False
+# Names under the index roots for /file/search, refreshed by directory mtime
+file_index = FileIndex(INDEX_ROOTS.split(os.pathsep) if INDEX_ROOTS is not None else DEFAULT_INDEX_ROOTS)
+
+# /keyboard/type picks per-key, Unicode SendInput or clipboard paste
+text_typer = TextTyper(backend.text_injector)
 
 # Write agent info for WSL discovery
 def write_agent_info():
     """Write agent connection info for WSL to discover"""
-    info_path = os.path.expanduser('~/.claude_agent_info')
+    info_path = os.path.expanduser(INFO_PATH)
     try:
         # Get all IPs
         hostname = socket.gethostname()
@@ -94,6 +150,99 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def scheduled(lane):
+    """Admit the request through a scheduler lane before running it"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                priority = int(request.headers.get('X-Agent-Priority', PRIORITY_NORMAL))
+            except ValueError:
+                priority = PRIORITY_NORMAL
+            try:
+                g.priority = priority
+                with scheduler.slot(lane, priority) as wait_ms:
+                    g.queue_wait_ms = wait_ms
+                    metrics.observe_stage('queue', lane, wait_ms / 1000)
+                    return f(*args, **kwargs)
+            except SchedulerBusy as e:
+                return jsonify({'success': False, 'error': str(e)}), 503
+        return decorated_function
+    return decorator
+
+def note_stage(operation, stage, seconds):
+    """Record a stage in /metrics and in this response's Server-Timing header"""
+    metrics.observe_stage(operation, stage, seconds)
+    g.setdefault('stages', []).append((stage, seconds * 1000))
+
+@contextmanager
+def stage_timer(operation, stage):
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        note_stage(operation, stage, time.perf_counter() - start)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Record route latency and status; report queue, stage and handler time to the client"""
+    timings = []
+    if 'queue_wait_ms' in g:
+        response.headers['X-Queue-Wait-Ms'] = f'{g.queue_wait_ms:.2f}'
+        timings.append(f'queue;dur={g.queue_wait_ms:.2f}')
+    for stage, ms in g.get('stages', []):
+        timings.append(f'{stage};dur={ms:.2f}')
+    if 'request_start' in g:
+        elapsed = time.perf_counter() - g.request_start
+        # Route templates, not raw paths, keep label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, elapsed)
+        timings.append(f'app;dur={elapsed * 1000:.2f}')
+        
+        # Requests from WindowsControl/showui_cli carry a trace id; log it for correlation
+        trace = request.headers.get('traceparent', '').split('-')
+        if len(trace) == 4:
+            print(f"[trace {trace[1]} span {trace[2]}] {request.method} {route} "
+                  f"{response.status_code} {elapsed * 1000:.1f}ms")
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(timings)
+    return response
+
+@app.route('/scheduler/stats', methods=['GET'])
+@require_auth
+def scheduler_stats():
+    """Queue depth, active slots and wait times per lane"""
+    return jsonify({'success': True, 'lanes': scheduler.snapshot()})
+
+def metric_gauges():
+    """Current pool and queue sizes for /metrics"""
+    lanes = scheduler.snapshot()
+    pool = ps_pool.snapshot()
+    registry = window_registry.snapshot()
+    return {
+        'agent_scheduler_queue_depth': ('Requests waiting for a scheduler slot',
+                                        [({'lane': name}, lane['depth']) for name, lane in lanes.items()]),
+        'agent_scheduler_active': ('Requests holding a scheduler slot',
+                                   [({'lane': name}, lane['active']) for name, lane in lanes.items()]),
+        'agent_powershell_workers': ('PowerShell hosts running',
+                                     [({'state': 'total'}, pool['workers']), ({'state': 'idle'}, pool['idle'])]),
+        'agent_window_index_size': ('Windows in the window registry', [({}, registry['windows'])])
+    }
+
+@app.route('/metrics', methods=['GET'])
+@require_auth
+def metrics_endpoint():
+    """Request and stage metrics in Prometheus text format, or JSON with ?format=json"""
+    gauges = metric_gauges()
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify({'success': True, **metrics.to_json(gauges)})
+    return Response(metrics.to_prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -102,7 +251,8 @@ def health():
         'version': __version__,
         'pid': os.getpid(),
         'uptime': time.time(),
-        'features': __features__.get(__version__, 'Unknown version')
+        'features': __features__.get(__version__, 'Unknown version'),
+        'backend': backend.name
     })
 
 @app.route('/version', methods=['GET'])
@@ -114,155 +264,373 @@ def version():
         'current_features': __features__.get(__version__, 'Unknown version'),
         'python_version': sys.version,
         'platform': sys.platform,
+        'backend': backend.name,
         'agent_path': os.path.abspath(__file__),
         'last_modified': os.path.getmtime(__file__)
     })
 
+def capture_screen(data):
+    """Grab the screen, or the crop region when given
+    
+    The region is either x/y/width/height fields or crop: [x, y, width, height].
+    """
+    if data.get('crop'):
+        x, y, width, height = data['crop']
+    else:
+        x = data.get('x')
+        y = data.get('y')
+        width = data.get('width')
+        height = data.get('height')
+    
+    if all(v is not None for v in [x, y, width, height]):
+        return backend.grab((x, y, x + width, y + height))
+    return backend.grab()
+
+def not_modified(etag):
+    """Empty 304 reply for a client that already holds this frame"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
 @app.route('/screenshot', methods=['POST'])
 @require_auth
+@scheduled('read')
 def screenshot():
-    """Capture screenshot"""
+    """Capture screenshot
+    
+    Optional: crop, target_width, target_height, max_pixels, grayscale,
+    format (png/jpeg/webp/raw), quality, compress_level.
+    Send If-None-Match with a previous ETag to get 304 when nothing changed.
+    """
     try:
         data = request.json or {}
-        x = data.get('x')
-        y = data.get('y')
-        width = data.get('width')
-        height = data.get('height')
+        with stage_timer('screenshot', 'capture'):
+            img = capture_screen(data)
+        source_size = img.size
+        with stage_timer('screenshot', 'transform'):
+            img = transform_image(img, data)
         
-        # Capture screenshot
-        if all(v is not None for v in [x, y, width, height]):
-            img = ImageGrab.grab(bbox=(x, y, x + width, y + height))
-        else:
-            img = ImageGrab.grab()
+        # Unchanged since the client's copy: skip encoding and the body
+        etag = frame_etag(img, data)
+        if etag in request.if_none_match:
+            return not_modified(etag)
+        
+        with stage_timer('screenshot', 'encode'):
+            body, fmt, _ = encode_image(img, data)
         
+        serialize_start = time.perf_counter()
         # Convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        img_base64 = base64.b64encode(body).decode('utf-8')
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'image': img_base64,
             'width': img.width,
-            'height': img.height
+            'height': img.height,
+            'mode': img.mode,
+            'format': fmt,
+            'source_width': source_size[0],
+            'source_height': source_size[1],
+            'etag': etag
         })
+        response.set_etag(etag)
+        note_stage('screenshot', 'serialize', time.perf_counter() - serialize_start)
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/screenshot/raw', methods=['POST'])
+@require_auth
+@scheduled('read')
+def screenshot_raw():
+    """Capture screenshot and return the encoded image bytes as the body
+    
+    Accepts the same options as /screenshot; metadata is sent in X-Image-* headers.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        with stage_timer('screenshot_raw', 'capture'):
+            img = capture_screen(data)
+        source_size = img.size
+        with stage_timer('screenshot_raw', 'transform'):
+            img = transform_image(img, data)
+        
+        etag = frame_etag(img, data)
+        if etag in request.if_none_match:
+            return not_modified(etag)
+        
+        with stage_timer('screenshot_raw', 'encode'):
+            body, fmt, mimetype = encode_image(img, data)
+        
+        with stage_timer('screenshot_raw', 'serialize'):
+            response = Response(body, mimetype=mimetype, headers=image_headers(img, source_size, fmt))
+            response.set_etag(etag)
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/screenshot/delta', methods=['POST'])
+@require_auth
+@scheduled('read')
+def screenshot_delta():
+    """Capture screenshot and return only the tiles changed since the client's last frame
+    
+    Body: {"session": "<client id>", "base": <frame id the client holds>,
+           "tile_size": 64, ...screenshot options}
+    Response body: 4-byte big-endian header length, JSON header with
+    frame_id, keyframe, width, height, mode, format and tiles
+    ([x, y, width, height, length] per tile), then the encoded tiles in order.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        session = str(data.get('session', request.remote_addr))
+        tile_size = max(8, int(data.get('tile_size', DEFAULT_TILE_SIZE)))
+        
+        with stage_timer('screenshot_delta', 'capture'):
+            img = capture_screen(data)
+        source_size = img.size
+        with stage_timer('screenshot_delta', 'transform'):
+            img = transform_image(img, data)
+        with stage_timer('screenshot_delta', 'diff'):
+            keyframe, frame_id, boxes = delta_sessions.diff(session, data.get('base'), img, tile_size)
+        
+        tiles = []
+        payloads = []
+        fmt = str(data.get('format', 'png')).lower()
+        with stage_timer('screenshot_delta', 'encode'):
+            for box in boxes:
+                body, fmt, _ = encode_image(img.crop(box), data)
+                tiles.append([box[0], box[1], box[2] - box[0], box[3] - box[1], len(body)])
+                payloads.append(body)
+        
+        meta = {
+            'frame_id': frame_id,
+            'keyframe': keyframe,
+            'width': img.width,
+            'height': img.height,
+            'mode': img.mode,
+            'format': fmt,
+            'source_width': source_size[0],
+            'source_height': source_size[1],
+            'tile_size': tile_size,
+            'tiles': tiles
+        }
+        with stage_timer('screenshot_delta', 'serialize'):
+            response = Response(pack_delta(meta, payloads), mimetype='application/octet-stream')
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Template Matching
+@app.route('/find/template/register', methods=['POST'])
+@require_auth
+@scheduled('read')
+def register_template():
+    """Register a template image once by id
+    
+    Body: {"id": "steam-download", "image": "<base64 PNG>"}
+    """
+    try:
+        data = request.json or {}
+        template = template_store.register(str(data['id']), decode_image(data['image']))
+        return jsonify({'success': True, 'id': template.id, 'width': template.width,
+                        'height': template.height, 'levels': template.levels})
+    except (KeyError, TemplateError) as e:
+        return jsonify({'success': False, 'error': f'Invalid template: {e}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/find/template/remove', methods=['POST'])
+@require_auth
+def remove_template():
+    """Forget a registered template"""
+    template_id = str((request.json or {}).get('id'))
+    return jsonify({'success': True, 'removed': template_store.remove(template_id)})
+
+@app.route('/find/templates', methods=['GET'])
+@require_auth
+def list_templates():
+    """Registered templates"""
+    return jsonify({'success': True, 'templates': template_store.list()})
+
+@app.route('/find/template', methods=['POST'])
+@require_auth
+@scheduled('read')
+def find_template():
+    """Find registered templates on screen; only coordinates are returned
+    
+    Body: {"id": "steam-download"} or {"ids": [...]}, optional
+    "region": [x, y, width, height], "threshold": 0.8, "max_matches": 5.
+    Matches are ranked by score with screen coordinates and center.
+    """
+    try:
+        data = request.json or {}
+        ids = [str(i) for i in data.get('ids') or [data.get('id')] if i is not None]
+        if not ids:
+            return jsonify({'success': False, 'error': 'No template id given'}), 400
+        templates = {template_id: template_store.get(template_id) for template_id in ids}
+        unknown = [template_id for template_id, template in templates.items() if template is None]
+        if unknown:
+            # Agent restarted or evicted them: the client re-registers and retries
+            return jsonify({'success': False, 'error': f"Unknown template: {', '.join(unknown)}",
+                            'unknown': unknown}), 404
+        
+        region = data.get('region')
+        with stage_timer('find_template', 'capture'):
+            img = capture_screen({'crop': region} if region else {})
+        offset = (region[0], region[1]) if region else (0, 0)
+        
+        threshold = float(data.get('threshold', DEFAULT_THRESHOLD))
+        max_matches = int(data.get('max_matches', DEFAULT_MAX_MATCHES))
+        results = {}
+        with stage_timer('find_template', 'match'):
+            # One screen pyramid shared by every template in the request
+            screens = pyramid(to_gray(img), min(MAX_LEVELS, max(t.levels for t in templates.values())))
+            for template_id, template in templates.items():
+                results[template_id] = match_template(img, template, threshold, max_matches, offset, screens)
+        
+        if 'ids' in data:
+            return jsonify({'success': True, 'matches': results})
+        return jsonify({'success': True, 'matches': results[ids[0]]})
+    except TemplateError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Input actions shared by the single-action endpoints and /batch
+def do_mouse_move(data):
+    """Move mouse to position"""
+    x = data['x']
+    y = data['y']
+    duration = data.get('duration', 0.2)
+    
+    backend.move_mouse(x, y, duration)
+    return {'position': {'x': x, 'y': y}}
+
+def do_mouse_click(data):
+    """Click mouse button"""
+    x = data.get('x')
+    y = data.get('y')
+    button = data.get('button', 'left')
+    clicks = data.get('clicks', 1)
+    
+    backend.click(x, y, button, clicks)
+    return {}
+
+def do_keyboard_type(data):
+    """Type text (mode: auto, keys, unicode or paste; settle: seconds a paste waits before restoring the clipboard)"""
+    text = data['text']
+    settle = data.get('settle')
+    if settle is not None and not 0 <= float(settle) <= 10:
+        raise ValueError('settle must be between 0 and 10 seconds')
+    
+    result = text_typer.type(text, mode=data.get('mode', 'auto'), interval=data.get('interval'),
+                             settle=float(settle) if settle is not None else None)
+    note_stage('keyboard_type', result['mode'], result['duration_ms'] / 1000)
+    return {'typed': text, **result}
+
+def do_keyboard_key(data):
+    """Press key or key combination"""
+    keys = data['keys']  # Can be string or list
+    
+    if isinstance(keys, str):
+        backend.press(keys)
+    else:
+        backend.hotkey(keys)
+    return {'keys': keys}
+
 @app.route('/mouse/move', methods=['POST'])
 @require_auth
+@scheduled('input')
 def mouse_move():
     """Move mouse to position"""
     try:
-        data = request.json
-        x = data['x']
-        y = data['y']
-        duration = data.get('duration', 0.2)
-        
-        pyautogui.moveTo(x, y, duration=duration)
-        
-        return jsonify({'success': True, 'position': {'x': x, 'y': y}})
+        result = do_mouse_move(request.json)
+        return jsonify({'success': True, **result})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/mouse/click', methods=['POST'])
 @require_auth
+@scheduled('input')
 def mouse_click():
     """Click mouse button"""
     try:
-        data = request.json or {}
-        x = data.get('x')
-        y = data.get('y')
-        button = data.get('button', 'left')
-        clicks = data.get('clicks', 1)
-        
-        if x is not None and y is not None:
-            pyautogui.click(x, y, button=button, clicks=clicks)
-        else:
-            pyautogui.click(button=button, clicks=clicks)
-        
-        return jsonify({'success': True})
+        result = do_mouse_click(request.json or {})
+        return jsonify({'success': True, **result})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/keyboard/type', methods=['POST'])
 @require_auth
+@scheduled('input')
 def keyboard_type():
     """Type text"""
     try:
-        data = request.json
-        text = data['text']
-        interval = data.get('interval', 0.05)
-        
-        pyautogui.typewrite(text, interval=interval)
-        
-        return jsonify({'success': True, 'typed': text})
+        result = do_keyboard_type(request.json)
+        return jsonify({'success': True, **result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/keyboard/key', methods=['POST'])
 @require_auth
+@scheduled('input')
 def keyboard_key():
     """Press key or key combination"""
     try:
-        data = request.json
-        keys = data['keys']  # Can be string or list
-        
-        if isinstance(keys, str):
-            pyautogui.press(keys)
-        else:
-            pyautogui.hotkey(*keys)
-        
-        return jsonify({'success': True, 'keys': keys})
+        result = do_keyboard_key(request.json)
+        return jsonify({'success': True, **result})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/powershell', methods=['POST'])
 @require_auth
+@scheduled('write')
 def powershell():
-    """Execute PowerShell command"""
+    """Execute PowerShell command
+    
+    Runs on a pooled PowerShell host; pass "isolated": true to use a fresh
+    powershell.exe process instead.
+    """
     try:
         data = request.json
         command = data['command']
         timeout = data.get('timeout', 30)
         
-        # Run PowerShell with bypass execution policy
-        ps_command = [
-            'powershell.exe',
-            '-ExecutionPolicy', 'Bypass',
-            '-NoProfile',
-            '-Command', command
-        ]
-        
-        result = subprocess.run(
-            ps_command,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        
-        return jsonify({
-            'success': True,
-            'stdout': result.stdout,
-            'stderr': result.stderr,
-            'returncode': result.returncode
-        })
-    except subprocess.TimeoutExpired:
+        if data.get('isolated'):
+            result = backend.run_powershell_once(command, timeout)
+            # A fresh process: start-up and execution can't be told apart
+            note_stage('powershell', 'spawn_and_exec', result['elapsed_ms'] / 1000)
+        else:
+            result = ps_pool.execute(command, timeout)
+            if result['spawn_ms']:
+                note_stage('powershell', 'spawn', result['spawn_ms'] / 1000)
+            note_stage('powershell', 'wait', result['wait_ms'] / 1000)
+            note_stage('powershell', 'exec', result['exec_ms'] / 1000)
+        
+        return jsonify({'success': True, **result})
+    except (subprocess.TimeoutExpired, TimeoutError):
         return jsonify({'success': False, 'error': 'Command timed out'}), 500
+    except PowerShellHostError as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/powershell/stats', methods=['GET'])
+@require_auth
+def powershell_stats():
+    """PowerShell host pool counters"""
+    return jsonify({'success': True, 'pool': ps_pool.snapshot()})
+
 @app.route('/process/list', methods=['GET'])
 @require_auth
+@scheduled('read')
 def process_list():
     """List running processes"""
     try:
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                processes.append(proc.info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        processes = backend.processes()
         
         return jsonify({'success': True, 'processes': processes})
     except Exception as e:
@@ -270,6 +638,7 @@ def process_list():
 
 @app.route('/process/kill', methods=['POST'])
 @require_auth
+@scheduled('write')
 def process_kill():
     """Kill process by PID"""
     try:
@@ -278,28 +647,19 @@ def process_kill():
         force = data.get('force', False)
         
         try:
-            proc = psutil.Process(pid)
-            if force:
-                proc.kill()
-            else:
-                proc.terminate()
-            
-            # Wait a bit for process to die
-            try:
-                proc.wait(timeout=3)
-            except psutil.TimeoutExpired:
-                pass
+            backend.kill_process(pid, force)
             
             return jsonify({'success': True, 'pid': pid})
-        except psutil.NoSuchProcess:
+        except ProcessNotFound:
             return jsonify({'success': False, 'error': 'Process not found'}), 404
-        except psutil.AccessDenied:
+        except ProcessAccessDenied:
             return jsonify({'success': False, 'error': 'Access denied - admin rights required'}), 403
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/file/read', methods=['POST'])
 @require_auth
+@scheduled('read')
 def file_read():
     """Read file contents"""
     try:
@@ -326,6 +686,7 @@ def file_read():
 
 @app.route('/file/write', methods=['POST'])
 @require_auth
+@scheduled('write')
 def file_write():
     """Write file contents"""
     try:
@@ -352,8 +713,248 @@ def file_write():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Streaming File Transfer
+FILE_CHUNK = 1024 * 1024
+# Uploads are assembled here and moved over the target on the final chunk
+UPLOAD_SUFFIX = '.upload'
+# Last completed upload per path: (upload_id, size), so the same upload's
+# final chunk sent again can be told apart from another upload's
+completed_uploads = OrderedDict()
+completed_uploads_lock = threading.Lock()
+COMPLETED_UPLOADS_KEPT = 256
+
+def expand_path(path):
+    """Expand ~ and environment variables in a path from a request"""
+    return os.path.expandvars(os.path.expanduser(path))
+
+@app.route('/file/download', methods=['GET'])
+@require_auth
+@scheduled('read')
+def file_download():
+    """Stream a file's bytes
+    
+    Query: path. Honours Range (206 with the requested bytes) and
+    If-None-Match/If-Range against the file's ETag; the body is streamed
+    from disk after the handler returns, so no read slot is held for it.
+    """
+    try:
+        if 'path' not in request.args:
+            return jsonify({'success': False, 'error': 'path is required'}), 400
+        path = expand_path(request.args['path'])
+        if not os.path.isfile(path):
+            return jsonify({'success': False, 'error': 'File not found'}), 404
+        
+        response = send_file(path, mimetype='application/octet-stream', conditional=True, etag=True, max_age=0)
+        response.headers['X-File-Size'] = str(os.path.getsize(path))
+        return response
+    except RequestedRangeNotSatisfiable as e:
+        return jsonify({'success': False, 'error': 'Range starts past the end of the file',
+                        'size': e.length}), 416
+    except PermissionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/file/upload', methods=['POST'])
+@require_auth
+@scheduled('write')
+def file_upload():
+    """Write one chunk of a file from the raw request body
+    
+    Query: path, offset (default 0), final=1 on the last chunk, create_dirs,
+    upload_id (the same for every chunk of one upload). Chunks land in
+    <path>.upload at their offset, streamed to disk, so a failed chunk can
+    be sent again as is; offset 0 starts a new upload and the final chunk
+    moves the file over path (sent again after that with the same
+    upload_id, it succeeds without writing). A chunk past the end of what
+    has arrived gets 409 with the current size, to resume from.
+    """
+    try:
+        if 'path' not in request.args:
+            return jsonify({'success': False, 'error': 'path is required'}), 400
+        path = expand_path(request.args['path'])
+        offset = int(request.args.get('offset', 0))
+        final = request.args.get('final', '0').lower() in ('1', 'true')
+        partial = path + UPLOAD_SUFFIX
+        
+        if request.args.get('create_dirs', '1').lower() in ('1', 'true') and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        upload_id = request.args.get('upload_id')
+        current = os.path.getsize(partial) if os.path.exists(partial) else 0
+        length = request.content_length
+        if offset > current and final and current == 0 and upload_id and length is not None:
+            with completed_uploads_lock:
+                resent = completed_uploads.get(path) == (upload_id, offset + length)
+        else:
+            resent = False
+        if resent:
+            # A resent final chunk whose first copy already moved this upload into place
+            return jsonify({
+                'success': True,
+                'path': path,
+                'offset': offset,
+                'received': length,
+                'size': offset + length,
+                'complete': True
+            })
+        if offset > current:
+            return jsonify({'success': False, 'error': f'Offset {offset} is past the {current} bytes received',
+                            'size': current}), 409
+        
+        received = 0
+        with open(partial, 'r+b' if offset else 'wb') as f:
+            f.seek(offset)
+            while True:
+                block = request.stream.read(FILE_CHUNK)
+                if not block:
+                    break
+                f.write(block)
+                received += len(block)
+            end = offset + received
+            if final:
+                f.truncate(end)
+        if final:
+            os.replace(partial, path)
+            if upload_id:
+                with completed_uploads_lock:
+                    completed_uploads.pop(path, None)
+                    completed_uploads[path] = (upload_id, end)
+                    while len(completed_uploads) > COMPLETED_UPLOADS_KEPT:
+                        completed_uploads.popitem(last=False)
+        
+        return jsonify({
+            'success': True,
+            'path': path,
+            'offset': offset,
+            'received': received,
+            'size': end,
+            'complete': final
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except PermissionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# File Search
+@app.route('/file/search', methods=['POST'])
+@require_auth
+@scheduled('read')
+def file_search():
+    """Find files and directories by name in the agent's file index
+    
+    Body: query (glob with * ? [...], or a substring; case-insensitive),
+    mode (auto/glob/substring), under (only inside this directory), type
+    (file/dir/all), limit, refresh (bring the index up to date first).
+    503 until the first index build has finished.
+    """
+    try:
+        data = request.json or {}
+        if data.get('refresh'):
+            with stage_timer('search', 'refresh'):
+                file_index.refresh()
+        with stage_timer('search', 'match'):
+            matches, total, truncated = file_index.search(
+                data.get('query') or '', mode=data.get('mode', 'auto'), under=data.get('under'),
+                entry_type=data.get('type', 'all'), limit=int(data.get('limit', DEFAULT_SEARCH_LIMIT)))
+        return jsonify({
+            'success': True,
+            'matches': matches,
+            'total': total,
+            'truncated': truncated,
+            'indexed_at': file_index.stats['refreshed_at']
+        })
+    except IndexNotReady as e:
+        return jsonify({'success': False, 'error': str(e), 'index': file_index.status()}), 503
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/file/index', methods=['GET', 'POST'])
+@require_auth
+def file_index_status():
+    """Index roots and counters; POST roots (replace), add, remove and/or refresh to change them
+    
+    Changing the roots refreshes before replying; only directories that
+    are new or changed since the last refresh are read.
+    """
+    try:
+        if request.method == 'POST':
+            data = request.json or {}
+            roots = list(data.get('roots', file_index.roots))
+            roots += [root for root in data.get('add', []) if root not in roots]
+            removed = {os.path.normcase(os.path.abspath(expand_path(root))) for root in data.get('remove', [])}
+            roots = [root for root in roots if os.path.normcase(os.path.abspath(expand_path(root))) not in removed]
+            changed = 'roots' in data or 'add' in data or 'remove' in data
+            if changed:
+                file_index.set_roots(roots)
+            if changed or data.get('refresh'):
+                with stage_timer('search', 'refresh'):
+                    file_index.refresh(full=data.get('full', False))
+        return jsonify({'success': True, **file_index.status()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Delta Sync
+@app.route('/sync/signature', methods=['POST'])
+@require_auth
+@scheduled('read')
+def sync_signature():
+    """Block signatures of the files a client wants to sync into root
+    
+    Body: root, files ({rel: {size, mtime}}), checksum (hash even when size
+    and mtime match). Each file comes back as 'missing', 'same' or its
+    block signature.
+    """
+    try:
+        data = request.json
+        root = expand_path(data['root'])
+        with stage_timer('sync', 'hash'):
+            files = sync_signatures(root, data.get('files', {}), checksum=data.get('checksum', False))
+        return jsonify({'success': True, 'root': root, 'files': files})
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except PermissionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/sync/patch', methods=['POST'])
+@require_auth
+@scheduled('write')
+def sync_patch():
+    """Rebuild one file under root from its current content and the patch in the body
+    
+    Query: root, rel, size, digest, mtime, block_size (of the signature the
+    patch was made against), whole=1 when the body is the complete file.
+    A result that doesn't match size and digest (e.g. the file changed
+    since its signature) gets 409 and the file is left alone.
+    """
+    try:
+        args = request.args
+        root = expand_path(args['root'])
+        path = resolve_sync_path(root, args['rel'])
+        with stage_timer('sync', 'apply'):
+            written = apply_patch(path, request.stream, int(args['size']), args['digest'],
+                                  mtime=float(args['mtime']) if 'mtime' in args else None,
+                                  block_size=int(args.get('block_size', 0)) or None,
+                                  whole=args.get('whole', '0').lower() in ('1', 'true'))
+        return jsonify({'success': True, 'path': path, 'size': written})
+    except PatchMismatch as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except PermissionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/file/delete', methods=['POST'])
 @require_auth
+@scheduled('write')
 def file_delete():
     """Delete file"""
     try:
@@ -375,80 +976,127 @@ def file_delete():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Entries per write when /file/list streams NDJSON
+LIST_STREAM_BATCH = 256
+
 @app.route('/file/list', methods=['POST'])
 @require_auth
+@scheduled('read')
 def file_list():
-    """List directory contents"""
+    """List directory contents
+    
+    Body: path, recursive, max_depth (levels below path; 0 = path only),
+    filters (pattern, extensions, min_size, max_size, modified_after,
+    modified_before, type file/dir/all), limit and cursor (next_cursor of
+    the previous page). stream=true (or Accept: application/x-ndjson)
+    sends one JSON entry per line as the walk finds them, then a summary
+    line with done, count, next_cursor and errors.
+    """
     try:
-        data = request.json
-        path = data.get('path', '.')
-        
-        path = os.path.expanduser(path)
-        path = os.path.expandvars(path)
+        data = request.json or {}
+        path = expand_path(data.get('path', '.'))
         
         if not os.path.isdir(path):
             return jsonify({'success': False, 'error': 'Not a directory'}), 400
         
-        items = []
-        for item in os.listdir(path):
-            item_path = os.path.join(path, item)
-            try:
-                stat = os.stat(item_path)
-                items.append({
-                    'name': item,
-                    'path': item_path,
-                    'is_dir': os.path.isdir(item_path),
-                    'size': stat.st_size,
-                    'modified': stat.st_mtime
-                })
-            except:
-                pass
+        limit = data.get('limit')
+        if limit is not None and int(limit) < 1:
+            raise ValueError('limit must be at least 1')
+        listing = Listing(path, recursive=data.get('recursive', False), max_depth=data.get('max_depth'),
+                          listing_filter=ListingFilter.from_request(data), cursor=data.get('cursor'),
+                          limit=int(limit) if limit is not None else None)
+        
+        if data.get('stream') or 'application/x-ndjson' in request.headers.get('Accept', ''):
+            priority = g.get('priority', PRIORITY_NORMAL)
+            def lines():
+                # The walk runs as the body is sent, after the route's read slot is
+                # released, so it holds a read slot of its own until it ends
+                try:
+                    with scheduler.slot('read', priority) as wait_ms:
+                        metrics.observe_stage('queue', 'read', wait_ms / 1000)
+                        with stage_timer('file_list', 'scan'):
+                            # Lines go out in batches of LIST_STREAM_BATCH, not one write each
+                            batch = []
+                            for item in listing:
+                                batch.append(json.dumps(item))
+                                if len(batch) == LIST_STREAM_BATCH:
+                                    yield '\n'.join(batch) + '\n'
+                                    batch = []
+                            if batch:
+                                yield '\n'.join(batch) + '\n'
+                except SchedulerBusy as e:
+                    yield json.dumps({'done': True, 'path': path, 'success': False, 'error': str(e)}) + '\n'
+                    return
+                yield json.dumps({'done': True, 'path': path, 'count': listing.count, 'scanned': listing.scanned,
+                                  'errors': listing.errors, 'next_cursor': listing.next_cursor}) + '\n'
+            return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+        
+        with stage_timer('file_list', 'scan'):
+            items = list(listing)
         
         return jsonify({
             'success': True,
             'path': path,
-            'items': items
+            'items': items,
+            'count': listing.count,
+            'scanned': listing.scanned,
+            'errors': listing.errors,
+            'next_cursor': listing.next_cursor
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Window Management Endpoints
+def find_window(title=None, pid=None, hwnd=None):
+    """Return the window matching hwnd, title substring or PID from the registry"""
+    return window_registry.find(title=title, pid=pid, hwnd=hwnd)
+
+def window_action(action):
+    """Build a step that applies a show action to the step's window"""
+    def run(data, hwnd):
+        window_provider.show(hwnd, action)
+        return {'hwnd': hwnd, 'title': window_provider.title(hwnd)}
+    return run
+
+WINDOW_ACTIONS = {
+    'focus': window_action('focus'),
+    'maximize': window_action('maximize'),
+    'minimize': window_action('minimize'),
+    'restore': window_action('restore')
+}
+
+def window_request(action):
+    """Handle a /window/* action request addressed by hwnd, title or pid"""
+    try:
+        data = request.json or {}
+        hwnd = find_window(data.get('title'), data.get('pid'), data.get('hwnd'))
+        
+        if hwnd is None:
+            return jsonify({'success': False, 'error': 'Window not found'}), 404
+        
+        return jsonify({'success': True, **WINDOW_ACTIONS[action](data, hwnd)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/window/list', methods=['GET'])
 @require_auth
+@scheduled('read')
 def window_list():
     """List all visible windows"""
     try:
         windows = []
-        
-        def enum_handler(hwnd, results):
-            if win32gui.IsWindowVisible(hwnd):
-                window_text = win32gui.GetWindowText(hwnd)
-                if window_text:
-                    try:
-                        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                        rect = win32gui.GetWindowRect(hwnd)
-                        is_minimized = win32gui.IsIconic(hwnd)
-                        is_maximized = win32gui.IsZoomed(hwnd)
-                        
-                        results.append({
-                            'hwnd': hwnd,
-                            'title': window_text,
-                            'pid': pid,
-                            'rect': {
-                                'left': rect[0],
-                                'top': rect[1],
-                                'right': rect[2],
-                                'bottom': rect[3],
-                                'width': rect[2] - rect[0],
-                                'height': rect[3] - rect[1]
-                            },
-                            'state': 'minimized' if is_minimized else 'maximized' if is_maximized else 'normal'
-                        })
-                    except:
-                        pass
-            return True
-        
-        win32gui.EnumWindows(enum_handler, windows)
+        for window in window_registry.windows(visible_only=True):
+            try:
+                windows.append({
+                    'hwnd': window['hwnd'],
+                    'title': window['title'],
+                    'pid': window['pid'],
+                    **window_provider.describe(window['hwnd'])
+                })
+            except:
+                pass
         
         return jsonify({
             'success': True,
@@ -460,212 +1108,203 @@ def window_list():
 
 @app.route('/window/focus', methods=['POST'])
 @require_auth
+@scheduled('input')
 def window_focus():
     """Bring window to foreground"""
-    try:
-        data = request.json
-        title = data.get('title')
-        pid = data.get('pid')
-        
-        hwnd = None
-        
-        # Find window by title or PID
-        def enum_handler(h, param):
-            if title and title.lower() in win32gui.GetWindowText(h).lower():
-                param.append(h)
-            elif pid:
-                _, window_pid = win32process.GetWindowThreadProcessId(h)
-                if window_pid == pid:
-                    param.append(h)
-            return True
-        
-        handles = []
-        win32gui.EnumWindows(enum_handler, handles)
-        
-        if not handles:
-            return jsonify({'success': False, 'error': 'Window not found'}), 404
-        
-        hwnd = handles[0]
-        
-        # Restore window if minimized
-        if win32gui.IsIconic(hwnd):
-            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-        
-        # Bring to foreground
-        win32gui.SetForegroundWindow(hwnd)
-        
-        return jsonify({
-            'success': True,
-            'hwnd': hwnd,
-            'title': win32gui.GetWindowText(hwnd)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return window_request('focus')
 
 @app.route('/window/maximize', methods=['POST'])
 @require_auth
+@scheduled('input')
 def window_maximize():
     """Maximize window"""
-    try:
-        data = request.json
-        title = data.get('title')
-        pid = data.get('pid')
-        
-        # Find window
-        def enum_handler(h, param):
-            if title and title.lower() in win32gui.GetWindowText(h).lower():
-                param.append(h)
-            elif pid:
-                _, window_pid = win32process.GetWindowThreadProcessId(h)
-                if window_pid == pid:
-                    param.append(h)
-            return True
-        
-        handles = []
-        win32gui.EnumWindows(enum_handler, handles)
-        
-        if not handles:
-            return jsonify({'success': False, 'error': 'Window not found'}), 404
-        
-        hwnd = handles[0]
-        win32gui.ShowWindow(hwnd, win32con.SW_MAXIMIZE)
-        
-        return jsonify({
-            'success': True,
-            'hwnd': hwnd,
-            'title': win32gui.GetWindowText(hwnd)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return window_request('maximize')
 
 @app.route('/window/minimize', methods=['POST'])
 @require_auth
+@scheduled('input')
 def window_minimize():
     """Minimize window"""
-    try:
-        data = request.json
-        title = data.get('title')
-        pid = data.get('pid')
-        
-        # Find window
-        def enum_handler(h, param):
-            if title and title.lower() in win32gui.GetWindowText(h).lower():
-                param.append(h)
-            elif pid:
-                _, window_pid = win32process.GetWindowThreadProcessId(h)
-                if window_pid == pid:
-                    param.append(h)
-            return True
-        
-        handles = []
-        win32gui.EnumWindows(enum_handler, handles)
-        
-        if not handles:
-            return jsonify({'success': False, 'error': 'Window not found'}), 404
-        
-        hwnd = handles[0]
-        win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-        
-        return jsonify({
-            'success': True,
-            'hwnd': hwnd,
-            'title': win32gui.GetWindowText(hwnd)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return window_request('minimize')
 
 @app.route('/window/restore', methods=['POST'])
 @require_auth
+@scheduled('input')
 def window_restore():
     """Restore window to normal size"""
+    return window_request('restore')
+
+@app.route('/window/state', methods=['POST'])
+@require_auth
+@scheduled('read')
+def window_state():
+    """Get window state"""
     try:
-        data = request.json
-        title = data.get('title')
-        pid = data.get('pid')
-        
-        # Find window
-        def enum_handler(h, param):
-            if title and title.lower() in win32gui.GetWindowText(h).lower():
-                param.append(h)
-            elif pid:
-                _, window_pid = win32process.GetWindowThreadProcessId(h)
-                if window_pid == pid:
-                    param.append(h)
-            return True
-        
-        handles = []
-        win32gui.EnumWindows(enum_handler, handles)
-        
-        if not handles:
-            return jsonify({'success': False, 'error': 'Window not found'}), 404
+        data = request.json or {}
+        hwnd = find_window(data.get('title'), data.get('pid'), data.get('hwnd'))
         
-        hwnd = handles[0]
-        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+        if hwnd is None:
+            return jsonify({'success': False, 'error': 'Window not found'}), 404
         
         return jsonify({
             'success': True,
             'hwnd': hwnd,
-            'title': win32gui.GetWindowText(hwnd)
+            'title': window_provider.title(hwnd),
+            **window_provider.describe(hwnd)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/window/state', methods=['POST'])
+@app.route('/window/stats', methods=['GET'])
 @require_auth
-def window_state():
-    """Get window state"""
+def window_stats():
+    """Window registry counters"""
+    return jsonify({'success': True, 'registry': window_registry.snapshot()})
+
+# Wait Endpoint
+@app.route('/wait', methods=['POST'])
+@require_auth
+@scheduled('wait')
+def wait_endpoint():
+    """Block until a screen, window or process condition holds
+    
+    Body: {"conditions": [{"type": "window", "title": "Steam", "state": "appears"},
+                          {"type": "pixel", "x": 10, "y": 10, "color": "#00ff00", "tolerance": 8},
+                          {"type": "region_change", "region": [0, 0, 200, 100]},
+                          {"type": "process", "name": "notepad.exe", "state": "exited"}],
+           "timeout": 10}
+    A single condition may be sent as the body itself. Returns as soon as any
+    condition holds; met is false if the timeout passed first.
+    """
     try:
-        data = request.json
-        title = data.get('title')
-        pid = data.get('pid')
-        
-        # Find window
-        def enum_handler(h, param):
-            if title and title.lower() in win32gui.GetWindowText(h).lower():
-                param.append(h)
-            elif pid:
-                _, window_pid = win32process.GetWindowThreadProcessId(h)
-                if window_pid == pid:
-                    param.append(h)
-            return True
-        
-        handles = []
-        win32gui.EnumWindows(enum_handler, handles)
-        
-        if not handles:
-            return jsonify({'success': False, 'error': 'Window not found'}), 404
-        
-        hwnd = handles[0]
-        rect = win32gui.GetWindowRect(hwnd)
-        is_minimized = win32gui.IsIconic(hwnd)
-        is_maximized = win32gui.IsZoomed(hwnd)
+        data = request.json or {}
+        specs = data.get('conditions') or ([data] if 'type' in data else [])
+        conditions = build_conditions(wait_probes, specs)
+        
+        result = wait_for(conditions, timeout=data.get('timeout', DEFAULT_WAIT_TIMEOUT),
+                          interval=data.get('interval'))
+        result['type'] = specs[result['index']]['type'] if result['met'] else None
+        note_stage('wait', 'met' if result['met'] else 'timeout', result['elapsed_ms'] / 1000)
+        return jsonify({'success': True, **result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Batch Endpoint
+BATCH_INPUT_ACTIONS = {
+    'move': do_mouse_move,
+    'click': do_mouse_click,
+    'type': do_keyboard_type,
+    'key': do_keyboard_key
+}
+
+MAX_BATCH_WAIT = 10.0
+
+@app.route('/batch', methods=['POST'])
+@require_auth
+@scheduled('input')
+def batch():
+    """Run an ordered list of actions in one request
+    
+    Body: {"steps": [{"action": "focus", "title": "Steam"},
+                     {"action": "wait", "seconds": 0.2},
+                     {"action": "maximize", "title": "Steam"}],
+           "stop_on_error": true}
+    """
+    try:
+        data = request.json or {}
+        steps = data.get('steps', [])
+        stop_on_error = data.get('stop_on_error', True)
+        
+        # Windows are looked up once per batch, not once per step
+        window_cache = {}
+        results = []
+        batch_start = time.perf_counter()
+        
+        for index, step in enumerate(steps):
+            action = step.get('action')
+            step_start = time.perf_counter()
+            entry = {'index': index, 'action': action}
+            try:
+                if action == 'wait':
+                    time.sleep(min(float(step.get('seconds', 0)), MAX_BATCH_WAIT))
+                    result = {}
+                elif action in BATCH_INPUT_ACTIONS:
+                    result = BATCH_INPUT_ACTIONS[action](step)
+                elif action in WINDOW_ACTIONS:
+                    key = (step.get('title'), step.get('pid'), step.get('hwnd'))
+                    if key not in window_cache:
+                        window_cache[key] = find_window(*key)
+                    hwnd = window_cache[key]
+                    if hwnd is None:
+                        raise LookupError('Window not found')
+                    result = WINDOW_ACTIONS[action](step, hwnd)
+                else:
+                    raise ValueError(f'Unknown action: {action}')
+                entry.update({'success': True, **result})
+            except Exception as e:
+                entry.update({'success': False, 'error': str(e)})
+            step_seconds = time.perf_counter() - step_start
+            entry['elapsed_ms'] = round(step_seconds * 1000, 2)
+            known = action == 'wait' or action in BATCH_INPUT_ACTIONS or action in WINDOW_ACTIONS
+            note_stage('batch', action if known else 'unknown', step_seconds)
+            results.append(entry)
+            
+            if not entry['success'] and stop_on_error:
+                break
         
         return jsonify({
-            'success': True,
-            'hwnd': hwnd,
-            'title': win32gui.GetWindowText(hwnd),
-            'state': 'minimized' if is_minimized else 'maximized' if is_maximized else 'normal',
-            'rect': {
-                'left': rect[0],
-                'top': rect[1],
-                'right': rect[2],
-                'bottom': rect[3],
-                'width': rect[2] - rect[0],
-                'height': rect[3] - rect[1]
-            }
+            'success': len(results) == len(steps) and all(r['success'] for r in results),
+            'results': results,
+            'completed': sum(1 for r in results if r['success']),
+            'total_ms': round((time.perf_counter() - batch_start) * 1000, 2)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Update System Endpoints
+# An update is a zip of the windows-installer *.py files: windows_agent.py
+# imports its sibling modules, so they are always replaced together
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+UPDATE_ARCHIVE = os.path.join(tempfile.gettempdir(), 'windows_agent_update.zip')
+UPDATE_BACKUP = os.path.join(AGENT_DIR, 'update_backup')
+UPDATE_URL = 'https://github.com/your-repo/windows-agent/releases/latest/download/windows-installer.zip'
+
+def update_members(archive):
+    """Module file name -> archive member for the .py files in an update
+
+    Members may sit in a folder (windows-installer/...); anything but .py
+    files is ignored. Raises ValueError unless the archive holds
+    windows_agent.py and every agent module its modules import.
+    """
+    imported = set()
+    with zipfile.ZipFile(archive) as z:
+        members = {}
+        for member in z.namelist():
+            name = member.replace('\\', '/').rsplit('/', 1)[-1]
+            if name.endswith('.py'):
+                members[name] = member
+        if 'windows_agent.py' not in members:
+            raise ValueError('Update has no windows_agent.py')
+        for member in members.values():
+            for node in ast.walk(ast.parse(z.read(member))):
+                if isinstance(node, ast.Import):
+                    imported.update(alias.name.split('.')[0] for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    imported.add(node.module.split('.')[0])
+    # A local module the update imports but lacks would run at the old version
+    missing = sorted(name for name in imported
+                     if os.path.exists(os.path.join(AGENT_DIR, name + '.py')) and name + '.py' not in members)
+    if missing:
+        raise ValueError(f"Update is missing agent modules: {', '.join(missing)}")
+    return members
+
 @app.route('/update/check', methods=['GET'])
 @require_auth
 def update_check():
     """Check for updates from GitHub"""
     try:
-        # GitHub raw URL for the agent file
-        github_url = "https://raw.githubusercontent.com/your-repo/windows-agent/main/windows_agent.py"
-        
         # For now, let's simulate update checking
         # In real implementation, you'd fetch from GitHub and compare versions
         return jsonify({
@@ -673,7 +1312,7 @@ def update_check():
             'current_version': __version__,
             'latest_version': '3.1',  # Simulated
             'update_available': False,
-            'download_url': github_url,
+            'download_url': UPDATE_URL,
             'changelog': {
                 '3.1': 'Added automatic update system',
                 '3.0': 'Added window management features',
@@ -686,21 +1325,18 @@ def update_check():
 @app.route('/update/download', methods=['POST'])
 @require_auth
 def update_download():
-    """Download update to temporary file"""
+    """Download the update archive (a zip of the windows-installer *.py files) to a temporary file"""
     try:
         data = request.json or {}
-        download_url = data.get('url', 'https://raw.githubusercontent.com/your-repo/windows-agent/main/windows_agent.py')
-        
-        # Download to temp file
-        temp_file = os.path.join(tempfile.gettempdir(), 'windows_agent_update.py')
+        download_url = data.get('url', UPDATE_URL)
         
         # Simulate download (in real implementation, download from URL)
-        # urllib.request.urlretrieve(download_url, temp_file)
+        # urllib.request.urlretrieve(download_url, UPDATE_ARCHIVE)
         
         return jsonify({
             'success': True,
-            'temp_file': temp_file,
-            'size': 0,  # os.path.getsize(temp_file)
+            'temp_file': UPDATE_ARCHIVE,
+            'size': 0,  # os.path.getsize(UPDATE_ARCHIVE)
             'message': 'Update downloaded successfully'
         })
     except Exception as e:
@@ -709,31 +1345,40 @@ def update_download():
 @app.route('/update/apply', methods=['POST'])
 @require_auth
 def update_apply():
-    """Apply the downloaded update"""
+    """Apply the downloaded update: back up every agent module, then replace them all and restart"""
     try:
         current_file = os.path.abspath(__file__)
-        backup_file = current_file + '.bak'
-        temp_file = os.path.join(tempfile.gettempdir(), 'windows_agent_update.py')
         
         # Check if update file exists
-        if not os.path.exists(temp_file):
+        if not os.path.exists(UPDATE_ARCHIVE):
             return jsonify({'success': False, 'error': 'No update file found. Download first.'}), 400
+        try:
+            members = update_members(UPDATE_ARCHIVE)
+        except (ValueError, SyntaxError, zipfile.BadZipFile) as e:
+            return jsonify({'success': False, 'error': f'Invalid update: {e}'}), 400
         
-        # Create backup
-        shutil.copy2(current_file, backup_file)
+        # Create backup of the whole package
+        shutil.rmtree(UPDATE_BACKUP, ignore_errors=True)
+        os.makedirs(UPDATE_BACKUP)
+        for name in os.listdir(AGENT_DIR):
+            if name.endswith('.py'):
+                shutil.copy2(os.path.join(AGENT_DIR, name), UPDATE_BACKUP)
         
         # Prepare restart script
         restart_script = f'''
 import os
 import sys
 import time
-import shutil
+import zipfile
 
 # Wait for current process to exit
 time.sleep(2)
 
-# Copy new file
-shutil.copy2(r"{temp_file}", r"{current_file}")
+# Copy new modules
+with zipfile.ZipFile(r"{UPDATE_ARCHIVE}") as z:
+    for name, member in {members!r}.items():
+        with open(os.path.join(r"{AGENT_DIR}", name), 'wb') as f:
+            f.write(z.read(member))
 
 # Start new version
 os.system(f'"{sys.executable}" "{current_file}"')
@@ -756,7 +1401,8 @@ os.system(f'"{sys.executable}" "{current_file}"')
         
         return jsonify({
             'success': True,
-            'message': 'Update applied. Agent will restart in 2 seconds.'
+            'message': f'Update applied ({len(members)} modules). Agent will restart in 2 seconds.',
+            'modules': sorted(members)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -766,15 +1412,11 @@ os.system(f'"{sys.executable}" "{current_file}"')
 def update_status():
     """Get update system status"""
     try:
-        current_file = os.path.abspath(__file__)
-        backup_file = current_file + '.bak'
-        temp_file = os.path.join(tempfile.gettempdir(), 'windows_agent_update.py')
-        
         return jsonify({
             'success': True,
             'current_version': __version__,
-            'backup_exists': os.path.exists(backup_file),
-            'update_pending': os.path.exists(temp_file),
+            'backup_exists': os.path.isdir(UPDATE_BACKUP),
+            'update_pending': os.path.exists(UPDATE_ARCHIVE),
             'auto_update_enabled': True,
             'last_check': datetime.now().isoformat()
         })
@@ -782,12 +1424,13 @@ def update_status():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 def run_server():
-    """Run the Flask server"""
+    """Run the agent server"""
     print("=" * 50)
     print(f"Windows Agent for Claude Code v{__version__}")
     print("=" * 50)
     print(f"Starting on {HOST}:{PORT}")
     print(f"API Token: {API_TOKEN}")
+    print(f"Backend: {backend.name}")
     print(f"Features: {__features__.get(__version__, 'Unknown')}")
     print(f"Listening on ALL interfaces for WSL access")
     print("=" * 50)
@@ -795,8 +1438,24 @@ def run_server():
     # Write agent info for WSL
     write_agent_info()
     
-    # Start Flask server
-    app.run(host=HOST, port=PORT, debug=False)
+    # Start PowerShell hosts in the background so the first command is fast
+    threading.Thread(target=ps_pool.warm, daemon=True).start()
+    
+    # Build the file index in the background, then keep it fresh
+    print(f"Indexing {len(file_index.roots)} roots for /file/search")
+    file_index.start(INDEX_INTERVAL)
+    
+    # Serve with waitress: a real thread pool with keep-alive; the scheduler
+    # decides how requests on those threads interleave
+    try:
+        from waitress import serve
+    except ImportError:
+        print("waitress not installed, falling back to the Flask development server")
+        app.run(host=HOST, port=PORT, debug=False, threaded=True)
+        return
+    
+    print(f"Serving with waitress ({SERVER_THREADS} threads, {READ_SLOTS} read slots)")
+    serve(app, host=HOST, port=PORT, threads=SERVER_THREADS, ident='windows-agent')
 
 if __name__ == '__main__':
     run_server()
\ No newline at end of file
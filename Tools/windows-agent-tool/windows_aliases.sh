@@ -35,4 +35,9 @@ alias winenter='win key enter'
 alias winesc='win key escape'
 alias wintab='win key tab'
 
+# Optional: keep a warm client resident so each alias skips Python and requests
+# startup (`win daemon start`, or uncomment to start it on first use)
+# export WIN_DAEMON=auto
+alias windaemon='win daemon status'
+
 echo "Windows control aliases loaded!"
\ No newline at end of file
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Windows paths on the WSL side
+Maps the paths the agent understands (C:\\..., C:/..., %VAR%\\..., ~\\...)
+to where WSL mounts the same drive (/mnt/c/...), so file operations on the
+host's disks can skip the agent and use local I/O
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional
+
+DEFAULT_MOUNT_ROOT = '/mnt'
+WSL_CONF = '/etc/wsl.conf'
+
+_DRIVE = re.compile(r'^([A-Za-z]):(?:[\\/]|$)')
+_VARIABLE = re.compile(r'%([^%\\/]+)%')
+
+def in_wsl() -> bool:
+    """True when running inside a WSL distribution"""
+    if os.environ.get('WSL_DISTRO_NAME') or os.environ.get('WSL_INTEROP'):
+        return True
+    try:
+        with open('/proc/sys/kernel/osrelease') as f:
+            return 'microsoft' in f.read().lower()
+    except OSError:
+        return False
+
+def mount_root() -> str:
+    """Where drives are mounted: $WIN_WSL_ROOT, the [automount] root in /etc/wsl.conf, or /mnt"""
+    root = os.environ.get('WIN_WSL_ROOT')
+    if root:
+        return root.rstrip('/') or '/'
+    try:
+        with open(WSL_CONF) as f:
+            section = None
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line.startswith('[') and line.endswith(']'):
+                    section = line[1:-1].strip().lower()
+                elif section == 'automount' and '=' in line:
+                    key, value = (part.strip() for part in line.split('=', 1))
+                    if key.lower() == 'root' and value:
+                        return value.strip('"\'').rstrip('/') or '/'
+    except OSError:
+        pass
+    return DEFAULT_MOUNT_ROOT
+
+def expand_windows_path(path: str, env: Dict[str, str]) -> Optional[str]:
+    """Expand %VAR% (names are case-insensitive, as on Windows) and a leading ~
+
+    Returns None when a variable isn't in env, since the result would not
+    be the path the agent would use.
+    """
+    names = {name.upper(): value for name, value in env.items()}
+    if path == '~' or path[:2] in ('~\\', '~/'):
+        if 'USERPROFILE' not in names:
+            return None
+        path = names['USERPROFILE'] + path[1:]
+
+    missing = []
+
+    def substitute(match):
+        value = names.get(match.group(1).upper())
+        if value is None:
+            missing.append(match.group(1))
+            return match.group(0)
+        return value
+
+    expanded = _VARIABLE.sub(substitute, path)
+    return None if missing else expanded
+
+def to_wsl_path(path: str, root: str = DEFAULT_MOUNT_ROOT) -> Optional[str]:
+    """/mnt/<drive>/... for an absolute drive-letter path, None for anything else
+
+    '..' stops at the drive root, as it does on Windows.
+    """
+    match = _DRIVE.match(path)
+    if not match:
+        return None
+    parts = []
+    for part in re.split(r'[\\/]+', path[2:]):
+        if part in ('', '.'):
+            continue
+        if part == '..':
+            if parts:
+                parts.pop()
+            continue
+        parts.append(part)
+    return '/'.join([root.rstrip('/'), match.group(1).lower()] + parts)
+
+class WslPaths:
+    """Translates Windows paths and checks that the mount behind them is usable
+
+    env_loader is called once, the first time a path needs %VAR% or ~, and
+    should return the Windows environment of the agent's user.
+    """
+
+    def __init__(self, env_loader: Optional[Callable[[], Dict[str, str]]] = None,
+                 root: Optional[str] = None):
+        self.root = root or mount_root()
+        self._env_loader = env_loader
+        self._env: Optional[Dict[str, str]] = None
+        self._drives: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def env(self) -> Dict[str, str]:
+        with self._lock:
+            if self._env is None:
+                try:
+                    self._env = dict(self._env_loader()) if self._env_loader else {}
+                except Exception:
+                    self._env = {}
+            return self._env
+
+    def translate(self, path: str) -> Optional[str]:
+        """WSL path for a Windows path, or None if it can't be mapped"""
+        if '%' in path or path.startswith('~'):
+            path = expand_windows_path(path, self.env)
+            if path is None:
+                return None
+        return to_wsl_path(path, self.root)
+
+    def _drive_mounted(self, drive: str) -> bool:
+        with self._lock:
+            if drive not in self._drives:
+                self._drives[drive] = os.path.isdir(os.path.join(self.root, drive))
+            return self._drives[drive]
+
+    def usable(self, path: str, write: bool = False) -> Optional[str]:
+        """WSL path when its drive is mounted and it can be read (or written), else None"""
+        local = self.translate(path)
+        if local is None or not self._drive_mounted(local[len(self.root):].lstrip('/').split('/')[0]):
+            return None
+        if not write:
+            return local if os.access(local, os.R_OK) and not os.path.isdir(local) else None
+        if os.path.isdir(local):
+            return None
+        # The file itself, or the nearest directory that exists on the way to it
+        existing = local
+        while not os.path.exists(existing):
+            existing = os.path.dirname(existing)
+        return local if os.access(existing, os.W_OK) else None
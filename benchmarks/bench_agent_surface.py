@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: every agent endpoint on the simulated backend
+Starts windows_agent.py on the sim backend with no simulated latency, so
+the numbers are the agent's own cost (routing, scheduling, image work,
+serialization). Each request is checked for the expected status and the
+p50/p95 round trip is reported per endpoint.
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from urllib.parse import quote
+
+import requests
+from PIL import Image
+
+from sim_agent import start_sim_agent, API_TOKEN, DEFAULT_LATENCY
+
+def template_png() -> str:
+    """The Steam window's title bar corner on the default sim desktop"""
+    from sim_backend import SimBackend
+    image = SimBackend(latency={}).grab((80, 60, 240, 120))
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def surface(workdir: str):
+    """(name, method, path, body, expected status) for every route worth timing"""
+    path = os.path.join(workdir, 'note.txt')
+    return [
+        ('health', 'GET', '/health', None, 200),
+        ('version', 'GET', '/version', None, 200),
+        ('screenshot', 'POST', '/screenshot', {}, 200),
+        ('screenshot jpeg 1280', 'POST', '/screenshot', {'format': 'jpeg', 'target_width': 1280}, 200),
+        ('screenshot/raw', 'POST', '/screenshot/raw', {}, 200),
+        ('screenshot/raw crop', 'POST', '/screenshot/raw', {'crop': [0, 0, 400, 300]}, 200),
+        ('screenshot/delta', 'POST', '/screenshot/delta', {'session': 'bench'}, 200),
+        ('find/template', 'POST', '/find/template', {'id': 'steam-corner'}, 200),
+        ('mouse/move', 'POST', '/mouse/move', {'x': 10, 'y': 10, 'duration': 0}, 200),
+        ('mouse/click', 'POST', '/mouse/click', {'x': 900, 'y': 1060}, 200),
+        ('keyboard/key', 'POST', '/keyboard/key', {'keys': 'shift'}, 200),
+        ('keyboard/type', 'POST', '/keyboard/type', {'text': 'hello world'}, 200),
+        ('powershell', 'POST', '/powershell', {'command': 'Get-Date'}, 200),
+        ('powershell isolated', 'POST', '/powershell', {'command': 'Get-Date', 'isolated': True}, 200),
+        ('process/list', 'GET', '/process/list', None, 200),
+        ('process/kill (missing)', 'POST', '/process/kill', {'pid': 999999}, 404),
+        ('file/write', 'POST', '/file/write', {'path': path, 'content': 'x' * 4096}, 200),
+        ('file/read', 'POST', '/file/read', {'path': path}, 200),
+        ('file/list', 'POST', '/file/list', {'path': workdir}, 200),
+        ('file/index', 'POST', '/file/index', {'add': [workdir]}, 200),
+        ('file/search', 'POST', '/file/search', {'query': '*.txt'}, 200),
+        ('file/download', 'GET', f'/file/download?path={quote(path)}', None, 200),
+        ('sync/signature', 'POST', '/sync/signature',
+         {'root': workdir, 'files': {'note.txt': {'size': 0, 'mtime': 0}}, 'checksum': True}, 200),
+        ('file/upload', 'POST', f'/file/upload?final=1&path={quote(path)}', {'content': 'x' * 4096}, 200),
+        ('window/list', 'GET', '/window/list', None, 200),
+        ('window/state', 'POST', '/window/state', {'title': 'Spotify'}, 200),
+        ('window/focus', 'POST', '/window/focus', {'title': 'Spotify'}, 200),
+        ('window/state (missing)', 'POST', '/window/state', {'title': 'No Such Window'}, 404),
+        ('wait (met)', 'POST', '/wait', {'type': 'window', 'title': 'Spotify', 'timeout': 1}, 200),
+        ('batch', 'POST', '/batch', {'steps': [{'action': 'focus', 'title': 'Discord'},
+                                               {'action': 'key', 'keys': 'shift'},
+                                               {'action': 'restore', 'title': 'Discord'}]}, 200),
+        ('metrics', 'GET', '/metrics', None, 200),
+        ('scheduler/stats', 'GET', '/scheduler/stats', None, 200),
+        ('powershell/stats', 'GET', '/powershell/stats', None, 200),
+        ('window/stats', 'GET', '/window/stats', None, 200),
+        ('update/status', 'GET', '/update/status', None, 200)
+    ]
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Agent endpoint benchmark on the sim backend')
+    parser.add_argument('-n', '--requests', type=int, default=20, help='Requests per endpoint (default: 20)')
+    args = parser.parse_args()
+
+    agent, info = start_sim_agent(latency={op: 0 for op in DEFAULT_LATENCY})
+    base = f"http://{info['host']}:{info['port']}"
+    session = requests.Session()
+    session.headers['Authorization'] = f'Bearer {API_TOKEN}'
+    failures = []
+    try:
+        session.post(f'{base}/find/template/register', json={'id': 'steam-corner', 'image': template_png()})
+        with tempfile.TemporaryDirectory() as workdir:
+            print(f"{'endpoint':26} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>9}")
+            for name, method, path, body, expected in surface(workdir):
+                samples = []
+                size = 0
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    response = session.request(method, base + path, json=body)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    size = len(response.content)
+                    if response.status_code != expected:
+                        failures.append(f"{name}: {response.status_code} (expected {expected}) "
+                                        f"{response.text[:120]}")
+                        break
+                print(f"{name:26} {statistics.median(samples):8.2f} {percentile(samples, 95):8.2f} {size:9}")
+    finally:
+        agent.shutdown()
+
+    if failures:
+        print("\nUnexpected responses:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\nAll {len(surface('.'))} endpoints answered as expected")
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'Tools', 'windows-agent-tool', 'windows-installer'))
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential WindowsControl vs AsyncWindowsControl
+Runs the same multi-call workflow (screenshot + window list + process list
++ window state) against the simulated agent and reports the speedup
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from windows_control import WindowsControl
+from async_windows_control import AsyncWindowsControl
+from sim_agent import start_sim_agent
+
+def run_sync(info, rounds: int) -> float:
+    win = WindowsControl(agent_info=info)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        win.screenshot()
+        win.list_windows()
+        win.processes()
+        win.window_state(title="Steam")
+    elapsed = time.perf_counter() - start
+    win.close()
+    return elapsed
+
+async def run_async(info, rounds: int, concurrency: int) -> float:
+    async with AsyncWindowsControl(max_concurrency=concurrency, agent_info=info) as win:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await asyncio.gather(
+                win.screenshot(),
+                win.list_windows(),
+                win.processes(),
+                win.window_state(title="Steam")
+            )
+        return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Async client benchmark')
+    parser.add_argument('-r', '--rounds', type=int, default=10, help='Workflow repetitions (default: 10)')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='Async concurrency limit (default: 4)')
+    args = parser.parse_args()
+
+    server, info = start_sim_agent()
+    try:
+        sync_time = run_sync(info, args.rounds)
+        async_time = asyncio.run(run_async(info, args.rounds, args.concurrency))
+    finally:
+        server.shutdown()
+
+    print(f"Workflow: screenshot + list_windows + processes + window_state, {args.rounds} rounds")
+    print(f"  sync : {sync_time:.3f}s ({sync_time / args.rounds * 1000:.1f} ms/round)")
+    print(f"  async: {async_time:.3f}s ({async_time / args.rounds * 1000:.1f} ms/round)")
+    print(f"  speedup: {sync_time / async_time:.2f}x")
+
+if __name__ == '__main__':
+    main()
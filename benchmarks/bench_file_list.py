@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: listing a large game library through /file/list
+Builds a Steam-like tree (default 50k files) and lists all of it against a
+simulated agent: one request per directory as a client had to before
+recursion existed, one recursive JSON reply, cursor pages and the NDJSON
+stream. Also times the old listdir + stat + isdir loop against one
+scandir pass in-process, the part the agent saves per directory.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from windows_control import WindowsControl
+from sim_agent import start_sim_agent
+
+def build_library(root: str, files: int, games: int = 50):
+    """steamapps/common/<game>/<dirs>/<files>, about files in total"""
+    per_game = files // games
+    for game in range(games):
+        for i in range(per_game):
+            directory = os.path.join(root, 'steamapps', 'common', f'Game {game:02}', f'data{i % 10}', f'pak{i % 7}')
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f'asset{i:05}.{("pak", "dll", "bin")[i % 3]}'), 'wb') as f:
+                f.write(b'\0' * (i * 37 % 4096))
+
+def listdir_stat(path: str) -> int:
+    """What /file/list did per directory before: listdir, then stat and isdir for each entry"""
+    count = 0
+    for name in os.listdir(path):
+        item = os.path.join(path, name)
+        stat = os.stat(item)
+        is_dir = os.path.isdir(item)
+        count += 1
+        if is_dir:
+            count += listdir_stat(item)
+    return count
+
+def scandir_once(path: str) -> int:
+    count = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            entry.stat()
+            count += 1
+            if entry.is_dir(follow_symlinks=False):
+                count += scandir_once(entry.path)
+    return count
+
+def per_directory(win: WindowsControl, root: str) -> int:
+    count = 0
+    pending = [root]
+    while pending:
+        items = win.list_files(pending.pop())['items']
+        count += len(items)
+        pending.extend(item['path'] for item in items if item['is_dir'])
+    return count
+
+def paged(win: WindowsControl, root: str, limit: int) -> int:
+    count = 0
+    cursor = None
+    while True:
+        page = win.list_files(root, recursive=True, limit=limit, cursor=cursor)
+        count += page['count']
+        cursor = page['next_cursor']
+        if not cursor:
+            return count
+
+def timed(name: str, fn, expected: int):
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    flag = '' if count == expected else f'  (got {count}, expected {expected})'
+    print(f"{name:34} {elapsed * 1000:9.0f} ms {count / elapsed:10.0f} entries/s{flag}")
+    return count == expected
+
+def main():
+    parser = argparse.ArgumentParser(description='/file/list benchmark on a large tree')
+    parser.add_argument('-n', '--files', type=int, default=50000, help='Files in the tree (default: 50000)')
+    parser.add_argument('--page', type=int, default=5000, help='Entries per page (default: 5000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_library(root, args.files)
+        expected = sum(len(dirs) + len(files) for _, dirs, files in os.walk(root))
+        print(f"{expected} entries\n")
+
+        ok = timed('in-process listdir + stat + isdir', lambda: listdir_stat(root), expected)
+        ok &= timed('in-process scandir', lambda: scandir_once(root), expected)
+
+        agent, info = start_sim_agent()
+        win = WindowsControl(agent_info=info, direct_fs=False)
+        try:
+            ok &= timed('one request per directory', lambda: per_directory(win, root), expected)
+            ok &= timed('recursive, one JSON reply', lambda: win.list_files(root, recursive=True)['count'], expected)
+            ok &= timed(f'recursive, pages of {args.page}', lambda: paged(win, root, args.page), expected)
+            ok &= timed('recursive, NDJSON stream', lambda: sum(1 for _ in win.iter_files(root, recursive=True)),
+                        expected)
+            timed('filtered on agent (*.dll >= 512 B)',
+                  lambda: win.list_files(root, recursive=True, extensions=['dll'], min_size=512)['count'],
+                  sum(1 for d, _, names in os.walk(root) for name in names
+                      if name.endswith('.dll') and os.path.getsize(os.path.join(d, name)) >= 512))
+        finally:
+            win.close()
+            agent.shutdown()
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: finding a file by name with /file/search vs walking for it
+Indexes a Steam-like tree (default 50k files, the same one bench_file_list
+builds) on a simulated agent and looks names up through the index with a
+glob and a substring, next to a recursive /file/list with the same glob
+(the walk a PowerShell Get-ChildItem -Recurse does per lookup). Also times
+the first build, a refresh with nothing changed, one after a few
+directories changed and a full rebuild.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from windows_control import WindowsControl
+from sim_agent import start_sim_agent
+from bench_file_list import build_library
+
+def latency(fn, rounds: int):
+    """p50 and max in ms, plus the last result"""
+    times = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description='/file/search benchmark on a large tree')
+    parser.add_argument('-n', '--files', type=int, default=50000, help='Files in the tree (default: 50000)')
+    parser.add_argument('-r', '--rounds', type=int, default=20, help='Searches per query (default: 20)')
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as root:
+        build_library(root, args.files)
+        game = os.path.join(root, 'steamapps', 'common', 'Game 07')
+        with open(os.path.join(game, 'Game07.exe'), 'wb') as f:
+            f.write(b'MZ')
+        # Lowercasing 'İ' adds a code point, so names after this one are
+        # where an offset bug would show
+        downloads = os.path.join(root, 'İndirilenler')
+        os.makedirs(os.path.join(downloads, 'k'))
+        for name in ('İ' * 20 + '.txt', os.path.join('k', 'kurulum.msi')):
+            with open(os.path.join(downloads, name), 'w') as f:
+                f.write('x')
+        expected = sum(len(dirs) + len(files) for _, dirs, files in os.walk(root))
+
+        agent, info = start_sim_agent()
+        win = WindowsControl(agent_info=info, direct_fs=False)
+        try:
+            status = win.file_index(add=[root])
+            print(f"{status['entries']} entries in {status['directories']} directories; "
+                  f"first build {status['last_refresh_ms']:.0f} ms")
+            ok &= status['entries'] == expected
+
+            print(f"\n{'lookup':40} {'p50 ms':>9} {'max ms':>9} {'found':>6}")
+            lookups = [
+                ('search, glob game07.exe', lambda: win.find_files('Game07.exe'), 1),
+                ('search, glob *.exe', lambda: win.find_files('*.exe'), 1),
+                ('search, substring "07.e"', lambda: win.find_files('07.e'), 1),
+                ('search, asset0001?.dll under Game 07', lambda: win.find_files('asset0001?.dll', under=game), 4),
+                ('recursive /file/list, pattern Game07.exe',
+                 lambda: win.list_files(root, recursive=True, pattern='Game07.exe')['items'], 1)
+            ]
+            for name, fn, found in lookups:
+                p50, worst, result = latency(fn, args.rounds if name.startswith('search') else 3)
+                flag = '' if len(result) == found else f'  (expected {found})'
+                ok &= len(result) == found
+                print(f"{name:40} {p50:9.2f} {worst:9.2f} {len(result):6}{flag}")
+
+            names = [m['name'] for m in win.find_files('k', type='dir', mode='glob')]
+            names += [m['name'] for m in win.find_files('kurulum.msi')]
+            names += [m['name'] for m in win.find_files('ndirilen', mode='substring')]
+            ok &= names == ['k', 'kurulum.msi', 'İndirilenler']
+            print(f"\nnames after a lowercased 'İ': {names}")
+
+            print(f"\n{'refresh':40} {'ms':>9} {'scanned':>9} {'reused':>7}")
+            rounds = [('nothing changed', False, None), ('5 directories changed', False, 5),
+                      ('full rebuild', True, None)]
+            for name, full, touched in rounds:
+                for i in range(touched or 0):
+                    directory = os.path.join(root, 'steamapps', 'common', f'Game {i:02}', 'data0')
+                    with open(os.path.join(directory, 'patch.txt'), 'w') as f:
+                        f.write('updated')
+                status = win.file_index(refresh=True, full=full)
+                print(f"{name:40} {status['last_refresh_ms']:9.1f} {status['last_scanned']:9} "
+                      f"{status['last_reused']:7}")
+            found = win.find_files('patch.txt')
+            ok &= len(found) == 5
+            print(f"\npatch.txt found after refresh: {len(found)}")
+        finally:
+            win.close()
+            agent.shutdown()
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
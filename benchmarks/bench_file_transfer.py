@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streamed file transfer vs the JSON /file/read and /file/write path
+Moves one large text file each way through a simulated agent, first with
+download()/upload() and then with read_file()/write_file(), and reports
+throughput, the client's peak Python allocation (tracemalloc) and how far
+the agent's resident memory rose above where it started. The streamed runs
+go first, since the agent's allocator rarely gives memory back.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import psutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from windows_control import WindowsControl
+from sim_agent import start_sim_agent
+
+MB = 1024 * 1024
+
+class PeakRSS:
+    """Highest resident size of a process while the block runs"""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def make_payload(path: str, size_mb: int):
+    """Printable ASCII, so the JSON text path can carry it too"""
+    line = (b'0123456789abcdefghijklmnopqrstuvwxyz' * 3)[:99] + b'\n'
+    block = line * (MB // len(line))
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+def measure(name: str, fn, size: int, agent_pid: int, baseline: int):
+    tracemalloc.start()
+    with PeakRSS(agent_pid) as rss:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+    _, client_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:22} {elapsed * 1000:9.0f} {size / MB / elapsed:8.1f} "
+          f"{client_peak / MB:10.1f} {max(0, rss.peak - baseline) / MB:10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Streamed vs JSON file transfer benchmark')
+    parser.add_argument('-s', '--size', type=int, default=64, help='File size in MB (default: 64)')
+    args = parser.parse_args()
+
+    agent, info = start_sim_agent()
+    client = WindowsControl(agent_info=info)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            source = os.path.join(workdir, 'source.txt')
+            make_payload(source, args.size)
+            size = os.path.getsize(source)
+            remote = os.path.join(workdir, 'remote', 'file.txt')
+            local = os.path.join(workdir, 'local.txt')
+            baseline = psutil.Process(agent.process.pid).memory_info().rss
+
+            def json_upload():
+                with open(source, encoding='utf-8') as f:
+                    client.write_file(remote, f.read())
+
+            def json_download():
+                with open(local, 'w', encoding='utf-8') as f:
+                    f.write(client.read_file(remote))
+
+            print(f"{args.size} MB each way; agent RSS {baseline / MB:.1f} MB at start\n")
+            print(f"{'transfer':22} {'ms':>9} {'MB/s':>8} {'client MB':>10} {'agent +MB':>10}")
+            runs = [
+                ('upload (streamed)', lambda: client.upload(source, remote)),
+                ('download (streamed)', lambda: client.download(remote, local)),
+                ('write_file (JSON)', json_upload),
+                ('read_file (JSON)', json_download)
+            ]
+            for name, fn in runs:
+                measure(name, fn, size, agent.process.pid, baseline)
+                if os.path.getsize(local if 'download' in name or 'read' in name else remote) != size:
+                    print(f"  {name}: size mismatch")
+                    sys.exit(1)
+    finally:
+        client.close()
+        agent.shutdown()
+
+if __name__ == '__main__':
+    main()
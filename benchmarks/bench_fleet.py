@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: WindowsFleet fan-out vs one host after another
+Starts several simulated agents (plus one that answers too slowly and one
+that is down), runs screenshot and PowerShell on all of them, and checks
+that the slow and dead hosts fail on their own without holding up the rest,
+then or in the next call
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from windows_control import WindowsControl
+from windows_fleet import WindowsFleet, host_failed
+from sim_agent import start_sim_agent
+
+# The simulated agents share this machine's CPUs; full-frame PNG encoding
+# would make the benchmark measure the CPU instead of the fan-out
+THUMBNAIL_WIDTH = 640
+
+def sequential(agents, rounds: int) -> float:
+    clients = [WindowsControl(agent_info=info) for info in agents.values()]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for client in clients:
+            client.screenshot_bytes(target_width=THUMBNAIL_WIDTH)
+            client.powershell('Get-Date')
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.close()
+    return elapsed
+
+def fanned_out(fleet: WindowsFleet, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fleet.call('screenshot_bytes', target_width=THUMBNAIL_WIDTH)
+        fleet.powershell('Get-Date')
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Fleet fan-out benchmark')
+    parser.add_argument('-n', '--hosts', type=int, default=8, help='Healthy simulated agents (default: 8)')
+    parser.add_argument('-r', '--rounds', type=int, default=5, help='Repetitions (default: 5)')
+    args = parser.parse_args()
+
+    servers = []
+    agents = {}
+    for i in range(args.hosts):
+        server, info = start_sim_agent()
+        servers.append(server)
+        agents[f'pc-{i}'] = info
+
+    # One host far slower than the per-host timeout, one that is not running
+    slow_server, slow_info = start_sim_agent(latency={'powershell': 5.0})
+    servers.append(slow_server)
+    dead_server, dead_info = start_sim_agent()
+    dead_server.shutdown()
+
+    try:
+        sequential_time = sequential(agents, args.rounds)
+        with WindowsFleet(agents=agents) as fleet:
+            fleet.health()
+            fan_out_time = fanned_out(fleet, args.rounds)
+
+        print(f"Workflow: screenshot thumbnail + powershell on {args.hosts} hosts, {args.rounds} rounds")
+        print(f"  one by one: {sequential_time:.3f}s ({sequential_time / args.rounds * 1000:.1f} ms/round)")
+        print(f"  fan-out   : {fan_out_time:.3f}s ({fan_out_time / args.rounds * 1000:.1f} ms/round)")
+        print(f"  speedup   : {sequential_time / fan_out_time:.2f}x")
+
+        mixed = dict(agents, slow=slow_info, down=dead_info)
+        with WindowsFleet(agents=mixed, timeout=1.0, retries=0) as fleet:
+            start = time.perf_counter()
+            results = fleet.powershell('Get-Date')
+            elapsed = time.perf_counter() - start
+            with tempfile.TemporaryDirectory() as directory:
+                shots = fleet.screenshot_all(directory, hosts=list(agents), target_width=THUMBNAIL_WIDTH)
+                saved = sum(not host_failed(r) for r in shots.values())
+
+        # A timed-out call must not keep the fan-out's only thread busy for the next one
+        with WindowsFleet(agents={'slow': slow_info}, timeout=1.0, retries=0, max_workers=1) as fleet:
+            fleet.powershell('Get-Date')
+            after_timeout = fleet.health(timeout=1.0)['slow']
+
+        failed = sorted(name for name, r in results.items() if host_failed(r))
+        print(f"\nPartial failure: {len(mixed)} hosts, 1s per-host timeout")
+        print(f"  finished in {elapsed:.2f}s, failed: {', '.join(failed)}")
+        for name in failed:
+            print(f"    {name}: {results[name].get('error') or results[name]['result'].get('error')}")
+        print(f"  screenshots saved: {saved}/{len(agents)}")
+        print(f"  next call on a host that just timed out: {'ok' if not host_failed(after_timeout) else 'FAILED'} "
+              f"({after_timeout['elapsed_ms']:.0f} ms)")
+        assert failed == ['down', 'slow'], failed
+        assert elapsed < 2.0
+        assert saved == len(agents)
+        assert not host_failed(after_timeout), after_timeout
+    finally:
+        for server in servers:
+            server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Load test: mixed traffic from concurrent clients against the agent
+Each client streams screenshots at --fps, sends bursts of clicks and keys,
+looks up windows, lists processes and reads a file. Reports throughput and
+p50/p95/p99 latency (round trip and the agent's own Server-Timing) per
+endpoint, plus agent CPU and memory, and writes everything to JSON.
+`--compare old.json` flags endpoints that got slower, so runs across agent
+versions can be diffed in CI.
+
+By default a simulated agent (windows_agent.py on the sim backend) is
+started; --info points the test at a running agent instead.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from sim_agent import start_sim_agent, DEFAULT_LATENCY
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# p95 up by more than this fraction, and by at least REGRESSION_FLOOR_MS, counts as a regression
+REGRESSION_THRESHOLD = 0.20
+REGRESSION_FLOOR_MS = 5.0
+
+class Stream:
+    """One kind of traffic: `burst` requests sent back to back, `rate` bursts per second"""
+
+    def __init__(self, name: str, rate: float, requests_: List[tuple], burst: int = 1):
+        self.name = name
+        self.rate = rate
+        self.requests = requests_
+        self.burst = burst
+
+def traffic(args, file_path: str) -> List[Stream]:
+    """The per-client mix"""
+    screenshot = {'format': args.screenshot_format}
+    if args.screenshot_width:
+        screenshot['target_width'] = args.screenshot_width
+    streams = [
+        Stream('screenshot', args.fps, [('POST', '/screenshot/raw', screenshot)]),
+        Stream('input burst', 1 / args.burst_interval, [
+            ('POST', '/mouse/click', {'x': 960, 'y': 1060}),
+            ('POST', '/keyboard/key', {'keys': 'shift'})
+        ], burst=args.burst),
+        Stream('window lookup', 2.0, [('POST', '/window/state', {'title': 'Steam'})]),
+        Stream('window list', 0.5, [('GET', '/window/list', None)]),
+        Stream('process list', 0.5, [('GET', '/process/list', None)]),
+        Stream('file read', 2.0, [('POST', '/file/read', {'path': file_path})])
+    ]
+    return [s for s in streams if s.rate > 0]
+
+class Recorder:
+    """Per-endpoint samples shared by all client threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints: Dict[str, Dict[str, list]] = {}
+        self.streams: Dict[str, int] = {}
+
+    def record(self, endpoint: str, total_ms: float, server_ms: Optional[float], size: int, ok: bool):
+        with self.lock:
+            entry = self.endpoints.setdefault(endpoint, {'total': [], 'server': [], 'bytes': 0, 'errors': 0})
+            entry['total'].append(total_ms)
+            if server_ms is not None:
+                entry['server'].append(server_ms)
+            entry['bytes'] += size
+            if not ok:
+                entry['errors'] += 1
+
+    def count_burst(self, stream: str):
+        with self.lock:
+            self.streams[stream] = self.streams.get(stream, 0) + 1
+
+def server_ms(response) -> Optional[float]:
+    """The agent's own handling time from Server-Timing (app;dur=...)"""
+    for part in response.headers.get('Server-Timing', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name == 'app' and params.startswith('dur='):
+            return float(params[4:])
+    return None
+
+def client(base: str, token: str, streams: List[Stream], start: float, end: float, recorder: Recorder):
+    """One client: send each stream at its rate until end (falling behind never builds a backlog)"""
+    session = requests.Session()
+    session.headers['Authorization'] = f'Bearer {token}'
+    # Stagger clients so their streams don't fire in lockstep
+    due = {stream: start + random.uniform(0, 1 / stream.rate) for stream in streams}
+    turn = {stream: 0 for stream in streams}
+
+    while True:
+        stream = min(due, key=due.get)
+        now = time.perf_counter()
+        if due[stream] >= end:
+            break
+        if due[stream] > now:
+            time.sleep(due[stream] - now)
+
+        for _ in range(stream.burst):
+            method, path, body = stream.requests[turn[stream] % len(stream.requests)]
+            turn[stream] += 1
+            sent = time.perf_counter()
+            try:
+                response = session.request(method, base + path, json=body, timeout=30)
+                recorder.record(path, (time.perf_counter() - sent) * 1000, server_ms(response),
+                                len(response.content), response.ok)
+            except requests.RequestException:
+                recorder.record(path, (time.perf_counter() - sent) * 1000, None, 0, False)
+        recorder.count_burst(stream.name)
+
+        interval = 1 / stream.rate
+        due[stream] = max(due[stream] + interval, time.perf_counter() - interval)
+    session.close()
+
+class ResourceSampler:
+    """CPU and resident memory of the agent process, sampled in the background"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        import psutil
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.cpu: List[float] = []
+        self.rss: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        self.process.cpu_percent(None)
+        while not self._stop.wait(self.interval):
+            try:
+                self.cpu.append(self.process.cpu_percent(None))
+                self.rss.append(self.process.memory_info().rss)
+            except Exception:
+                break
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Dict:
+        self._stop.set()
+        self._thread.join()
+        if not self.cpu:
+            return {}
+        mb = 1024 * 1024
+        return {
+            'cpu_percent_avg': round(sum(self.cpu) / len(self.cpu), 1),
+            'cpu_percent_max': round(max(self.cpu), 1),
+            'rss_mb_start': round(self.rss[0] / mb, 1),
+            'rss_mb_end': round(self.rss[-1] / mb, 1),
+            'rss_mb_max': round(max(self.rss) / mb, 1)
+        }
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def summarize(recorder: Recorder, duration: float) -> Dict:
+    endpoints = {}
+    for endpoint, entry in sorted(recorder.endpoints.items()):
+        total = entry['total']
+        summary = {
+            'requests': len(total),
+            'errors': entry['errors'],
+            'throughput': round(len(total) / duration, 2),
+            'mb_per_s': round(entry['bytes'] / duration / (1024 * 1024), 3)
+        }
+        for q, key in ((0.5, 'p50'), (0.95, 'p95'), (0.99, 'p99')):
+            summary[f'{key}_ms'] = round(percentile(total, q), 2)
+        summary['max_ms'] = round(max(total), 2)
+        if entry['server']:
+            summary['server_p50_ms'] = round(percentile(entry['server'], 0.5), 2)
+            summary['server_p95_ms'] = round(percentile(entry['server'], 0.95), 2)
+        endpoints[endpoint] = summary
+    requests_total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'endpoints': endpoints,
+        'totals': {
+            'requests': requests_total,
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'throughput': round(requests_total / duration, 2)
+        }
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_report(result: Dict):
+    config = result['config']
+    print(f"{config['clients']} clients x {config['duration']}s against {result['agent'].get('backend', '?')} "
+          f"agent v{result['agent'].get('version', '?')}: {config['fps']} fps screenshots, "
+          f"bursts of {config['burst']} inputs every {config['burst_interval']}s")
+    print(f"{'endpoint':18} {'req':>6} {'err':>4} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'max':>8} {'agent p50':>10}")
+    for endpoint, e in result['endpoints'].items():
+        print(f"{endpoint:18} {e['requests']:6} {e['errors']:4} {e['throughput']:7.1f} {e['p50_ms']:8.1f} "
+              f"{e['p95_ms']:8.1f} {e['p99_ms']:8.1f} {e['max_ms']:8.1f} {e.get('server_p50_ms', 0):10.1f}")
+    totals = result['totals']
+    print(f"Total: {totals['requests']} requests, {totals['errors']} errors, {totals['throughput']:.1f} req/s")
+    achieved = result['achieved_fps']
+    print(f"Screenshots: {achieved:.1f} fps per client achieved (target {config['fps']})")
+    server = result.get('server')
+    if server:
+        print(f"Agent: CPU avg {server['cpu_percent_avg']}% max {server['cpu_percent_max']}%, "
+              f"RSS {server['rss_mb_start']} -> {server['rss_mb_end']} MB (max {server['rss_mb_max']})")
+
+def compare(result: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Endpoints whose p95 or error count got worse than the baseline"""
+    regressions = []
+    print(f"\nAgainst {baseline.get('git') or '?'} ({baseline.get('timestamp', '?')}):")
+    print(f"{'endpoint':18} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'req/s before':>13} {'req/s now':>10}")
+    for endpoint, now in result['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if not before:
+            continue
+        change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        slower = change > threshold and now['p95_ms'] - before['p95_ms'] > REGRESSION_FLOOR_MS
+        failing = now['errors'] > before['errors']
+        flag = '  REGRESSION' if slower or failing else ''
+        print(f"{endpoint:18} {before['p95_ms']:11.1f} {now['p95_ms']:9.1f} {change * 100:+7.0f}% "
+              f"{before['throughput']:13.1f} {now['throughput']:10.1f}{flag}")
+        if slower:
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if failing:
+            regressions.append(f"{endpoint}: errors {before['errors']} -> {now['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed-traffic load test for the agent API')
+    parser.add_argument('-c', '--clients', type=int, default=4, help='Concurrent clients (default: 4)')
+    parser.add_argument('-d', '--duration', type=float, default=20.0, help='Seconds of traffic (default: 20)')
+    parser.add_argument('--fps', type=float, default=2.0, help='Screenshots per second per client (default: 2)')
+    parser.add_argument('--screenshot-format', default='jpeg', help='Screenshot format (default: jpeg)')
+    parser.add_argument('--screenshot-width', type=int, help='Scale screenshots to this width')
+    parser.add_argument('--burst', type=int, default=10, help='Clicks/keys per input burst (default: 10)')
+    parser.add_argument('--burst-interval', type=float, default=2.0, help='Seconds between bursts (default: 2)')
+    parser.add_argument('--latency', choices=['desktop', 'off'], default='desktop',
+                        help='Simulated agent: realistic operation delays or none (default: desktop)')
+    parser.add_argument('--info', help='Agent info file of a running agent instead of a simulated one')
+    parser.add_argument('--pid', type=int, help='PID of that agent, for CPU/memory sampling')
+    parser.add_argument('-o', '--output', help=f'Result JSON path (default: {RESULTS_DIR}/load-<time>.json)')
+    parser.add_argument('--compare', help='Earlier result JSON; exit 1 if any endpoint regressed')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f'Relative p95 increase that counts as a regression (default: {REGRESSION_THRESHOLD})')
+    args = parser.parse_args()
+
+    agent = None
+    if args.info:
+        with open(args.info) as f:
+            info = json.load(f)
+        pid = args.pid
+        file_path = r'%TEMP%\sekizos_load_test.txt'
+    else:
+        latency = {op: 0 for op in DEFAULT_LATENCY} if args.latency == 'off' else None
+        agent, info = start_sim_agent(latency=latency)
+        pid = agent.process.pid
+        file_path = os.path.join(tempfile.gettempdir(), f'sekizos_load_test_{os.getpid()}.txt')
+
+    base = f"http://{info['host']}:{info['port']}"
+    headers = {'Authorization': f"Bearer {info['token']}"}
+    recorder = Recorder()
+    try:
+        agent_info = requests.get(f'{base}/health', timeout=5).json()
+        requests.post(f'{base}/file/write', json={'path': file_path, 'content': 'line of a log file\n' * 2000},
+                      headers=headers, timeout=10)
+        streams = traffic(args, file_path)
+
+        sampler = ResourceSampler(pid) if pid else None
+        if sampler:
+            sampler.start()
+        start = time.perf_counter() + 0.1
+        end = start + args.duration
+        threads = [threading.Thread(target=client, args=(base, info['token'], streams, start, end, recorder))
+                   for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+        server = sampler.stop() if sampler else {}
+        requests.post(f'{base}/file/delete', json={'path': file_path}, headers=headers, timeout=10)
+    finally:
+        if agent:
+            agent.shutdown()
+
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'agent': {'version': agent_info.get('version'), 'backend': agent_info.get('backend', 'win32'),
+                  'simulated_latency': None if args.info else args.latency},
+        'config': {'clients': args.clients, 'duration': args.duration, 'fps': args.fps,
+                   'screenshot_format': args.screenshot_format, 'screenshot_width': args.screenshot_width,
+                   'burst': args.burst, 'burst_interval': args.burst_interval},
+        **summarize(recorder, duration),
+        'achieved_fps': round(recorder.streams.get('screenshot', 0) / duration / args.clients, 2),
+        'server': server
+    }
+    print_report(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == '__main__':
+    main()
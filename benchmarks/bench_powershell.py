@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: spawn-per-call PowerShell vs the pooled PowerShell hosts
+Uses fake_powershell.py so it runs on Linux; FAKE_PS_STARTUP sets the
+simulated powershell.exe start-up cost. Before timing, checks that console
+output around a reply (Write-Host, a native exe) and exit don't break the
+pooled host's replies, and that a command waiting for a full pool gets the
+slot a timed-out host frees.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'Tools', 'windows-agent-tool', 'windows-installer'))
+
+from powershell_host import PowerShellPool, run_powershell_once
+
+FAKE_PS = [sys.executable, os.path.join(HERE, 'fake_powershell.py')]
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {label:8} total {sum(samples):8.1f} ms   mean {statistics.mean(samples):7.1f} ms   "
+          f"p95 {p95:7.1f} ms")
+
+# Command, expected stdout, stderr and returncode
+PROTOCOL_CHECKS = [
+    ('Write-Host hello', 'hello\n', '', 0),
+    ('cmd /c echo native', 'native\n', '', 0),
+    ('Write-Warning low disk', '', 'WARNING: low disk\n', 0),
+    ('Get-Date', 'Get-Date\n', '', 0),
+    ('exit 3', '', '', 3),
+    ('Get-Location', 'Get-Location\n', '', 0)
+]
+
+def check_protocol(host_args) -> bool:
+    """Replies stay in step with commands whatever else the host prints"""
+    pool = PowerShellPool(size=1, host_args=host_args)
+    ok = True
+    try:
+        for command, stdout, stderr, returncode in PROTOCOL_CHECKS:
+            reply = pool.execute(command, timeout=10)
+            if (reply['stdout'], reply['stderr'], reply['returncode']) != (stdout, stderr, returncode):
+                print(f"  {command!r}: got {reply['stdout']!r}, {reply['stderr']!r} rc {reply['returncode']}")
+                ok = False
+        stats = pool.snapshot()
+        if stats['host_errors'] or stats['spawned'] != 1:
+            print(f"  host was replaced: {stats}")
+            ok = False
+    finally:
+        pool.close()
+    print(f"Protocol checks: {'ok' if ok else 'FAILED'}")
+    return ok
+
+def check_handoff(host_args) -> bool:
+    """A waiter takes over the slot of a host killed for timing out"""
+    pool = PowerShellPool(size=1, host_args=host_args)
+    results = {}
+
+    def run(name, command, timeout):
+        start = time.perf_counter()
+        try:
+            pool.execute(command, timeout=timeout)
+            results[name] = ('ok', time.perf_counter() - start)
+        except Exception as e:
+            results[name] = (type(e).__name__, time.perf_counter() - start)
+    try:
+        slow = threading.Thread(target=run, args=('slow', 'Start-Sleep 5', 1.0))
+        slow.start()
+        time.sleep(0.5)
+        run('waiter', 'Get-Date', 5.0)
+        slow.join()
+    finally:
+        pool.close()
+    outcome, waited = results['waiter']
+    ok = results['slow'][0] == 'TimeoutError' and outcome == 'ok' and waited < 3
+    print(f"Handoff after a timeout: {'ok' if ok else 'FAILED'} "
+          f"(waiter {outcome} after {waited:.1f}s)")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='PowerShell host benchmark')
+    parser.add_argument('-n', '--commands', type=int, default=20, help='Commands to run (default: 20)')
+    parser.add_argument('--max-commands', type=int, default=200, help='Recycle pooled hosts after N commands')
+    args = parser.parse_args()
+    if not check_protocol(FAKE_PS + ['--host']) or not check_handoff(FAKE_PS + ['--host']):
+        sys.exit(1)
+
+    spawned = []
+    for i in range(args.commands):
+        start = time.perf_counter()
+        run_powershell_once(f'Get-Process -Id {i}', once_args=FAKE_PS + ['-Command'])
+        spawned.append((time.perf_counter() - start) * 1000)
+
+    pool = PowerShellPool(size=1, max_commands=args.max_commands, host_args=FAKE_PS + ['--host'])
+    pool.warm()
+    pooled = []
+    for i in range(args.commands):
+        start = time.perf_counter()
+        pool.execute(f'Get-Process -Id {i}')
+        pooled.append((time.perf_counter() - start) * 1000)
+    stats = pool.snapshot()
+    pool.close()
+
+    print(f"{args.commands} commands, simulated start-up {os.environ.get('FAKE_PS_STARTUP', '0.35')}s")
+    summarize('spawned', spawned)
+    summarize('pooled', pooled)
+    print(f"  speedup {sum(spawned) / sum(pooled):.1f}x  (pool: {stats})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: agent request scheduler
+Simulates concurrent clients against the scheduler lanes: typed text must
+not interleave, clicks must not wait behind slow reads, and higher
+priority input must jump the queue
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Tools', 'windows-agent-tool', 'windows-installer'))
+
+from scheduler import Scheduler, PRIORITY_HIGH, PRIORITY_LOW
+
+def type_text(slot, log, text, delay):
+    """Type text one key event at a time inside the given slot"""
+    with slot():
+        for char in text:
+            log.append(char)
+            time.sleep(delay)
+
+def interleaving(scheduled, clients, chars):
+    scheduler = Scheduler()
+    slot = (lambda: scheduler.slot('input')) if scheduled else nullcontext
+    log = []
+    threads = [threading.Thread(target=type_text, args=(slot, log, chr(ord('a') + i) * chars, 0.001))
+               for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Each switch between clients mid-text is one interleaving
+    return sum(1 for a, b in zip(log, log[1:]) if a != b) - (clients - 1)
+
+def click_latency(mode, readers, read_ms, clicks):
+    """Click latency while readers keep slow reads in flight"""
+    scheduler = Scheduler(read_slots=readers)
+    shared = threading.Lock()
+    stop = threading.Event()
+
+    def read_slot():
+        return shared if mode == 'serial' else scheduler.slot('read')
+
+    def input_slot():
+        return shared if mode == 'serial' else scheduler.slot('input')
+
+    def reader():
+        while not stop.is_set():
+            with read_slot():
+                time.sleep(read_ms / 1000)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(0.02)
+
+    samples = []
+    for _ in range(clicks):
+        start = time.perf_counter()
+        with input_slot():
+            time.sleep(0.001)
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+    stop.set()
+    for t in threads:
+        t.join()
+    return samples, scheduler.snapshot()
+
+def priority_order():
+    scheduler = Scheduler()
+    order = []
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot('input'):
+            release.wait()
+
+    def job(name, priority):
+        with scheduler.slot('input', priority):
+            order.append(name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    time.sleep(0.01)
+    threads = []
+    for name, priority in [('low-1', PRIORITY_LOW), ('low-2', PRIORITY_LOW), ('high', PRIORITY_HIGH)]:
+        t = threading.Thread(target=job, args=(name, priority))
+        t.start()
+        threads.append(t)
+        time.sleep(0.01)
+    release.set()
+    for t in threads + [holder]:
+        t.join()
+    return order
+
+def main():
+    parser = argparse.ArgumentParser(description='Agent scheduler benchmark')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent slow readers (default: 4)')
+    parser.add_argument('--read-ms', type=float, default=200, help='Duration of one read (default: 200)')
+    parser.add_argument('--clicks', type=int, default=30, help='Clicks to time (default: 30)')
+    args = parser.parse_args()
+
+    print("Typed text from 3 clients, 20 keys each")
+    print(f"  unscheduled interleavings {interleaving(False, 3, 20)}")
+    print(f"  scheduled   interleavings {interleaving(True, 3, 20)}")
+
+    print(f"Click latency with {args.readers} readers doing {args.read_ms:.0f} ms reads")
+    for mode in ('serial', 'scheduled'):
+        samples, stats = click_latency(mode, args.readers, args.read_ms, args.clicks)
+        samples.sort()
+        print(f"  {mode:9}  mean {statistics.mean(samples):7.1f} ms   "
+              f"p95 {samples[int(len(samples) * 0.95) - 1]:7.1f} ms")
+    print(f"  lanes: {stats}")
+
+    print(f"Priority order after a held slot: {priority_order()}")
+
+if __name__ == '__main__':
+    main()
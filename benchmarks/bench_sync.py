@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: delta sync vs resending every file with write_file
+Builds a tree of config-sized files plus a few larger ones, pushes it to a
+simulated agent with WindowsControl.sync, edits some files (in-place
+changes, inserted lines, appends, a new file) and syncs again. Every round
+checks the Windows-side tree byte for byte against the local one and
+reports bytes sent and time next to a write_file of every file.
+"""
+
+import argparse
+import filecmp
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from windows_control import WindowsControl
+from sim_agent import start_sim_agent
+
+def build_tree(root: str, files: int, rng: random.Random):
+    for i in range(files):
+        directory = os.path.join(root, f'pkg{i % 8}', 'conf' if i % 3 else 'scripts')
+        os.makedirs(directory, exist_ok=True)
+        lines = [f'setting_{j} = {rng.randint(0, 10 ** 6)}\n' for j in range(rng.randint(20, 400))]
+        with open(os.path.join(directory, f'file{i}.ini'), 'w') as f:
+            f.writelines(lines)
+    os.makedirs(os.path.join(root, 'bin'), exist_ok=True)
+    for i in range(3):
+        with open(os.path.join(root, 'bin', f'tool{i}.dll'), 'wb') as f:
+            f.write(rng.randbytes(2 * 1024 * 1024))
+
+def edit_tree(root: str, rng: random.Random, count: int):
+    """Change a few files the ways config edits usually do"""
+    paths = sorted(os.path.join(d, name) for d, _, names in os.walk(root) for name in names)
+    for n, path in enumerate(rng.sample(paths, count)):
+        with open(path, 'rb') as f:
+            data = f.read()
+        at = rng.randrange(len(data))
+        if n % 3 == 0:
+            data = data[:at] + b'# added by bench_sync\n' + data[at:]
+        elif n % 3 == 1:
+            data = data[:at] + b'X' * 16 + data[at + 16:]
+        else:
+            data += b'appended = 1\n'
+        with open(path, 'wb') as f:
+            f.write(data)
+    with open(os.path.join(root, 'pkg0', 'new.ini'), 'w') as f:
+        f.write('fresh = true\n' * 50)
+
+def same_tree(left: str, right: str) -> bool:
+    compare = filecmp.dircmp(left, right)
+    if compare.left_only or compare.right_only or compare.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(left, right, compare.common_files, shallow=False)
+    return not mismatch and not errors and all(
+        same_tree(os.path.join(left, d), os.path.join(right, d)) for d in compare.common_dirs)
+
+def write_all(win: WindowsControl, local: str, remote: str) -> float:
+    start = time.perf_counter()
+    for directory, _, names in os.walk(local):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, encoding='latin-1') as f:
+                win.write_file(os.path.join(remote, os.path.relpath(path, local)), f.read())
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Delta sync benchmark on the simulated agent')
+    parser.add_argument('-n', '--files', type=int, default=300, help='Small files in the tree (default: 300)')
+    parser.add_argument('-e', '--edits', type=int, default=12, help='Files edited between syncs (default: 12)')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Parallel transfers (default: 4)')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    agent, info = start_sim_agent()
+    win = WindowsControl(agent_info=info, direct_fs=False)
+    failed = False
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            local = os.path.join(scratch, 'local')
+            remote = os.path.join(scratch, 'windows')
+            build_tree(local, args.files, rng)
+
+            print(f"{'round':24} {'files':>6} {'new':>5} {'upd':>5} {'same':>5} {'sent KB':>9} "
+                  f"{'tree KB':>9} {'ms':>8}  match")
+            rounds = [('initial', None), ('no changes', None), (f'{args.edits} edits', args.edits),
+                      ('checksum pass', None)]
+            for name, edits in rounds:
+                if edits:
+                    edit_tree(local, rng, edits)
+                result = win.sync(local, remote, workers=args.jobs, checksum=name == 'checksum pass')
+                match = same_tree(local, remote)
+                failed |= not match or not result['success']
+                print(f"{name:24} {result['files']:6} {result['new']:5} {result['updated']:5} "
+                      f"{result['unchanged']:5} {result['sent'] / 1024:9.1f} {result['bytes'] / 1024:9.1f} "
+                      f"{result['elapsed_ms']:8.1f}  {'yes' if match else 'NO'}")
+
+            serial = win.sync(local, os.path.join(scratch, 'serial'), workers=1)
+            baseline = write_all(win, local, os.path.join(scratch, 'baseline'))
+            print(f"\nInitial sync with 1 worker: {serial['elapsed_ms']:.1f} ms; "
+                  f"write_file of every file: {baseline * 1000:.1f} ms")
+    finally:
+        win.close()
+        agent.shutdown()
+    if failed:
+        print("Windows-side tree does not match")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: coarse-to-fine template matching vs a full-resolution search
+Crops icons out of a synthetic 1920x1080 desktop (or a saved screenshot),
+adds JPEG noise, and checks the agent's matcher finds each one where it was
+cut from, timing it against a single-level NCC search of the whole frame
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Tools', 'windows-agent-tool', 'windows-installer'))
+
+from PIL import Image, ImageDraw
+
+from template_match import Template, match_template, ncc_map, peaks, to_gray
+
+def synthetic_desktop(seed=7, width=1920, height=1080):
+    """Taskbar, windows, buttons and icon-like shapes on a gradient"""
+    rng = random.Random(seed)
+    img = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(0, width - 400), rng.randrange(0, height - 300)
+        w, h = rng.randrange(200, 400), rng.randrange(150, 300)
+        draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randrange(180, 250) for _ in range(3)), outline=(40, 40, 40))
+        draw.rectangle((x, y, x + w, y + 24), fill=(50, 60, 90))
+        draw.text((x + 8, y + 6), f'Window {rng.randrange(1000)}', fill=(255, 255, 255))
+        for row in range(4):
+            draw.text((x + 10, y + 40 + row * 18), ''.join(rng.choice('abcdefghij klmnop') for _ in range(30)), fill=(0, 0, 0))
+    draw.rectangle((0, height - 40, width, height), fill=(20, 20, 30))
+    for i in range(24):
+        x = 60 + i * 48
+        color = tuple(rng.randrange(0, 256) for _ in range(3))
+        shape = rng.choice(['ellipse', 'rectangle', 'polygon'])
+        box = (x, height - 36, x + 32, height - 4)
+        if shape == 'ellipse':
+            draw.ellipse(box, fill=color, outline=(255, 255, 255))
+        elif shape == 'rectangle':
+            draw.rectangle(box, fill=color, outline=(255, 255, 255))
+        else:
+            draw.polygon([(x + 16, height - 36), (x + 32, height - 4), (x, height - 4)], fill=color)
+        draw.text((x + 10, height - 26), chr(65 + i), fill=(255, 255, 255))
+    return img
+
+def jpeg_noise(img, quality=70):
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    return Image.open(BytesIO(buffer.getvalue())).convert('RGB')
+
+def pick_crops(screen, gray, count, size, seed=1):
+    """Random crops with contrast and no near-identical copy elsewhere (one right answer)"""
+    rng = random.Random(seed)
+    crops = []
+    while len(crops) < count:
+        x, y = rng.randrange(0, screen.width - size), rng.randrange(0, screen.height - size)
+        crop = screen.crop((x, y, x + size, y + size))
+        if to_gray(crop).std() < 20:
+            continue
+        top = peaks(ncc_map(gray, to_gray(crop)), 2, 0.0, size // 2)
+        if len(top) < 2 or top[1][0] < 0.9:
+            crops.append((x, y, crop))
+    return crops
+
+def run_set(name, gray, crops, verbose):
+    found = 0
+    pyramid_s = full_s = 0.0
+    for i, (x, y, crop) in enumerate(crops):
+        template = Template(f'{name}{i}', jpeg_noise(crop))
+
+        start = time.perf_counter()
+        matches = match_template(gray, template, threshold=0.8)
+        pyramid_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        full = peaks(ncc_map(gray, template.pyramid[0]), 1, 0.8, min(crop.size) // 2)
+        full_s += time.perf_counter() - start
+
+        hit = bool(matches) and abs(matches[0]['x'] - x) <= 1 and abs(matches[0]['y'] - y) <= 1
+        found += hit
+        if verbose or not hit:
+            best = f"({matches[0]['x']}, {matches[0]['y']}) {matches[0]['score']:.3f}" if matches else 'none'
+            full_best = f"({full[0][2]}, {full[0][1]}) {full[0][0]:.3f}" if full else 'none'
+            print(f"  {name}{i}: cut at ({x}, {y}) levels {template.levels}  pyramid {best:24} "
+                  f"full {full_best:24} {'ok' if hit else 'MISS'}")
+    n = len(crops)
+    print(f"{name:8} found {found}/{n}   pyramid {pyramid_s / n * 1000:6.1f} ms   full {full_s / n * 1000:6.1f} ms   "
+          f"({full_s / pyramid_s:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Template matching benchmark')
+    parser.add_argument('screenshot', nargs='?', help='Saved screenshot to search (default: synthetic desktop)')
+    parser.add_argument('-n', '--templates', type=int, default=6, help='Random crops to search for (default: 6)')
+    parser.add_argument('-s', '--size', type=int, default=48, help='Random crop side in pixels (default: 48)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every template, not just misses')
+    args = parser.parse_args()
+
+    screen = Image.open(args.screenshot).convert('RGB') if args.screenshot else synthetic_desktop()
+    gray = to_gray(screen)
+    print(f"Screen {screen.width}x{screen.height}, templates JPEG q70 re-encoded, threshold 0.8")
+
+    if not args.screenshot:
+        # Taskbar icons with a small margin, as a user would cut them
+        icons = [(56 + i * 48, screen.height - 40, screen.crop((56 + i * 48, screen.height - 40,
+                                                               96 + i * 48, screen.height)))
+                 for i in range(0, 24, 4)]
+        run_set('icon', gray, icons, args.verbose)
+    run_set('crop', gray, pick_crops(screen, gray, args.templates, args.size), args.verbose)
+
+    # A template that isn't on screen must not match
+    absent = Template('absent', Image.effect_noise((args.size, args.size), 64).convert('RGB'))
+    print(f"absent template matches at 0.8: {len(match_template(gray, absent, threshold=0.8))}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /keyboard/type modes through the agent's TextTyper
+Types the same snippet per key (the old pyautogui.typewrite path, 50 ms
+apart), as batched Unicode input and by clipboard paste against the fake
+injector, and checks the text arrived intact and the clipboard was restored
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_input import FakeTextInjector
+from text_input import TextTyper
+
+SNIPPET = ('Get-ChildItem -Path $env:USERPROFILE -Recurse -Filter *.log | '
+           'Where-Object { $_.Length -gt 1MB } | Sort-Object Length -Descending\r\n'
+           '# Größe prüfen — ✓ 日本語 😀\r\n')
+
+def make_text(chars: int) -> str:
+    return (SNIPPET * (chars // len(SNIPPET) + 1))[:chars]
+
+def run(text: str, mode: str, interval=None, **injector_args):
+    injector = FakeTextInjector(clipboard='previous clipboard', **injector_args)
+    result = TextTyper(injector).type(text, mode=mode, interval=interval)
+    expected = text.replace('\r\n', '\n') if result['mode'] == 'unicode' else text
+    assert injector.text == expected, f'{mode}: text mismatch'
+    assert injector.clipboard == 'previous clipboard', f'{mode}: clipboard not restored'
+    return result, injector
+
+def main():
+    parser = argparse.ArgumentParser(description='Text entry benchmark')
+    parser.add_argument('-c', '--chars', type=int, default=2000, help='Characters to type (default: 2000)')
+    parser.add_argument('--key-sample', type=int, default=40,
+                        help='Characters actually typed per key; the rest is extrapolated (default: 40)')
+    args = parser.parse_args()
+
+    text = make_text(args.chars)
+    sample = text[:args.key_sample]
+    keys, _ = run(sample, 'keys', interval=0.05)
+    keys_ms = keys['duration_ms'] * len(text) / len(sample)
+
+    print(f"Typing {len(text)} characters")
+    print(f"{'keys (interval 0.05s)':26} {keys_ms / 1000:9.1f} s   (extrapolated from {len(sample)} chars)")
+    for mode in ('unicode', 'paste', 'auto'):
+        result, injector = run(text, mode)
+        print(f"{mode:26} {result['duration_ms']:9.1f} ms  -> {result['mode']}, {injector.calls} injector calls")
+
+    result, _ = run(text, 'auto', locked=True)
+    print(f"{'auto, clipboard locked':26} {result['duration_ms']:9.1f} ms  -> {result['mode']} "
+          f"({result['fallback_reason']})")
+    short, _ = run('hello', 'auto')
+    print(f"{'auto, 5 characters':26} {short['duration_ms']:9.1f} ms  -> {short['mode']}")
+
+    # An image on the clipboard (no text) comes back after a paste, not an empty clipboard
+    injector = FakeTextInjector(other=b'\x89PNG image')
+    TextTyper(injector).type(text, mode='paste', settle=0)
+    assert injector.text == text, 'paste over an image: text mismatch'
+    assert (injector.clipboard, injector.other) == (None, b'\x89PNG image'), 'image on the clipboard lost'
+    print(f"{'paste over an image':26} image restored")
+    print("\nText intact and clipboard restored in every mode")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: client-side polling vs the agent's /wait conditions
+A window appears, a pixel turns green or a process starts at a random
+moment; measures how late each approach notices and what it transfers.
+Polling takes a PNG screenshot plus a window list every poll interval, the
+way our scripts do; /wait runs the agent's conditions on fake probes
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from fake_windows import FakeWindowProvider
+from waits import WaitProbes, build_conditions, wait_for
+
+class FakeWaitProbes(WaitProbes):
+    """Screen image, fake windows and a process table that tests can mutate"""
+
+    def __init__(self):
+        self.screen = Image.new('RGB', (1920, 1080), (30, 30, 30))
+        self.provider = FakeWindowProvider(60)
+        self.process_table = [(4 + i, f'svc{i}.exe') for i in range(150)]
+
+    def grab(self, box):
+        return self.screen.crop(box)
+
+    def windows(self):
+        return self.provider.enumerate()
+
+    def window_state(self, hwnd):
+        if self.provider.title(hwnd) is None:
+            return None
+        return self.provider.describe(hwnd)['state']
+
+    def processes(self):
+        return list(self.process_table)
+
+SCENARIOS = {
+    'window': ({'type': 'window', 'title': 'Installer Complete'},
+               lambda p: p.provider.open('Setup - Installer Complete', pid=9000)),
+    'pixel': ({'type': 'pixel', 'x': 100, 'y': 100, 'color': '#00ff00', 'tolerance': 8},
+              lambda p: p.screen.paste((0, 255, 0), (90, 90, 110, 110))),
+    'process': ({'type': 'process', 'name': 'notepad', 'state': 'started'},
+                lambda p: p.process_table.append((9999, 'notepad.exe')))
+}
+
+def poll(probes, spec, poll_interval, timeout):
+    """Our scripts' loop: screenshot + window list, inspect, sleep"""
+    condition = build_conditions(probes, [spec])[0]
+    condition.start()
+    start = time.perf_counter()
+    transferred = 0
+    while time.perf_counter() - start < timeout:
+        buffer = io.BytesIO()
+        probes.screen.save(buffer, 'PNG', compress_level=1)
+        transferred += buffer.tell() + len(str(probes.windows()))
+        if condition.check() is not None:
+            return time.perf_counter(), transferred
+        time.sleep(poll_interval)
+    return None, transferred
+
+def run(approach, name, poll_interval):
+    spec, trigger = SCENARIOS[name]
+    probes = FakeWaitProbes()
+    delay = random.uniform(0.2, 0.8)
+    fired = {}
+
+    def fire():
+        time.sleep(delay)
+        trigger(probes)
+        fired['at'] = time.perf_counter()
+
+    thread = threading.Thread(target=fire)
+    thread.start()
+    if approach == 'poll':
+        noticed, transferred = poll(probes, spec, poll_interval, timeout=5)
+    else:
+        result = wait_for(build_conditions(probes, [spec]), timeout=5)
+        noticed, transferred = (time.perf_counter() if result['met'] else None), 300
+    thread.join()
+    if noticed is None:
+        raise RuntimeError(f'{approach} missed the {name} event')
+    return (noticed - fired['at']) * 1000, transferred
+
+def main():
+    parser = argparse.ArgumentParser(description='/wait vs polling benchmark')
+    parser.add_argument('-r', '--rounds', type=int, default=5, help='Events per scenario (default: 5)')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Client poll sleep (default: 0.5s)')
+    args = parser.parse_args()
+
+    print(f"{'scenario':10} {'approach':8} {'mean lag':>10} {'max lag':>10} {'transferred':>12}")
+    for name in SCENARIOS:
+        for approach in ('poll', 'wait'):
+            lags, sizes = zip(*(run(approach, name, args.poll_interval) for _ in range(args.rounds)))
+            print(f"{name:10} {approach:8} {statistics.mean(lags):8.1f}ms {max(lags):8.1f}ms "
+                  f"{statistics.mean(sizes) / 1024:10.1f}KB")
+
+if __name__ == '__main__':
+    main()
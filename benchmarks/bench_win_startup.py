@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-command latency of the `win` CLI
+Runs the same command N times as a fresh `python3 windows_control.py`
+process, through the thin launcher with no daemon (in-process fallback),
+and through the launcher with the resident daemon holding a warm client
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CORE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems')
+sys.path.insert(0, CORE)
+
+from sim_agent import start_sim_agent
+
+def time_runs(cmd, env, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        samples.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed: {result.stdout.decode(errors='replace')}")
+    return samples
+
+def report(name: str, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:32} p50 {statistics.median(samples):7.1f} ms   p95 {p95:7.1f} ms")
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='win CLI startup benchmark')
+    parser.add_argument('-n', '--runs', type=int, default=20, help='Commands per mode (default: 20)')
+    args = parser.parse_args()
+
+    server, info = start_sim_agent()
+    with tempfile.TemporaryDirectory() as home:
+        with open(os.path.join(home, '.claude_agent_info'), 'w') as f:
+            json.dump(info, f)
+        env = dict(os.environ, HOME=home, WIN_DAEMON_SOCKET=os.path.join(home, 'win.sock'))
+        env.pop('WIN_DAEMON', None)
+        env.pop('WIN_TRACE', None)
+
+        command = ['click', '1', '2']
+        direct = [sys.executable, os.path.join(CORE, 'windows_control.py')] + command
+        launcher = [sys.executable, '-S', os.path.join(CORE, 'win_daemon.py')] + command
+        daemon = [sys.executable, '-S', os.path.join(CORE, 'win_daemon.py'), 'daemon']
+
+        print(f"{args.runs} x `win {' '.join(command)}` against the simulated agent")
+        report('python -S -c pass (floor)', time_runs([sys.executable, '-S', '-c', 'pass'], env, args.runs))
+        baseline = report('python windows_control.py', time_runs(direct, env, args.runs))
+        report('launcher, no daemon', time_runs(launcher, env, args.runs))
+
+        subprocess.run(daemon + ['start'], env=env, check=True, stdout=subprocess.DEVNULL)
+        try:
+            warm = report('launcher + daemon', time_runs(launcher, env, args.runs))
+        finally:
+            subprocess.run(daemon + ['stop'], env=env, stdout=subprocess.DEVNULL)
+
+    server.shutdown()
+    print(f"\nSpeedup with daemon: {baseline / warm:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call EnumWindows scan vs the shared window registry
+Runs on Linux against FakeWindowProvider; FAKE_WIN_CALL_US sets the cost
+of one simulated Win32 call
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from fake_windows import FakeWindowProvider
+from window_registry import WindowRegistry
+
+def scan_lookup(provider, title=None, pid=None):
+    """The old per-endpoint lookup: enumerate everything, take the first title or PID match"""
+    for window in provider.enumerate():
+        if title and title.lower() in window['title'].lower():
+            return window['hwnd']
+        if pid and window['pid'] == pid:
+            return window['hwnd']
+    return None
+
+def run(label, lookup, queries):
+    samples = []
+    for title, pid in queries:
+        start = time.perf_counter()
+        lookup(title, pid)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {label:9} mean {statistics.mean(samples):9.1f} us   p50 {samples[len(samples) // 2]:9.1f} us   "
+          f"p95 {p95:9.1f} us")
+    return sum(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='Window registry benchmark')
+    parser.add_argument('-w', '--windows', type=int, default=300, help='Top-level windows (default: 300)')
+    parser.add_argument('-n', '--lookups', type=int, default=500, help='Lookups to run (default: 500)')
+    parser.add_argument('--ttl', type=float, default=1.0, help='Registry TTL in seconds')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    provider = FakeWindowProvider(args.windows)
+    queries = []
+    for _ in range(args.lookups):
+        if rng.random() < 0.7:
+            queries.append((f'Window {rng.randrange(args.windows)} -', None))
+        else:
+            queries.append((None, 1000 + rng.randrange(args.windows // 3)))
+
+    print(f"{args.lookups} lookups over {args.windows} windows")
+    scanned = run('scan', lambda title, pid: scan_lookup(provider, title, pid), queries)
+
+    registry = WindowRegistry(provider, ttl=args.ttl)
+    indexed = run('registry', lambda title, pid: registry.find(title, pid), queries)
+    print(f"  speedup {scanned / indexed:.1f}x  (registry: {registry.snapshot()})")
+
+    # Same answers as the scan, whichever of title and PID is given
+    checks = queries + [('window 1', None), ('Window 12 -', 1000 + args.windows // 3 - 1),
+                        ('no such title', 1001)]
+    assert all(registry.find(title, pid) == scan_lookup(provider, title, pid) for title, pid in checks)
+    print("  lookup checks passed")
+
+    # Freshness: windows opened, renamed or closed after the snapshot are still resolved correctly
+    hwnd = provider.open('Brand New Window', pid=99999)
+    assert registry.find('brand new') == hwnd
+    provider.rename(hwnd, 'Renamed Window')
+    assert registry.find('brand new') is None
+    assert registry.find('renamed window') == hwnd
+    provider.close(hwnd)
+    assert registry.find(hwnd=hwnd) is None
+    assert registry.find('renamed window') is None
+    print("  freshness checks passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: file operations through the WSL drive mount vs through the agent
+Points the client's mount root at a scratch directory standing in for /mnt
+and runs read_file/write_file/upload/download for a few sizes both ways
+against a simulated agent. Both routes hit local disk here; on a real WSL
+host /mnt/c is a drvfs (9P) mount, slower per byte than this, but still
+without the HTTP round trip, JSON encoding and agent hop measured here.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_systems'))
+
+from sim_agent import start_sim_agent
+
+SIZES = (('1 KB', 1024), ('64 KB', 64 * 1024), ('1 MB', 1024 * 1024), ('16 MB', 16 * 1024 * 1024))
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='WSL mount vs agent file I/O benchmark')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Runs per operation (default: 5)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        mount = os.path.join(scratch, 'mnt')
+        os.makedirs(os.path.join(mount, 'c'))
+        os.environ['WIN_WSL_ROOT'] = mount
+        from windows_control import WindowsControl
+
+        agent, info = start_sim_agent()
+        direct = WindowsControl(agent_info=info, direct_fs=True)
+        via_agent = WindowsControl(agent_info=info, direct_fs=False)
+        try:
+            print(f"{'operation':14} {'size':>6} {'wsl ms':>9} {'agent ms':>9} {'speedup':>8}")
+            for label, size in SIZES:
+                text = ('x' * 99 + '\n') * (size // 100)
+                local = os.path.join(scratch, f'local-{size}.bin')
+                with open(local, 'wb') as f:
+                    f.write(os.urandom(size))
+                windows_path = rf'C:\bench\{size}.txt'
+                agent_path = os.path.join(scratch, 'agent', f'{size}.txt')
+                if direct.file_route(windows_path, write=True) != 'wsl':
+                    sys.exit(f'{windows_path} is not on the scratch mount')
+
+                operations = [
+                    ('write_file', lambda c, p: c.write_file(p, text)),
+                    ('read_file', lambda c, p: c.read_file(p)),
+                    ('upload', lambda c, p: c.upload(local, p + '.bin')),
+                    ('download', lambda c, p: c.download(p + '.bin', local + '.copy'))
+                ]
+                for name, op in operations:
+                    wsl_ms = timed(lambda: op(direct, windows_path), args.repeat)
+                    agent_ms = timed(lambda: op(via_agent, agent_path), args.repeat)
+                    print(f"{name:14} {label:>6} {wsl_ms:9.2f} {agent_ms:9.2f} {agent_ms / wsl_ms:7.1f}x")
+
+            print("\nClient timings (p50 ms):")
+            for client in (direct, via_agent):
+                for endpoint, entry in sorted(client.timing_stats().items()):
+                    if '/file/' in endpoint:
+                        print(f"  {endpoint:22} {entry['count']:4} calls {entry['total_ms']['p50']:9.2f}")
+            print(f"\n{direct.connection_stats()['direct_fs']} operations went through the mount")
+        finally:
+            direct.close()
+            via_agent.close()
+            agent.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Fake text injector for exercising the agent's text entry off Windows
+Keeps the "document" the focused window would receive and a clipboard;
+each simulated SendInput call costs FAKE_INPUT_CALL_US plus
+FAKE_INPUT_EVENT_US per key event
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Tools', 'windows-agent-tool', 'windows-installer'))
+
+from text_input import TextInjector
+
+CALL_COST = float(os.environ.get('FAKE_INPUT_CALL_US', '50')) / 1e6
+EVENT_COST = float(os.environ.get('FAKE_INPUT_EVENT_US', '2')) / 1e6
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+class FakeTextInjector(TextInjector):
+    """Appends injected and pasted text to self.document"""
+
+    def __init__(self, clipboard=None, locked=False, other=None):
+        self.document = []
+        self.clipboard = clipboard
+        # Non-text clipboard data (an image, copied files) that get_clipboard can't see
+        self.other = other
+        self.locked = locked
+        self.calls = 0
+
+    def _send(self, events):
+        self.calls += 1
+        _busy(CALL_COST + EVENT_COST * events)
+
+    @property
+    def text(self):
+        return ''.join(self.document)
+
+    def type_keys(self, text, interval):
+        # pyautogui sends each key as its own down/up pair, then sleeps
+        for char in text:
+            self._send(2)
+            self.document.append(char)
+            time.sleep(interval)
+
+    def send_unicode(self, text):
+        # One down/up pair per UTF-16 code unit
+        self._send(len(text.encode('utf-16-le')))
+        self.document.append(text)
+
+    def get_clipboard(self):
+        if self.locked:
+            raise OSError('OpenClipboard failed: clipboard in use')
+        self._send(0)
+        return self.clipboard
+
+    def set_clipboard(self, text):
+        if self.locked:
+            raise OSError('OpenClipboard failed: clipboard in use')
+        self._send(0)
+        self.clipboard = text
+        self.other = None
+
+    def save_clipboard(self):
+        if self.locked:
+            raise OSError('OpenClipboard failed: clipboard in use')
+        self._send(0)
+        return self.clipboard, self.other
+
+    def restore_clipboard(self, saved):
+        self._send(0)
+        self.clipboard, self.other = saved
+
+    def paste(self):
+        self._send(4)
+        self.document.append(self.clipboard or '')
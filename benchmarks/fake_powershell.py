@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Fake powershell.exe for Linux
+Speaks the pooled host protocol of powershell_host.py (--host) or runs a
+single -Command like a fresh process. Start-up cost is simulated with
+FAKE_PS_STARTUP (seconds, default 0.35) to stand in for powershell.exe.
+In host mode, Write-Host and native commands (cmd /c ...) also write raw
+lines around the reply, the way console output leaks from a real host.
+"""
+
+import base64
+import json
+import os
+import sys
+import time
+
+STARTUP = float(os.environ.get('FAKE_PS_STARTUP', '0.35'))
+
+def execute(command):
+    """Pretend to run a command: (stdout, stderr, returncode)"""
+    if command.startswith('Start-Sleep'):
+        time.sleep(float(command.split()[-1]))
+        return '', '', 0
+    if command.startswith('Write-Warning '):
+        return '', 'WARNING: ' + command.split(' ', 1)[1] + '\n', 0
+    if command.startswith('Write-Error'):
+        return '', command.split(' ', 1)[-1] + '\n', 1
+    if command.split()[0] == 'exit':
+        # The host runs each command in its own runspace, so exit only ends the command
+        return '', '', int(command.split()[1]) if len(command.split()) > 1 else 0
+    if command.startswith('Write-Host '):
+        return command.split(' ', 1)[1] + '\n', '', 0
+    if command.startswith('cmd /c echo '):
+        return command.split('echo ', 1)[1] + '\n', '', 0
+    return f'{command}\n', '', 0
+
+def host():
+    sys.stdout.write('PowerShell banner\n#ps-ready\n')
+    sys.stdout.flush()
+    for line in sys.stdin:
+        token, payload = line.split()
+        command = base64.b64decode(payload).decode('utf-8')
+        stdout, stderr, rc = execute(command)
+        if command.startswith(('Write-Host', 'cmd /c')):
+            # What a real host can't capture: a native exe on the inherited handle
+            sys.stdout.write(stdout + '{"stdout": "not the reply"}\n')
+        reply = json.dumps({'stdout': stdout, 'stderr': stderr, 'returncode': rc})
+        sys.stdout.write(f'#ps-reply {token} {reply}\n')
+        sys.stdout.flush()
+
+def main():
+    time.sleep(STARTUP)
+    if '--host' in sys.argv:
+        host()
+    elif '-Command' in sys.argv:
+        stdout, stderr, rc = execute(sys.argv[sys.argv.index('-Command') + 1])
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        sys.exit(rc)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Fake window provider for exercising the agent's window registry off Windows
+Each simulated Win32 call busy-waits FAKE_WIN_CALL_US microseconds
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Tools', 'windows-agent-tool', 'windows-installer'))
+
+from window_registry import WindowProvider
+
+CALL_COST = float(os.environ.get('FAKE_WIN_CALL_US', '5')) / 1e6
+
+def _win32_call():
+    end = time.perf_counter() + CALL_COST
+    while time.perf_counter() < end:
+        pass
+
+class FakeWindowProvider(WindowProvider):
+    """In-memory desktop; open(), close() and rename() mutate it"""
+
+    def __init__(self, count=200):
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._next_hwnd = 0x10000
+        self.calls = 0
+        for i in range(count):
+            self.open(f'Window {i} - App{i % 17}', pid=1000 + i // 3, visible=i % 4 != 0)
+
+    def _call(self, n=1):
+        self.calls += n
+        for _ in range(n):
+            _win32_call()
+
+    def open(self, title, pid, visible=True):
+        with self._lock:
+            hwnd = self._next_hwnd
+            self._next_hwnd += 4
+            # New windows go on top of the Z-order
+            self._windows = {hwnd: {'title': title, 'pid': pid, 'visible': visible,
+                                    'state': 'normal'}, **self._windows}
+        return hwnd
+
+    def close(self, hwnd):
+        with self._lock:
+            self._windows.pop(hwnd, None)
+
+    def rename(self, hwnd, title):
+        with self._lock:
+            self._windows[hwnd]['title'] = title
+
+    def enumerate(self):
+        with self._lock:
+            items = list(self._windows.items())
+        # GetWindowThreadProcessId, GetWindowText and IsWindowVisible per window
+        self._call(3 * len(items))
+        return [{'hwnd': hwnd, 'title': w['title'], 'pid': w['pid'], 'visible': w['visible']}
+                for hwnd, w in items]
+
+    def title(self, hwnd):
+        self._call()
+        window = self._windows.get(hwnd)
+        return window['title'] if window else None
+
+    def describe(self, hwnd):
+        self._call(3)
+        window = self._windows[hwnd]
+        return {
+            'rect': {'left': 0, 'top': 0, 'right': 800, 'bottom': 600, 'width': 800, 'height': 600},
+            'state': window['state']
+        }
+
+    def show(self, hwnd, action):
+        self._call()
+        states = {'maximize': 'maximized', 'minimize': 'minimized', 'restore': 'normal'}
+        window = self._windows[hwnd]
+        window['state'] = states.get(action, 'normal' if window['state'] == 'minimized' else window['state'])
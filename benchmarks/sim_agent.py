@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Simulated Windows Agent
+Runs the real windows_agent.py on its simulated desktop backend
+(sim_backend.py) with per-operation latency, so clients can be exercised
+and benchmarked against the actual request handling without a Windows host
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'Tools', 'windows-agent-tool', 'windows-installer')
+API_TOKEN = 'sim-agent-token'
+
+# Rough cost of each backend operation on a real desktop (seconds)
+DEFAULT_LATENCY = {
+    'capture': 0.040,
+    'windows': 0.030,
+    'window_action': 0.010,
+    'processes': 0.060,
+    'powershell': 0.050,
+    'powershell_spawn': 0.350,
+    'input': 0.005
+}
+
+class SimAgent:
+    """A windows_agent.py process on the sim backend"""
+
+    def __init__(self, process: subprocess.Popen, port: int, info_dir: tempfile.TemporaryDirectory):
+        self.process = process
+        self.server_port = port
+        self._info_dir = info_dir
+
+    def shutdown(self):
+        """Stop the agent process"""
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._info_dir.cleanup()
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def agent_env(port: int, latency: Optional[Dict[str, float]] = None, script: Optional[str] = None,
+              info_path: Optional[str] = None) -> Dict[str, str]:
+    """Environment that runs windows_agent.py as a simulated agent on 127.0.0.1:port"""
+    delays = dict(DEFAULT_LATENCY)
+    if latency:
+        delays.update(latency)
+    env = dict(os.environ,
+               CLAUDE_AGENT_BACKEND='sim',
+               CLAUDE_AGENT_HOST='127.0.0.1',
+               CLAUDE_AGENT_PORT=str(port),
+               CLAUDE_AGENT_TOKEN=API_TOKEN,
+               CLAUDE_AGENT_SIM_LATENCY=json.dumps(delays))
+    if info_path:
+        env['CLAUDE_AGENT_INFO'] = info_path
+    if script:
+        env['CLAUDE_AGENT_SIM_SCRIPT'] = script
+    return env
+
+def start_sim_agent(port: int = 0, latency: Optional[Dict[str, float]] = None,
+                    script: Optional[str] = None, startup_timeout: float = 30.0) -> Tuple[SimAgent, Dict]:
+    """Start a simulated agent process and wait until it answers /health
+
+    latency overrides DEFAULT_LATENCY per operation ({} keeps the defaults,
+    {op: 0} removes one); script is a desktop script file for sim_backend.
+    Returns the agent (call .shutdown() to stop) and agent info usable as
+    `WindowsControl(agent_info=...)`.
+    """
+    port = port or _free_port()
+    # Keep the agent from overwriting the real ~/.claude_agent_info
+    info_dir = tempfile.TemporaryDirectory(prefix='sim-agent-')
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(AGENT_DIR, 'windows_agent.py')],
+        cwd=AGENT_DIR,
+        env=agent_env(port, latency, script, os.path.join(info_dir.name, 'agent_info')),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    agent = SimAgent(process, port, info_dir)
+    info = {'host': '127.0.0.1', 'port': port, 'token': API_TOKEN}
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            agent.shutdown()
+            raise RuntimeError(f'Simulated agent exited with code {process.returncode}')
+        try:
+            requests.get(f'http://127.0.0.1:{port}/health', timeout=0.5)
+            return agent, info
+        except requests.RequestException:
+            time.sleep(0.05)
+    agent.shutdown()
+    raise RuntimeError('Simulated agent did not start')
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated Windows Agent')
+    parser.add_argument('-p', '--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('-s', '--script', help='Desktop script (JSON) for the simulated backend')
+    parser.add_argument('--no-latency', action='store_true', help='Run every operation at in-memory speed')
+    args = parser.parse_args()
+
+    latency = {op: 0 for op in DEFAULT_LATENCY} if args.no_latency else None
+    print(f"Simulated agent on http://127.0.0.1:{args.port} (token: {API_TOKEN})")
+    env = agent_env(args.port, latency, args.script,
+                    os.path.join(tempfile.gettempdir(), f'sim_agent_info_{args.port}'))
+    sys.exit(subprocess.call([sys.executable, os.path.join(AGENT_DIR, 'windows_agent.py')], cwd=AGENT_DIR, env=env))
+
+if __name__ == '__main__':
+    main()
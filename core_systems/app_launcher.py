@@ -7,14 +7,17 @@ Uses allowed_apps.json to launch applications safely
 import json
 import os
 from pathlib import Path
+from typing import Optional, Dict
 from windows_control import WindowsControl
 
 class AppLauncher:
-    def __init__(self):
-        self.win = WindowsControl()
-        self.apps_config = self._load_config()
+    def __init__(self, win: Optional[WindowsControl] = None, apps_config: Optional[Dict] = None):
+        """win and apps_config can be shared, e.g. by WindowsFleet launching on many hosts"""
+        self.win = win or WindowsControl()
+        self.apps_config = apps_config if apps_config is not None else self.load_config()
         
-    def _load_config(self):
+    @staticmethod
+    def load_config():
         """Load allowed apps configuration"""
         config_path = Path(__file__).parent / "allowed_apps.json"
         try:
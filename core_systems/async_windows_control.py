@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Async Windows Control
+asyncio counterpart of WindowsControl so independent agent calls can overlap
+"""
+
+import asyncio
+import random
+from typing import Optional, Dict, Any, List, Tuple
+
+import aiohttp
+
+from windows_control import (
+    load_agent_info,
+    IDEMPOTENT_ENDPOINTS,
+    RETRY_STATUS_CODES,
+    ENDPOINT_TIMEOUTS,
+    DEFAULT_TIMEOUT,
+    CONNECT_TIMEOUT
+)
+
+class AsyncWindowsControl:
+    """Async client for the Windows Agent
+
+    Mirrors the WindowsControl method surface. Calls are quiet (no printing)
+    and share one aiohttp session; at most `max_concurrency` requests are in
+    flight at once. Cancelling a task aborts its HTTP request.
+
+    Usage:
+        async with AsyncWindowsControl() as win:
+            image, windows, procs = await asyncio.gather(
+                win.screenshot(), win.list_windows(), win.processes())
+    """
+
+    def __init__(self, max_concurrency: int = 4, timeouts: Optional[Dict[str, float]] = None,
+                 retries: int = 2, backoff: float = 0.1, max_backoff: float = 2.0,
+                 agent_info: Optional[Dict] = None):
+        self.agent_info = agent_info or load_agent_info()
+        if self.agent_info:
+            self.base_url = f"http://{self.agent_info['host']}:{self.agent_info['port']}"
+            self.headers = {"Authorization": f"Bearer {self.agent_info['token']}"}
+        else:
+            raise Exception("Windows Agent not found! Please install and run the agent first.")
+
+        self.max_concurrency = max_concurrency
+        self.timeouts = dict(ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the shared session lazily inside the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self._session
+
+    async def close(self):
+        """Close pooled connections to the agent"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    async def _request(self, method: str, endpoint: str, raw: bool = False, **kwargs) -> Dict[str, Any]:
+        """Make a request to the agent
+
+        With raw=True the body is returned as {'success': True, 'content': bytes}.
+        """
+        url = f"{self.base_url}{endpoint}"
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(
+            sock_connect=CONNECT_TIMEOUT,
+            sock_read=self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+        ))
+
+        retryable = method == "GET" or endpoint in IDEMPOTENT_ENDPOINTS
+        attempts = self.retries + 1 if retryable else 1
+        session = self._get_session()
+
+        for attempt in range(attempts):
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        if response.status in RETRY_STATUS_CODES and attempt < attempts - 1:
+                            retry = True
+                        else:
+                            retry = False
+                            response.raise_for_status()
+                            if raw:
+                                return {'success': True, 'content': await response.read()}
+                            return await response.json()
+                if retry:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt < attempts - 1:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    continue
+                return {"success": False, "error": str(e) or type(e).__name__}
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+
+    async def screenshot(self, save_path: Optional[str] = None) -> str:
+        """Take screenshot and optionally save to file"""
+        if save_path:
+            img_data = await self.screenshot_bytes()
+            if not img_data:
+                return ''
+            await asyncio.to_thread(_write_bytes, save_path, img_data)
+            return save_path
+
+        result = await self._request("POST", "/screenshot", json={})
+        return result.get('image', '')
+
+    async def screenshot_bytes(self, region: Optional[Tuple[int, int, int, int]] = None, **options) -> bytes:
+        """Take screenshot as encoded image bytes (empty on failure)
+
+        Accepts the same processing options as WindowsControl.screenshot_raw.
+        """
+        data = {k: v for k, v in options.items() if v is not None}
+        if region:
+            data['crop'] = list(region)
+        result = await self._request("POST", "/screenshot/raw", raw=True, json=data)
+        return result.get('content', b'')
+
+    async def click(self, x: int, y: int, button: str = "left"):
+        """Click at coordinates"""
+        return await self._request("POST", "/mouse/click",
+                                   json={"x": x, "y": y, "button": button})
+
+    async def move(self, x: int, y: int):
+        """Move mouse to coordinates"""
+        return await self._request("POST", "/mouse/move", json={"x": x, "y": y})
+
+    async def type(self, text: str, mode: Optional[str] = None, interval: Optional[float] = None,
+                   settle: Optional[float] = None):
+        """Type text (mode: auto, keys, unicode or paste; settle: see WindowsControl.type)"""
+        data = {"text": text}
+        if mode:
+            data["mode"] = mode
+        if interval is not None:
+            data["interval"] = interval
+        if settle is not None:
+            data["settle"] = settle
+        return await self._request("POST", "/keyboard/type", json=data)
+
+    async def key(self, keys: str | List[str]):
+        """Press key(s)"""
+        return await self._request("POST", "/keyboard/key", json={"keys": keys})
+
+    async def powershell(self, command: str) -> str:
+        """Run PowerShell command"""
+        result = await self._request("POST", "/powershell", json={"command": command})
+        if result.get('success'):
+            return result.get('stdout', '')
+        return result.get('error', 'Command failed')
+
+    async def processes(self) -> List[Dict]:
+        """List processes"""
+        result = await self._request("GET", "/process/list")
+        return result.get('processes', [])
+
+    async def kill(self, pid: int):
+        """Kill process"""
+        return await self._request("POST", "/process/kill", json={"pid": pid})
+
+    async def read_file(self, path: str) -> str:
+        """Read Windows file"""
+        result = await self._request("POST", "/file/read", json={"path": path})
+        return result.get('content', '')
+
+    async def write_file(self, path: str, content: str):
+        """Write Windows file"""
+        return await self._request("POST", "/file/write",
+                                   json={"path": path, "content": content})
+
+    async def list_windows(self) -> List[Dict]:
+        """List all visible windows"""
+        result = await self._request("GET", "/window/list")
+        return result.get('windows', [])
+
+    async def _window_action(self, endpoint: str, title: Optional[str], pid: Optional[int],
+                             hwnd: Optional[int]) -> Dict:
+        if hwnd:
+            return await self._request("POST", endpoint, json={'hwnd': hwnd})
+        data = {}
+        if title:
+            data['title'] = title
+        if pid:
+            data['pid'] = pid
+        return await self._request("POST", endpoint, json=data)
+
+    async def focus_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                           hwnd: Optional[int] = None):
+        """Bring window to foreground"""
+        return await self._window_action("/window/focus", title, pid, hwnd)
+
+    async def maximize_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                              hwnd: Optional[int] = None):
+        """Maximize window"""
+        return await self._window_action("/window/maximize", title, pid, hwnd)
+
+    async def minimize_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                              hwnd: Optional[int] = None):
+        """Minimize window"""
+        return await self._window_action("/window/minimize", title, pid, hwnd)
+
+    async def restore_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                             hwnd: Optional[int] = None):
+        """Restore window to normal size"""
+        return await self._window_action("/window/restore", title, pid, hwnd)
+
+    async def window_state(self, title: Optional[str] = None, pid: Optional[int] = None,
+                           hwnd: Optional[int] = None) -> Dict:
+        """Get window state"""
+        return await self._window_action("/window/state", title, pid, hwnd)
+
+    async def wait_for(self, *conditions: Dict[str, Any], timeout: float = 10.0,
+                       interval: Optional[float] = None) -> Dict:
+        """Block until any condition holds on the agent (see WindowsControl.wait_for)"""
+        data = {"conditions": list(conditions), "timeout": timeout}
+        if interval is not None:
+            data["interval"] = interval
+        return await self._request("POST", "/wait", json=data, timeout=aiohttp.ClientTimeout(
+            sock_connect=CONNECT_TIMEOUT,
+            sock_read=self.timeouts.get('/wait', DEFAULT_TIMEOUT) + timeout
+        ))
+
+    async def version(self) -> Dict:
+        """Get version information"""
+        return await self._request("GET", "/version")
+
+def _write_bytes(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
@@ -9,10 +9,13 @@ import sys
 import json
 import time
 import base64
+import hashlib
 import requests
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+import tracing
+
 # Try to import windows_control if available
 try:
     from windows_control import WindowsControl
@@ -21,6 +24,23 @@ except ImportError:
     HAS_WINDOWS_CONTROL = False
     print("Warning: windows_control not found. Limited functionality.")
 
+# ShowUI processor pixel budget (processor_config.max_pixels in showui_config.json);
+# larger screenshots are only downscaled again by the model
+SHOWUI_MAX_PIXELS = 1048576
+
+# Screen pixels per screenshot pixel for the last agent capture (x, y)
+screen_scale = (1.0, 1.0)
+
+# Last screenshot (with its agent ETag) and ShowUI answers per image + query,
+# so an unchanged screen skips both the transfer and model inference
+CACHE_DIR = Path.home() / ".cache" / "sekizos"
+SCREENSHOT_CACHE = CACHE_DIR / "showui_screenshot.png"
+SCREENSHOT_META = CACHE_DIR / "showui_screenshot.json"
+RESULT_CACHE = CACHE_DIR / "showui_results.json"
+RESULT_CACHE_SIZE = 256
+use_cache = True
+_result_cache: Optional[Dict[str, Any]] = None
+
 # ANSI color codes for pretty output
 class Colors:
     GREEN = '\033[92m'
@@ -38,21 +58,51 @@ def print_colored(text: str, color: str = Colors.RESET, bold: bool = False):
     else:
         print(f"{color}{text}{Colors.RESET}")
 
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    except Exception as e:
+        print_colored(f"Warning: could not write cache: {e}", Colors.YELLOW)
+
 def get_screenshot() -> Optional[str]:
     """Get screenshot from Windows Agent"""
+    global screen_scale
+    
     if not HAS_WINDOWS_CONTROL:
         return None
     
     try:
-        win = WindowsControl()
-        win.screenshot("_temp_screenshot.png")
-        
-        with open("_temp_screenshot.png", "rb") as f:
-            image_data = base64.b64encode(f.read()).decode()
-        
-        # Clean up temp file
-        Path("_temp_screenshot.png").unlink(missing_ok=True)
-        return image_data
+        with tracing.span('screenshot') as span:
+            win = WindowsControl()
+            meta = _read_json(SCREENSHOT_META) if use_cache and SCREENSHOT_CACHE.exists() else {}
+            
+            # Let the agent downscale to what the model will actually look at
+            image_bytes, info = win.screenshot_raw(max_pixels=SHOWUI_MAX_PIXELS, etag=meta.get('etag'))
+            if info.get('unchanged'):
+                print("Screen unchanged, reusing cached screenshot")
+                span.set(unchanged=True)
+                image_bytes = SCREENSHOT_CACHE.read_bytes()
+                info = meta
+            elif not image_bytes:
+                return None
+            elif use_cache:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                SCREENSHOT_CACHE.write_bytes(image_bytes)
+                _write_json(SCREENSHOT_META, info)
+            
+            screen_scale = (info['source_width'] / info['width'], info['source_height'] / info['height'])
+            
+            # ShowUI takes base64 in JSON; encode once, straight from the response body
+            return base64.b64encode(image_bytes).decode()
     except Exception as e:
         print_colored(f"Error getting screenshot: {e}", Colors.RED)
         return None
@@ -66,16 +116,43 @@ def load_image(image_path: str) -> Optional[str]:
         print_colored(f"Error loading image: {e}", Colors.RED)
         return None
 
+def _cache_key(image_data: str, query: str, showui_url: str) -> str:
+    digest = hashlib.blake2b(image_data.encode(), digest_size=16)
+    digest.update(f"\0{query}\0{showui_url}".encode())
+    return digest.hexdigest()
+
 def query_showui(image_data: str, query: str, showui_url: str = "http://localhost:8766/vision/analyze") -> Dict[str, Any]:
-    """Send query to ShowUI service"""
+    """Send query to ShowUI service (answers for the same image and query come from cache)"""
+    global _result_cache
+    
+    key = _cache_key(image_data, query, showui_url)
+    if use_cache:
+        if _result_cache is None:
+            _result_cache = _read_json(RESULT_CACHE)
+        if key in _result_cache:
+            return dict(_result_cache[key], cached=True)
+    
     try:
-        response = requests.post(showui_url, json={
-            "image": image_data,
-            "query": query
-        }, timeout=30)
+        with tracing.span('showui analyze', query=query) as span:
+            response = requests.post(showui_url, json={
+                "image": image_data,
+                "query": query
+            }, headers={'traceparent': span.traceparent()}, timeout=30)
+            span.set(status=response.status_code)
         
         if response.status_code == 200:
-            return response.json()
+            result = response.json()
+            if 'inference_time' in result:
+                # Model time vs transfer/queueing around it
+                tracing.record_span('showui inference', span.trace_id, span.span_id,
+                                    span.start, result['inference_time'] * 1000)
+            if use_cache and result.get('success'):
+                _result_cache[key] = result
+                # Dicts keep insertion order, so the oldest entries go first
+                while len(_result_cache) > RESULT_CACHE_SIZE:
+                    del _result_cache[next(iter(_result_cache))]
+                _write_json(RESULT_CACHE, _result_cache)
+            return result
         else:
             return {"success": False, "error": f"HTTP {response.status_code}"}
     except requests.exceptions.Timeout:
@@ -98,7 +175,8 @@ def format_result(query: str, result: Dict[str, Any], show_response: bool = Fals
         
         # Show inference time if available
         if 'inference_time' in result:
-            print(f"  ⏱  Time: {result['inference_time']:.2f}s")
+            cached = " (cached)" if result.get('cached') else ""
+            print(f"  ⏱  Time: {result['inference_time']:.2f}s{cached}")
     else:
         print_colored("  ✗ Not found", Colors.YELLOW)
     
@@ -115,14 +193,17 @@ def click_element(image_data: str, query: str, showui_url: str = "http://localho
     
     if result.get('success') and result.get('found'):
         coords = result.get('coordinates', {})
-        x, y = coords.get('x', 0), coords.get('y', 0)
+        # Map from screenshot pixels back to screen pixels
+        x = round(coords.get('x', 0) * screen_scale[0])
+        y = round(coords.get('y', 0) * screen_scale[1])
         
         print_colored(f"Found element at ({x}, {y})", Colors.GREEN)
         print(f"Clicking...")
         
         try:
-            win = WindowsControl()
-            win.click(x, y)
+            with tracing.span('click', x=x, y=y):
+                win = WindowsControl()
+                win.click(x, y)
             print_colored("✓ Clicked successfully!", Colors.GREEN, bold=True)
             return True
         except Exception as e:
@@ -177,7 +258,8 @@ def analyze_ui(image_data: str, analysis_type: str = "general") -> List[Dict[str
                 'coordinates': result.get('coordinates', {}) if result.get('found') else None
             })
         
-        time.sleep(0.5)  # Don't overwhelm the service
+        if not result.get('cached'):
+            time.sleep(0.5)  # Don't overwhelm the service
     
     # Summary
     found_count = sum(1 for r in results if r['found'])
@@ -266,14 +348,39 @@ Examples:
                         help='Show full model response')
     parser.add_argument('--url', default='http://localhost:8766/vision/analyze',
                         help='ShowUI service URL')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always fetch a new screenshot and re-run inference')
+    parser.add_argument('--trace', nargs='?', const=str(tracing.DEFAULT_SPAN_PATH), metavar='SPANS.jsonl',
+                        help='Collect spans (screenshot, inference, agent calls) and print a waterfall')
     
     args = parser.parse_args()
     
+    global use_cache
+    use_cache = not args.no_cache
+    
     # Validate arguments
     if not any([args.query, args.click, args.analyze]):
         parser.print_help()
         sys.exit(1)
     
+    if args.trace:
+        tracing.enable(args.trace)
+    
+    exit_code = 0
+    with tracing.span('showui', command=' '.join(sys.argv[1:])) as root:
+        try:
+            run(args)
+        except SystemExit as e:
+            exit_code = e.code
+    
+    # The root span is written when it closes, so render after the with block
+    if args.trace:
+        print()
+        print(tracing.waterfall(tracing.load_spans(args.trace), root.trace_id))
+    sys.exit(exit_code)
+
+def run(args):
+    """Take or load the image, then run the click, analysis or queries"""
     # Get image data
     if args.image:
         image_data = load_image(args.image)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Trace correlation for SekizOS tools
+One trace id (W3C traceparent) carried from showui_cli through WindowsControl
+to the Windows Agent and the ShowUI service, spans collected into a local
+JSONL file and printed as a waterfall
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+DEFAULT_SPAN_PATH = Path.home() / ".cache" / "sekizos" / "spans.jsonl"
+
+_current: contextvars.ContextVar = contextvars.ContextVar('sekizos_span', default=None)
+
+def new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+def parse_traceparent(header: Optional[str]) -> Optional[Dict[str, str]]:
+    """trace_id and parent span id from a '00-<trace>-<span>-<flags>' header"""
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return {'trace_id': parts[1], 'span_id': parts[2]}
+
+class Span:
+    """One timed operation; start is wall-clock seconds, duration is ms"""
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                 **attrs):
+        self.name = name
+        self.trace_id = trace_id or new_id(16)
+        self.span_id = new_id(8)
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set(self, **attrs) -> 'Span':
+        self.attrs.update(attrs)
+        return self
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start_perf) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': round(self.duration_ms or 0.0, 3),
+            'attrs': self.attrs
+        }
+
+class SpanCollector:
+    """Appends finished spans to a JSONL file; does nothing when no path is set"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def write(self, record: Dict[str, Any]):
+        if not self.path:
+            return
+        line = json.dumps(record)
+        with self._lock:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+def _collector_path() -> Optional[str]:
+    path = os.environ.get('SEKIZOS_TRACE')
+    if path == '1':
+        return str(DEFAULT_SPAN_PATH)
+    return path or None
+
+# SEKIZOS_TRACE=1 (default file) or SEKIZOS_TRACE=<path> turns collection on
+collector = SpanCollector(_collector_path())
+
+def enable(path: Optional[str] = None):
+    """Start collecting spans (to DEFAULT_SPAN_PATH unless a path is given)"""
+    collector.path = str(path or DEFAULT_SPAN_PATH)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def traceparent() -> Optional[str]:
+    """Header value for calls made inside the current span"""
+    span = _current.get()
+    return span.traceparent() if span else None
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a child of the current span (or as a new trace root)"""
+    parent = _current.get()
+    current = Span(name, parent.trace_id if parent else None, parent.span_id if parent else None, **attrs)
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=str(e))
+        raise
+    finally:
+        _current.reset(token)
+        current.finish()
+        collector.write(current.to_dict())
+
+def record_span(name: str, trace_id: str, parent_id: Optional[str], start: float, duration_ms: float,
+                span_id: Optional[str] = None, **attrs) -> str:
+    """Write an already-measured span (e.g. timings reported by a remote service)"""
+    span_id = span_id or new_id(8)
+    collector.write({
+        'trace_id': trace_id,
+        'span_id': span_id,
+        'parent_id': parent_id,
+        'name': name,
+        'start': round(start, 6),
+        'duration_ms': round(duration_ms, 3),
+        'attrs': attrs
+    })
+    return span_id
+
+def load_spans(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read spans from a collector file, skipping torn lines"""
+    spans = []
+    with open(path or collector.path or DEFAULT_SPAN_PATH) as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    return spans
+
+def waterfall(spans: List[Dict[str, Any]], trace_id: Optional[str] = None, width: int = 40) -> str:
+    """Render one trace (the most recent by default) as an indented timeline"""
+    if not spans:
+        return "No spans collected"
+    if trace_id is None:
+        trace_id = max(spans, key=lambda s: s['start'] + s['duration_ms'] / 1000)['trace_id']
+    spans = [s for s in spans if s['trace_id'].startswith(trace_id)]
+    if not spans:
+        return f"No spans for trace {trace_id}"
+
+    t0 = min(s['start'] for s in spans)
+    end = max(s['start'] + s['duration_ms'] / 1000 for s in spans)
+    total_ms = max((end - t0) * 1000, 0.001)
+
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s['span_id'] for s in spans}
+    for s in spans:
+        parent = s['parent_id'] if s['parent_id'] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    lines = [f"trace {spans[0]['trace_id']}  {total_ms:.1f} ms"]
+
+    def walk(parent: Optional[str], depth: int):
+        for s in sorted(children.get(parent, []), key=lambda s: s['start']):
+            offset_ms = (s['start'] - t0) * 1000
+            left = int(offset_ms / total_ms * width)
+            bar = max(1, round(s['duration_ms'] / total_ms * width))
+            bar = min(bar, width - left) if left < width else 1
+            name = ('  ' * depth + s['name'])[:44]
+            lines.append(f"{offset_ms:9.1f} {s['duration_ms']:9.1f}  {name:44} "
+                         f"|{' ' * min(left, width - 1)}{'#' * bar}{' ' * max(0, width - left - bar)}|")
+            walk(s['span_id'], depth + 1)
+
+    walk(None, 0)
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Print a waterfall of collected spans')
+    parser.add_argument('trace_id', nargs='?', help='Trace id or prefix (default: most recent trace)')
+    parser.add_argument('-f', '--file', help=f'Span file (default: $SEKIZOS_TRACE or {DEFAULT_SPAN_PATH})')
+    args = parser.parse_args()
+
+    try:
+        spans = load_spans(args.file)
+    except FileNotFoundError as e:
+        print(f"No span file: {e.filename}")
+        sys.exit(1)
+    print(waterfall(spans, args.trace_id))
+
+if __name__ == "__main__":
+    main()
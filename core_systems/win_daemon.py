@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Resident `win` client daemon
+Keeps a warm WindowsControl (agent info loaded, keep-alive connection open)
+behind a Unix socket so shell aliases skip interpreter, requests import and
+connection setup on every command
+
+Usage:
+    win daemon start|stop|status
+    python3 win_daemon.py serve        # run in the foreground
+
+The launcher half of this module only imports the standard library, so the
+`win` script can run it under `python3 -S` and fall back to running the
+command in-process when no daemon is listening.
+"""
+
+import _socket
+import os
+import stat
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IDLE_TIMEOUT = float(os.environ.get('WIN_DAEMON_IDLE', '1800'))
+CONNECT_TIMEOUT = 0.5
+MAX_MESSAGE = 16 * 1024 * 1024
+# Commands that take local paths and so run in the caller's directory
+LOCAL_PATH_COMMANDS = {'screenshot', 'download', 'upload', 'sync', 'stats'}
+
+def socket_path() -> str:
+    """Per-user socket path ($WIN_DAEMON_SOCKET, else under XDG_RUNTIME_DIR or a 0700 directory in /tmp)"""
+    path = os.environ.get('WIN_DAEMON_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'sekizos-win.sock')
+    return f'/tmp/sekizos-win-{os.getuid()}/win.sock'
+
+def _private(path, kind):
+    """True if path is a `kind` (S_ISSOCK, S_ISDIR) of ours that no other user can write to
+
+    Anyone can create a path in /tmp; a daemon socket that isn't ours would
+    see every command's argv and cwd and could answer with anything.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return kind(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+# The launcher talks through _socket: the socket module pulls in enum and
+# selectors, which costs more than the rest of the launcher's startup.
+# Wire format (no json, so the launcher skips the json/re imports):
+# request  = cwd and argv joined by NUL, then the client shuts down writing
+# response = "<exit code>\n" followed by the command's output, then close
+
+def _recv_all(sock, limit=MAX_MESSAGE):
+    chunks = []
+    size = 0
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b''.join(chunks)
+        size += len(chunk)
+        if size > limit:
+            raise ValueError('Message too large')
+        chunks.append(chunk)
+
+def _send_request(sock, argv):
+    sock.sendall('\0'.join([os.getcwd()] + list(argv)).encode('utf-8', 'surrogateescape'))
+    sock.shutdown(_socket.SHUT_WR)
+
+def _read_request(sock):
+    """(cwd, argv) sent by a launcher"""
+    parts = _recv_all(sock).decode('utf-8', 'surrogateescape').split('\0')
+    return parts[0], parts[1:]
+
+def _send_reply(sock, output, code):
+    sock.sendall(f"{code}\n{output}".encode('utf-8', 'replace'))
+
+# Launcher side (standard library only)
+
+def call_daemon(argv, path=None):
+    """Run a win command in the daemon; returns (output, code) or None if none of ours is running"""
+    path = path or socket_path()
+    if not _private(path, stat.S_ISSOCK):
+        return None
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    try:
+        # Commands can legitimately take as long as the agent call behind them
+        sock.settimeout(None)
+        _send_request(sock, argv)
+        reply = _recv_all(sock)
+    finally:
+        sock.close()
+    code, sep, output = reply.decode('utf-8', 'replace').partition('\n')
+    if not sep:
+        return None
+    return output, int(code)
+
+def start_daemon(wait=3.0):
+    """Start the daemon in the background and wait until it accepts commands"""
+    import subprocess
+
+    if call_daemon(['win', '__ping__']) is not None:
+        return True
+    subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'win_daemon.py'), 'serve'],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if call_daemon(['win', '__ping__']) is not None:
+            return True
+        time.sleep(0.02)
+    return False
+
+def daemon_command(action):
+    """win daemon start|stop|status"""
+    if action == 'start':
+        if start_daemon():
+            print(f"win daemon running on {socket_path()}")
+            return 0
+        print("win daemon failed to start")
+        return 1
+    if action == 'stop':
+        if call_daemon(['win', '__stop__']) is None:
+            print("win daemon not running")
+        else:
+            print("win daemon stopped")
+        return 0
+    if action == 'status':
+        reply = call_daemon(['win', '__status__'])
+        print(reply[0] if reply else "win daemon not running")
+        return 0 if reply else 1
+    print("Usage: win daemon <start|stop|status>")
+    return 1
+
+def run(argv):
+    """Entry point for the thin `win` launcher; returns the exit code"""
+    if len(argv) > 1 and argv[1] == 'daemon':
+        return daemon_command(argv[2] if len(argv) > 2 else '')
+
+    reply = call_daemon(argv)
+    if reply is None and os.environ.get('WIN_DAEMON') == 'auto' and start_daemon():
+        reply = call_daemon(argv)
+    if reply is not None:
+        output, code = reply
+        sys.stdout.write(output)
+        return code
+
+    # No daemon: run in this process (needs site-packages for requests)
+    if 'site' not in sys.modules:
+        import site
+        site.main()
+    sys.path.insert(0, HERE)
+    from windows_control import main
+    return main(argv) or 0
+
+# Daemon side
+
+class _ThreadOutput:
+    """sys.stdout/sys.stderr stand-in that sends each command thread's output to its own buffer"""
+
+    def __init__(self, fallback, local):
+        self._fallback = fallback
+        self._local = local
+
+    def _target(self):
+        return getattr(self._local, 'output', None) or self._fallback
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+class _CwdGate:
+    """Lets commands from the same directory run together
+
+    The working directory is process-wide, so a command from another
+    directory waits until the ones running have finished. Only commands
+    in LOCAL_PATH_COMMANDS go through the gate.
+    """
+
+    def __init__(self):
+        import threading
+        self._cond = threading.Condition()
+        self._cwd = None
+        self._active = 0
+
+    def enter(self, cwd):
+        with self._cond:
+            while self._active and self._cwd != cwd:
+                self._cond.wait()
+            if not self._active:
+                os.chdir(cwd)
+                self._cwd = cwd
+            self._active += 1
+
+    def leave(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+def serve(path=None):
+    """Accept commands on the Unix socket until stopped or idle for IDLE_TIMEOUT
+
+    Each connection is served on its own thread, so a long command (a
+    sync, a wait, a slow PowerShell call) doesn't hold up the others.
+    """
+    import io
+    import socket
+    import threading
+
+    sys.path.insert(0, HERE)
+    from windows_control import WindowsControl, load_agent_info, main
+
+    path = path or socket_path()
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, mode=0o700)
+    # An explicit $WIN_DAEMON_SOCKET may sit anywhere; the default directories must be ours alone
+    if not os.environ.get('WIN_DAEMON_SOCKET') and not _private(directory, stat.S_ISDIR):
+        print(f"win daemon: {directory} is not a private directory of this user")
+        return
+    if os.path.lexists(path):
+        if call_daemon(['win', '__ping__'], path) is not None:
+            print(f"win daemon already running on {path}")
+            return
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    # Wake up now and then to notice a stop request or the idle timeout
+    server.settimeout(min(IDLE_TIMEOUT, 1.0))
+
+    local = threading.local()
+    sys.stdout = _ThreadOutput(sys.stdout, local)
+    sys.stderr = _ThreadOutput(sys.stderr, local)
+    lock = threading.Lock()
+    gate = _CwdGate()
+    stop = threading.Event()
+    agent_info = load_agent_info()
+    state = {'win': WindowsControl(agent_info=agent_info) if agent_info else None,
+             'served': 0, 'active': 0, 'last_active': time.monotonic()}
+    started = time.time()
+
+    def client():
+        """The current client, replaced when the agent restarts (new address or token)"""
+        current = load_agent_info()
+        with lock:
+            win = state['win']
+            if current and (win is None or current != win.agent_info):
+                # Commands still running keep the old client until they finish
+                win = state['win'] = WindowsControl(agent_info=current)
+            return win
+
+    def handle(conn):
+        with conn:
+            conn.settimeout(CONNECT_TIMEOUT * 10)
+            try:
+                cwd, argv = _read_request(conn)
+            except (OSError, ValueError):
+                return
+            argv = argv or ['win']
+            command = argv[1] if len(argv) > 1 else ''
+
+            if command == '__ping__':
+                _send_reply(conn, '', 0)
+                return
+            if command == '__stop__':
+                stop.set()
+                _send_reply(conn, '', 0)
+                return
+            if command == '__status__':
+                win = state['win']
+                stats = win.connection_stats() if win else {}
+                _send_reply(conn, f"win daemon pid {os.getpid()}, up {time.time() - started:.0f}s, "
+                                  f"{state['served']} commands, {state['active']} running, {stats}", 0)
+                return
+
+            win = client()
+            conn.settimeout(None)
+            output = io.StringIO()
+            local.output = output
+            code = 0
+            local_paths = command.lower() in LOCAL_PATH_COMMANDS
+            if local_paths:
+                gate.enter(cwd or '/')
+            try:
+                if win is None:
+                    print("Error: Windows Agent not found! Please install and run the agent first.")
+                    code = 1
+                else:
+                    code = main(argv, win) or 0
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                output.write(f"Error: {e}\n")
+                code = 1
+            finally:
+                if local_paths:
+                    gate.leave()
+                local.output = None
+            with lock:
+                state['served'] += 1
+            try:
+                _send_reply(conn, output.getvalue(), code)
+            except OSError:
+                pass
+
+    def run_connection(conn):
+        try:
+            handle(conn)
+        finally:
+            with lock:
+                state['active'] -= 1
+                state['last_active'] = time.monotonic()
+
+    try:
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                with lock:
+                    idle = not state['active'] and time.monotonic() - state['last_active'] >= IDLE_TIMEOUT
+                if idle:
+                    break
+                continue
+            with lock:
+                state['active'] += 1
+            threading.Thread(target=run_connection, args=(conn,), daemon=True).start()
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+        if state['win']:
+            state['win'].close()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve()
+    else:
+        sys.exit(run(['win'] + sys.argv[1:]))
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Delta sync of a local directory tree to Windows
+Asks the agent for block signatures of the files it already has, then
+sends only what changed: new files whole, changed files as patches of
+block copies and new bytes (rsync's rolling checksum), several at a time.
+Unchanged files (same size and modification time) cost nothing but their
+entry in the signature request.
+"""
+
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+# Must match file_sync.py on the agent
+OP_COPY = b'C'
+OP_LITERAL = b'L'
+OP_HEADER = struct.Struct('>II')
+LENGTH = struct.Struct('>I')
+
+# Files per /sync/signature request
+SIGNATURE_BATCH = 128
+# Larger files are compared block by block at the same offsets only,
+# streamed from disk; smaller than WHOLE_FILE_BELOW isn't worth a delta
+ROLLING_LIMIT = 32 * 1024 * 1024
+WHOLE_FILE_BELOW = 1024
+# Largest literal record in a patch
+MAX_LITERAL = 1024 * 1024
+READ_CHUNK = 1024 * 1024
+# Modification times closer than this count as equal (as on the agent)
+MTIME_TOLERANCE = 0.001
+
+def weak_checksum(block: bytes) -> int:
+    """rsync's checksum: a = sum of bytes, b = sum of running sums, both mod 2^16"""
+    return (sum(block) & 0xffff) | (sum(accumulate(block)) & 0xffff) << 16
+
+def strong_checksum(block: bytes) -> str:
+    return hashlib.blake2b(block, digest_size=8).hexdigest()
+
+def new_digest():
+    """Whole-file digest (client and agent must agree on it)"""
+    return hashlib.blake2b(digest_size=32)
+
+def file_digest(path: str) -> str:
+    digest = new_digest()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class Patch:
+    """Patch records for the agent, merging adjacent block copies"""
+
+    def __init__(self):
+        self.body = bytearray()
+        self.literal_bytes = 0
+        self.copied_blocks = 0
+        self._run: Optional[List[int]] = None
+
+    def copy(self, block: int):
+        self.copied_blocks += 1
+        if self._run and self._run[0] + self._run[1] == block:
+            self._run[1] += 1
+            return
+        self._flush_run()
+        self._run = [block, 1]
+
+    def literal(self, data: bytes):
+        if not data:
+            return
+        self._flush_run()
+        self.literal_bytes += len(data)
+        for start in range(0, len(data), MAX_LITERAL):
+            piece = data[start:start + MAX_LITERAL]
+            self.body += OP_LITERAL + LENGTH.pack(len(piece)) + piece
+
+    def _flush_run(self):
+        if self._run:
+            self.body += OP_COPY + OP_HEADER.pack(*self._run)
+            self._run = None
+
+    def finish(self) -> bytes:
+        self._flush_run()
+        return bytes(self.body)
+
+def compute_delta(data: bytes, signature: Dict[str, Any]) -> Patch:
+    """Patch that turns the agent's file (described by signature) into data
+
+    Finds the agent's blocks anywhere in data by rolling the weak checksum
+    one byte at a time and confirming with the strong one, so inserts and
+    deletes only cost the bytes around them.
+    """
+    block_size = signature['block_size']
+    strong = signature['strong']
+    patch = Patch()
+    n = len(data)
+
+    blocks: Dict[int, List[int]] = {}
+    for index, weak in enumerate(signature['weak']):
+        # The short last block can only match at the very end; see below
+        if index < len(strong) - 1 or signature['size'] % block_size == 0:
+            blocks.setdefault(weak, []).append(index)
+
+    def find(window: bytes, weak: int) -> Optional[int]:
+        candidates = blocks.get(weak)
+        if candidates:
+            digest = strong_checksum(window)
+            for index in candidates:
+                if strong[index] == digest:
+                    return index
+        return None
+
+    literal_start = 0
+    pos = 0
+    a = b = 0
+    if n >= block_size and blocks:
+        weak = weak_checksum(data[:block_size])
+        a, b = weak & 0xffff, weak >> 16
+    while blocks and pos + block_size <= n:
+        index = find(data[pos:pos + block_size], a | b << 16)
+        if index is not None:
+            patch.literal(data[literal_start:pos])
+            patch.copy(index)
+            pos += block_size
+            literal_start = pos
+            if pos + block_size <= n:
+                weak = weak_checksum(data[pos:pos + block_size])
+                a, b = weak & 0xffff, weak >> 16
+            continue
+        if pos + block_size < n:
+            out, new = data[pos], data[pos + block_size]
+            a = (a - out + new) & 0xffff
+            b = (b - block_size * out + a) & 0xffff
+        pos += 1
+
+    # The agent's last block, when shorter than block_size, may end the file
+    tail = signature['size'] % block_size
+    if tail and strong and n - tail >= literal_start and strong[-1] == strong_checksum(data[n - tail:]):
+        patch.literal(data[literal_start:n - tail])
+        patch.copy(len(strong) - 1)
+    else:
+        patch.literal(data[literal_start:])
+    return patch
+
+def aligned_delta(f, signature: Dict[str, Any]) -> Tuple[Patch, str]:
+    """Patch and digest for a large file, comparing blocks at their own offsets only"""
+    block_size = signature['block_size']
+    strong = signature['strong']
+    patch = Patch()
+    digest = new_digest()
+    for index, block in enumerate(iter(lambda: f.read(block_size), b'')):
+        digest.update(block)
+        if index < len(strong) and strong[index] == strong_checksum(block):
+            patch.copy(index)
+        else:
+            patch.literal(block)
+    return patch, digest.hexdigest()
+
+def scan_tree(local_dir: str) -> Dict[str, Tuple[str, int, float]]:
+    """rel ('/'-separated) -> (path, size, mtime) for every file under local_dir"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(local_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rel = os.path.relpath(path, local_dir).replace(os.sep, '/')
+            files[rel] = (path, stat.st_size, stat.st_mtime)
+    return files
+
+def _send_file(win, root: str, rel: str, path: str, size: int, mtime: float,
+               signature: Any) -> Dict[str, Any]:
+    """Send one file as a patch against signature, or whole; returns its outcome"""
+    if isinstance(signature, dict):
+        with open(path, 'rb') as f:
+            if size > ROLLING_LIMIT:
+                patch, digest = aligned_delta(f, signature)
+            else:
+                data = f.read()
+                hasher = new_digest()
+                hasher.update(data)
+                digest = hasher.hexdigest()
+                patch = None
+        if digest == signature['digest'] and size == signature['size']:
+            if abs(signature['mtime'] - mtime) < MTIME_TOLERANCE:
+                return {'rel': rel, 'status': 'unchanged', 'sent': 0, 'literal': 0}
+            # Same content, different time: an all-copy patch just sets the time
+            patch = compute_delta(data, signature) if patch is None else patch
+        elif patch is None and size >= WHOLE_FILE_BELOW:
+            patch = compute_delta(data, signature)
+        if patch is not None:
+            body = patch.finish()
+            result = win.patch_file(root, rel, body, size, digest, mtime, block_size=signature['block_size'])
+            if result.get('success'):
+                status = 'unchanged' if digest == signature['digest'] else 'updated'
+                return {'rel': rel, 'status': status, 'sent': len(body), 'literal': patch.literal_bytes}
+            # The agent's copy changed after its signature was taken; send it all
+
+    with open(path, 'rb') as f:
+        result = win.patch_file(root, rel, f, size, file_digest(path), mtime, whole=True)
+    status = 'new' if signature == 'missing' else 'updated'
+    if not result.get('success'):
+        return {'rel': rel, 'status': 'failed', 'sent': size, 'literal': size, 'error': result.get('error')}
+    return {'rel': rel, 'status': status, 'sent': size, 'literal': size}
+
+def sync_tree(win, local_dir: str, remote_dir: str, workers: int = 4, checksum: bool = False,
+              batch_size: int = SIGNATURE_BATCH) -> Dict[str, Any]:
+    """Make remote_dir hold the same files as local_dir, sending only differences
+
+    Files only on the Windows side are left alone. checksum=True compares
+    content even when size and modification time match. Returns counts of
+    new/updated/unchanged/failed files, bytes in the tree, bytes sent and
+    the failures.
+    """
+    start = time.perf_counter()
+    files = scan_tree(local_dir)
+    names = list(files)
+    batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+
+    def signatures_for(batch: List[str]) -> Dict[str, Any]:
+        offered = {rel: {'size': files[rel][1], 'mtime': files[rel][2]} for rel in batch}
+        result = win.file_signatures(remote_dir, offered, checksum=checksum)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', 'signature request failed'))
+        return result['files']
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        remote: Dict[str, Any] = {}
+        for answer in pool.map(signatures_for, batches):
+            remote.update(answer)
+
+        def transfer(rel: str) -> Dict[str, Any]:
+            path, size, mtime = files[rel]
+            try:
+                return _send_file(win, remote_dir, rel, path, size, mtime, remote.get(rel, 'missing'))
+            except OSError as e:
+                return {'rel': rel, 'status': 'failed', 'sent': 0, 'literal': 0, 'error': str(e)}
+
+        changed = [rel for rel in names if remote.get(rel) != 'same']
+        outcomes = list(pool.map(transfer, changed))
+
+    summary = {'files': len(files), 'new': 0, 'updated': 0, 'unchanged': len(files) - len(outcomes), 'failed': 0}
+    for outcome in outcomes:
+        summary[outcome['status']] += 1
+    summary.update({
+        'bytes': sum(entry[1] for entry in files.values()),
+        'sent': sum(outcome['sent'] for outcome in outcomes),
+        'literal': sum(outcome['literal'] for outcome in outcomes),
+        'errors': {o['rel']: o.get('error') for o in outcomes if o['status'] == 'failed'},
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+    summary['success'] = not summary['failed']
+    return summary
+
+def main(argv: Optional[List[str]] = None, win=None):
+    """win sync <local-dir> <windows-dir> [-j N] [--checksum]"""
+    parser = argparse.ArgumentParser(prog='win sync', description='Delta-sync a local directory to Windows')
+    parser.add_argument('local_dir')
+    parser.add_argument('remote_dir')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Files sent at a time (default: 4)')
+    parser.add_argument('-c', '--checksum', action='store_true',
+                        help='Compare content even when size and modification time match')
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.local_dir):
+        print(f"Not a directory: {args.local_dir}")
+        return 2
+
+    if win is None:
+        from windows_control import WindowsControl
+        win = WindowsControl()
+    try:
+        result = sync_tree(win, args.local_dir, args.remote_dir, workers=args.jobs, checksum=args.checksum)
+    except RuntimeError as e:
+        print(f"Sync failed: {e}")
+        return 1
+    print(f"{result['files']} files: {result['new']} new, {result['updated']} updated, "
+          f"{result['unchanged']} unchanged, {result['failed']} failed; "
+          f"sent {result['sent']} of {result['bytes']} bytes in {result['elapsed_ms'] / 1000:.2f}s")
+    for rel, error in result['errors'].items():
+        print(f"  {rel}: {error}")
+    return 0 if result['success'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,63 +9,779 @@ import sys
 import json
 import base64
 import time
+import random
+import shutil
+import struct
+import threading
+import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from collections import deque
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+# Span collection is optional; calls carry a traceparent header either way
+try:
+    import tracing as _tracing
+except ImportError:
+    _tracing = None
+
+# Direct file I/O through the WSL drive mounts is optional too
+try:
+    import wsl_paths as _wsl
+except ImportError:
+    _wsl = None
+
+# Endpoints that only read state and can safely be sent again on failure
+IDEMPOTENT_ENDPOINTS = {
+    '/health', '/version', '/screenshot', '/screenshot/raw', '/screenshot/delta', '/process/list',
+    '/file/read', '/file/list', '/file/download', '/window/list', '/window/state',
+    '/update/check', '/update/status', '/sync/signature', '/file/search',
+    # Chunks are written at an explicit offset, so a resend overwrites the same bytes;
+    # a resent final chunk carries the upload's id, so the agent knows it already completed
+    '/file/upload'
+}
+
+# Read timeouts (seconds) per endpoint; anything else uses DEFAULT_TIMEOUT
+DEFAULT_TIMEOUT = 30
+CONNECT_TIMEOUT = 5
+ENDPOINT_TIMEOUTS = {
+    '/mouse/click': 10,
+    '/mouse/move': 10,
+    '/keyboard/key': 10,
+    '/powershell': 60,
+    '/file/read': 60,
+    '/file/write': 60,
+    '/file/download': 60,
+    '/file/upload': 120,
+    '/sync/signature': 120,
+    '/sync/patch': 120
+}
+
+# Bytes per /file/upload request and per write while downloading
+UPLOAD_CHUNK = 8 * 1024 * 1024
+DOWNLOAD_CHUNK = 1024 * 1024
+
+# Gateway errors worth retrying for idempotent endpoints
+RETRY_STATUS_CODES = {502, 503, 504}
+
+# Per-call timing phases (ms); calls kept per endpoint for rolling percentiles
+TIMING_PHASES = ('connect_ms', 'send_ms', 'wait_ms', 'queue_ms', 'server_ms', 'network_ms',
+                 'download_ms', 'decode_ms', 'total_ms')
+TIMING_WINDOW = 500
+DEFAULT_TRACE_PATH = Path.home() / ".cache" / "sekizos" / "win_trace.jsonl"
+
+# Timing dict of the call in flight on this thread, filled in by TimedHTTPConnection
+_call_timing = threading.local()
+
+def _current_timing() -> Optional[Dict[str, Any]]:
+    return getattr(_call_timing, 'current', None)
+
+# Monotonic time by which calls on this thread must give up (see WindowsControl.deadline)
+_call_deadline = threading.local()
+
+class TimedHTTPConnection(HTTPConnection):
+    """urllib3 connection that adds connect, send and wait times to the current call"""
+    
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        timing = _current_timing()
+        if timing is not None:
+            timing['connect_ms'] += (time.perf_counter() - start) * 1000
+            timing['reused'] = False
+    
+    def request(self, *args, **kwargs):
+        timing = _current_timing()
+        connect_before = timing['connect_ms'] if timing is not None else 0.0
+        start = time.perf_counter()
+        super().request(*args, **kwargs)
+        if timing is not None:
+            # A lazy connect happens inside request(); don't count it as send time
+            elapsed = (time.perf_counter() - start) * 1000
+            timing['send_ms'] += elapsed - (timing['connect_ms'] - connect_before)
+    
+    def getresponse(self):
+        start = time.perf_counter()
+        response = super().getresponse()
+        timing = _current_timing()
+        if timing is not None:
+            now = time.perf_counter()
+            timing['wait_ms'] += (now - start) * 1000
+            timing['_headers_at'] = now
+        return response
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose plain-HTTP pools use TimedHTTPConnection"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(self.poolmanager.pool_classes_by_scheme,
+                                                       http=TimedHTTPConnectionPool)
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Durations (ms) from a Server-Timing header: 'queue;dur=0.2, app;dur=3.1'"""
+    durations = {}
+    for entry in (header or '').split(','):
+        parts = [p.strip() for p in entry.split(';')]
+        for param in parts[1:]:
+            if param.startswith('dur='):
+                try:
+                    durations[parts[0]] = float(param[4:])
+                except ValueError:
+                    pass
+    return durations
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def timing_summary(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-endpoint call counts, errors and p50/p95/p99 of each timing phase"""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        grouped.setdefault(f"{record.get('method', '?')} {record.get('endpoint', '?')}", []).append(record)
+    
+    summary = {}
+    for name, calls in sorted(grouped.items()):
+        entry = {
+            'count': len(calls),
+            'errors': sum(1 for c in calls if c.get('error')),
+            'reused': sum(1 for c in calls if c.get('reused'))
+        }
+        for phase in TIMING_PHASES:
+            values = sorted(c[phase] for c in calls if c.get(phase) is not None)
+            if values:
+                entry[phase] = {
+                    'p50': round(_percentile(values, 0.5), 2),
+                    'p95': round(_percentile(values, 0.95), 2),
+                    'p99': round(_percentile(values, 0.99), 2)
+                }
+        summary[name] = entry
+    return summary
+
+def _record_call_spans(timing: Dict[str, Any]):
+    """Write a call and its phases as spans; agent-side spans come from Server-Timing
+    
+    Only durations are known for the phases, so they are laid out one after
+    another, with the agent's work centred in the wait for the response.
+    """
+    trace_id = timing['trace_id']
+    call_id = timing['span_id']
+    start = timing['ts']
+    _tracing.record_span(f"{timing['method']} {timing['endpoint']}", trace_id, timing['parent_id'], start,
+                         timing['total_ms'], span_id=call_id, status=timing.get('status'),
+                         attempts=timing['attempts'], bytes=timing.get('bytes'), error=timing.get('error'))
+    
+    offset = 0.0
+    for phase in ('connect_ms', 'send_ms', 'wait_ms', 'download_ms', 'decode_ms'):
+        duration = timing.get(phase) or 0.0
+        if not duration:
+            continue
+        phase_id = _tracing.record_span(phase[:-3], trace_id, call_id, start + offset / 1000, duration)
+        if phase == 'wait_ms' and timing.get('server_timing'):
+            server = timing['server_timing']
+            agent_start = offset + (timing.get('network_ms') or 0.0) / 2
+            agent_id = _tracing.record_span('agent', trace_id, phase_id, start + agent_start / 1000,
+                                            server.get('app', 0.0))
+            # Queue wait and stages run inside the agent's handler time, in order
+            stage_offset = agent_start
+            for name, stage_ms in server.items():
+                if name == 'app':
+                    continue
+                _tracing.record_span(f'agent {name}', trace_id, agent_id, start + stage_offset / 1000, stage_ms)
+                stage_offset += stage_ms
+        offset += duration
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    """Read call records from a JSONL trace file, skipping torn lines"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+class CallTimings:
+    """Rolling per-endpoint call timings, optionally appended to a JSONL trace"""
+    
+    def __init__(self, window: int = TIMING_WINDOW, trace_path: Optional[str] = None):
+        self.window = window
+        self.trace_path = trace_path
+        self._calls: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        if trace_path:
+            Path(trace_path).parent.mkdir(parents=True, exist_ok=True)
+            self._trace = open(trace_path, 'a', buffering=1)
+    
+    def record(self, timing: Dict[str, Any]):
+        key = (timing['method'], timing['endpoint'])
+        line = json.dumps(timing) if self._trace else None
+        with self._lock:
+            calls = self._calls.get(key)
+            if calls is None:
+                calls = self._calls[key] = deque(maxlen=self.window)
+            calls.append(timing)
+            if line:
+                self._trace.write(line + '\n')
+    
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [timing for calls in self._calls.values() for timing in calls]
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return timing_summary(self.records())
+    
+    def close(self):
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+                self._trace = None
+
+def load_agent_info() -> Optional[Dict]:
+    """Load agent connection info"""
+    info_paths = [
+        "/mnt/c/Users/Uptake/.claude_agent_info",
+        Path.home() / ".claude_agent_info",
+        "/mnt/c/Users/" + os.environ.get('USER', '') + "/.claude_agent_info"
+    ]
+    
+    for path in info_paths:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except:
+            continue
+    return None
+
+class WindowsBatch:
+    """Queue of agent actions sent together through /batch"""
+    
+    def __init__(self, win: 'WindowsControl', stop_on_error: bool = True):
+        self.win = win
+        self.stop_on_error = stop_on_error
+        self.steps: List[Dict[str, Any]] = []
+        self.result: Dict[str, Any] = {}
+    
+    def _add(self, action: str, **params) -> 'WindowsBatch':
+        step = {'action': action}
+        step.update({k: v for k, v in params.items() if v is not None})
+        self.steps.append(step)
+        return self
+    
+    def click(self, x: int, y: int, button: str = "left"):
+        return self._add('click', x=x, y=y, button=button)
+    
+    def move(self, x: int, y: int):
+        return self._add('move', x=x, y=y)
+    
+    def type(self, text: str, mode: Optional[str] = None, interval: Optional[float] = None,
+             settle: Optional[float] = None):
+        return self._add('type', text=text, mode=mode, interval=interval, settle=settle)
+    
+    def key(self, keys: str | List[str]):
+        return self._add('key', keys=keys)
+    
+    def wait(self, seconds: float):
+        return self._add('wait', seconds=seconds)
+    
+    def focus_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                     hwnd: Optional[int] = None):
+        return self._add('focus', title=title, pid=pid, hwnd=hwnd)
+    
+    def maximize_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                        hwnd: Optional[int] = None):
+        return self._add('maximize', title=title, pid=pid, hwnd=hwnd)
+    
+    def minimize_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                        hwnd: Optional[int] = None):
+        return self._add('minimize', title=title, pid=pid, hwnd=hwnd)
+    
+    def restore_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                       hwnd: Optional[int] = None):
+        return self._add('restore', title=title, pid=pid, hwnd=hwnd)
+    
+    def send(self) -> Dict[str, Any]:
+        """Send queued steps in one request and clear the queue"""
+        if not self.steps:
+            self.result = {'success': True, 'results': [], 'completed': 0, 'total_ms': 0}
+            return self.result
+        
+        waits = sum(step.get('seconds', 0) for step in self.steps if step['action'] == 'wait')
+        timeout = (CONNECT_TIMEOUT, self.win.timeouts.get('/batch', DEFAULT_TIMEOUT) + waits)
+        self.result = self.win._request("POST", "/batch", timeout=timeout,
+                                        json={"steps": self.steps, "stop_on_error": self.stop_on_error})
+        self.steps = []
+        return self.result
+    
+    @property
+    def results(self) -> List[Dict[str, Any]]:
+        return self.result.get('results', [])
 
 class WindowsControl:
-    def __init__(self):
-        """Initialize Windows Control with agent info"""
-        self.agent_info = self._load_agent_info()
+    def __init__(self, pool_size: int = 4, timeouts: Optional[Dict[str, float]] = None,
+                 retries: int = 2, backoff: float = 0.1, max_backoff: float = 2.0,
+                 agent_info: Optional[Dict] = None, trace_path: Optional[str] = None,
+                 direct_fs: Optional[bool] = None):
+        """Initialize Windows Control with agent info
+        
+        Args:
+            pool_size: Keep-alive connections kept open to the agent
+            timeouts: Per-endpoint read timeouts, merged over ENDPOINT_TIMEOUTS
+            retries: Extra attempts for idempotent endpoints
+            backoff: Base delay for exponential backoff between retries
+            max_backoff: Upper bound for a single backoff delay
+            agent_info: Connection info to use instead of the .claude_agent_info file
+            trace_path: Append one JSON line of timings per call to this file
+                (defaults to $WIN_TRACE; WIN_TRACE=1 means DEFAULT_TRACE_PATH)
+            direct_fs: Read and write files through the WSL drive mounts
+                (/mnt/c) when the path is there, instead of via the agent.
+                Defaults to $WIN_DIRECT_FS, else on when running in WSL with
+                the agent from .claude_agent_info (i.e. on this host)
+        """
+        explicit_info = agent_info
+        self.agent_info = agent_info or self._load_agent_info()
         if self.agent_info:
             self.base_url = f"http://{self.agent_info['host']}:{self.agent_info['port']}"
             self.headers = {"Authorization": f"Bearer {self.agent_info['token']}"}
         else:
             raise Exception("Windows Agent not found! Please install and run the agent first.")
+        
+        self.timeouts = dict(ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        
+        # One pooled keep-alive session per client instead of a new TCP connection per call
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self._adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', self._adapter)
+        
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'errors': 0, 'direct_fs': 0}
+        
+        if trace_path is None:
+            trace_path = os.environ.get('WIN_TRACE') or None
+            if trace_path == '1':
+                trace_path = str(DEFAULT_TRACE_PATH)
+        self.timings = CallTimings(trace_path=trace_path)
+        
+        # Frames rebuilt from /screenshot/delta, keyed by session id
+        self.delta_session = uuid.uuid4().hex[:12]
+        self._delta_frames: Dict[str, Dict[str, Any]] = {}
+        
+        # Template images by id, re-registered if the agent has lost them
+        self._templates: Dict[str, bytes] = {}
+        
+        # Summary line of the last iter_files stream (count, errors, next_cursor)
+        self.last_listing: Dict[str, Any] = {}
+        self.last_search: Dict[str, Any] = {}
+        
+        if direct_fs is None:
+            setting = os.environ.get('WIN_DIRECT_FS')
+            direct_fs = setting not in ('0', 'false', 'no') if setting else bool(
+                _wsl and _wsl.in_wsl() and (explicit_info is None or explicit_info == load_agent_info()))
+        self.wsl = _wsl.WslPaths(env_loader=self._windows_env) if direct_fs and _wsl else None
+    
+    def close(self):
+        """Close pooled connections to the agent and the trace file"""
+        self.session.close()
+        self.timings.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def connection_stats(self) -> Dict[str, int]:
+        """Connection reuse statistics for the pooled session"""
+        opened = 0
+        sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            sent += pool.num_requests
+        
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['connections_opened'] = opened
+        stats['connections_reused'] = max(sent - opened, 0)
+        stats['reuse_ratio'] = round((sent - opened) / sent, 3) if sent else 0.0
+        return stats
     
     def _load_agent_info(self) -> Optional[Dict]:
         """Load agent connection info"""
-        info_paths = [
-            "/mnt/c/Users/Uptake/.claude_agent_info",
-            Path.home() / ".claude_agent_info",
-            "/mnt/c/Users/" + os.environ.get('USER', '') + "/.claude_agent_info"
-        ]
+        return load_agent_info()
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+    
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+    
+    def _new_timing(self, method: str, endpoint: str) -> Dict[str, Any]:
+        """Start a call's timing record, joining the caller's trace when there is one"""
+        parent = _tracing.current_span() if _tracing else None
+        return {'ts': round(time.time(), 6), 'method': method, 'endpoint': endpoint, 'attempts': 1,
+                'reused': True, 'trace_id': parent.trace_id if parent else uuid.uuid4().hex,
+                'span_id': uuid.uuid4().hex[:16], 'parent_id': parent.span_id if parent else None,
+                '_start': time.perf_counter()}
+    
+    @contextmanager
+    def deadline(self, seconds: float):
+        """Cut off every request this thread makes in the block once seconds have passed
+        
+        Connect and read timeouts are shortened to the time left and no
+        retry starts after it, so a caller that stops waiting (a fleet
+        fan-out) doesn't leave the call holding its thread.
+        """
+        previous = getattr(_call_deadline, 'at', None)
+        at = time.monotonic() + seconds
+        _call_deadline.at = at if previous is None else min(previous, at)
+        try:
+            yield
+        finally:
+            _call_deadline.at = previous
+    
+    def _send(self, method: str, endpoint: str, record: bool = True, **kwargs) -> requests.Response:
+        """Send a request with retries for idempotent endpoints; raises on failure
+        
+        The response carries its phase timings as response.timing. With
+        record=False the caller adds decode time and calls _record itself.
+        """
+        url = f"{self.base_url}{endpoint}"
+        kwargs['timeout'] = kwargs.get('timeout', (CONNECT_TIMEOUT, self.timeouts.get(endpoint, DEFAULT_TIMEOUT)))
+        
+        retryable = method == "GET" or endpoint in IDEMPOTENT_ENDPOINTS
+        attempts = self.retries + 1 if retryable else 1
+        timing = self._new_timing(method, endpoint)
+        timing.update({'attempts': 0, 'connect_ms': 0.0, 'send_ms': 0.0, 'wait_ms': 0.0, 'download_ms': 0.0})
+        headers = dict(kwargs.get('headers') or {})
+        headers['traceparent'] = f"00-{timing['trace_id']}-{timing['span_id']}-01"
+        kwargs['headers'] = headers
+        
+        timeout = kwargs['timeout'] if isinstance(kwargs['timeout'], tuple) else (kwargs['timeout'],) * 2
+        deadline = getattr(_call_deadline, 'at', None)
         
-        for path in info_paths:
+        for attempt in range(attempts):
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timing['error'] = 'Timeout'
+                    self._record(timing)
+                    raise requests.Timeout(f"Deadline passed before {method} {endpoint}")
+                kwargs['timeout'] = tuple(remaining if t is None else min(t, remaining) for t in timeout)
+            self._count('requests')
+            timing['attempts'] += 1
+            _call_timing.current = timing
             try:
-                with open(path) as f:
-                    return json.load(f)
-            except:
-                continue
-        return None
+                response = self.session.request(method, url, **kwargs)
+                if '_headers_at' in timing:
+                    timing['download_ms'] += (time.perf_counter() - timing.pop('_headers_at')) * 1000
+                if response.status_code in RETRY_STATUS_CODES and attempt < attempts - 1:
+                    # A streamed reply holds its pooled connection until closed
+                    response.close()
+                    self._count('retries')
+                    time.sleep(self._backoff_delay(attempt))
+                    continue
+                timing['status'] = response.status_code
+                # A streamed body is read (and counted) by the caller
+                timing['bytes'] = 0 if kwargs.get('stream') else len(response.content)
+                server = parse_server_timing(response.headers.get('Server-Timing'))
+                if server:
+                    timing['server_timing'] = server
+                if 'app' in server:
+                    timing['server_ms'] = server['app']
+                    timing['network_ms'] = max(0.0, timing['wait_ms'] - server['app'])
+                if 'queue' in server:
+                    timing['queue_ms'] = server['queue']
+                response.timing = timing
+                response.raise_for_status()
+                if record:
+                    self._record(timing)
+                return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt < attempts - 1:
+                    self._count('retries')
+                    time.sleep(self._backoff_delay(attempt))
+                    continue
+                timing['error'] = type(e).__name__
+                self._record(timing)
+                raise
+            except requests.HTTPError:
+                timing['error'] = f"HTTP {timing['status']}"
+                self._record(timing)
+                raise
+            finally:
+                _call_timing.current = None
+    
+    def _record(self, timing: Dict[str, Any], decode_start: Optional[float] = None):
+        """Finish a call's timing (total, optional decode) and add it to the stats"""
+        now = time.perf_counter()
+        if decode_start is not None:
+            timing['decode_ms'] = (now - decode_start) * 1000
+        timing['total_ms'] = (now - timing.pop('_start')) * 1000
+        for phase in TIMING_PHASES:
+            if isinstance(timing.get(phase), float):
+                timing[phase] = round(timing[phase], 3)
+        self.timings.record(timing)
+        if _tracing and _tracing.collector.enabled:
+            _record_call_spans(timing)
     
     def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """Make a request to the agent"""
-        url = f"{self.base_url}{endpoint}"
-        kwargs['headers'] = self.headers
-        kwargs['timeout'] = kwargs.get('timeout', 30)
-        
         try:
-            response = requests.request(method, url, **kwargs)
-            response.raise_for_status()
-            return response.json()
+            response = self._send(method, endpoint, record=False, **kwargs)
+            decode_start = time.perf_counter()
+            result = response.json()
+            self._record(response.timing, decode_start)
+            return result
         except Exception as e:
+            self._count('errors')
             print(f"Error: {e}")
             return {"success": False, "error": str(e)}
     
+    def _windows_env(self) -> Dict[str, str]:
+        """Environment of the agent's Windows user, for expanding %VAR% paths"""
+        result = self.powershell_result('Get-ChildItem Env: | ForEach-Object { "$($_.Name)=$($_.Value)" }')
+        env = {}
+        if result.get('success'):
+            for line in (result.get('stdout') or '').splitlines():
+                name, sep, value = line.partition('=')
+                if sep:
+                    env[name] = value.rstrip('\r')
+        return env
+    
+    def _direct_path(self, path: str, write: bool = False) -> Optional[str]:
+        """WSL path to use for a file operation, or None to go through the agent"""
+        return self.wsl.usable(path, write) if self.wsl else None
+    
+    def file_route(self, path: str, write: bool = False) -> str:
+        """'wsl' if a file operation on path would use the WSL mount, else 'agent'"""
+        return 'wsl' if self._direct_path(path, write) else 'agent'
+    
+    @contextmanager
+    def _direct_call(self, endpoint: str):
+        """Time a file operation done on the WSL mount as a 'WSL <endpoint>' call"""
+        timing = self._new_timing('WSL', endpoint)
+        timing['bytes'] = 0
+        try:
+            yield timing
+        except Exception as e:
+            timing['error'] = type(e).__name__
+            raise
+        finally:
+            self._record(timing)
+            self._count('direct_fs')
+    
+    def timing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling p50/p95/p99 per endpoint of connect, send, wait, server, download, decode and total ms"""
+        return self.timings.summary()
+    
+    @contextmanager
+    def batch(self, stop_on_error: bool = True):
+        """Queue actions and send them in one /batch round-trip on exit
+        
+        with win.batch() as b:
+            b.focus_window(title="Steam").wait(0.2).maximize_window(title="Steam")
+        print(b.results)
+        """
+        queue = WindowsBatch(self, stop_on_error)
+        yield queue
+        queue.send()
+    
     def screenshot(self, save_path: Optional[str] = None) -> str:
         """Take screenshot and optionally save to file"""
-        result = self._request("POST", "/screenshot", json={})
-        
-        if result.get('success') and save_path:
-            img_data = base64.b64decode(result['image'])
+        if save_path:
+            img_data = self.screenshot_bytes()
+            if not img_data:
+                return ''
             with open(save_path, 'wb') as f:
                 f.write(img_data)
             print(f"Screenshot saved: {save_path}")
             return save_path
         
+        result = self._request("POST", "/screenshot", json={})
         return result.get('image', '')
     
+    def screenshot_raw(self, region: Optional[Tuple[int, int, int, int]] = None,
+                       etag: Optional[str] = None, **options) -> Tuple[bytes, Dict[str, Any]]:
+        """Take screenshot as encoded bytes plus metadata (no base64, no temp file)
+        
+        Args:
+            region: Optional (x, y, width, height) to capture
+            etag: ETag of the frame the caller already has; if the screen is
+                unchanged the agent replies 304 and no image is sent
+            **options: Processing done on the agent before transfer:
+                target_width / target_height (one keeps aspect), max_pixels,
+                grayscale, format ('png', 'jpeg', 'webp', 'raw'), quality,
+                compress_level
+        
+        Returns:
+            (body, info) where info has width, height, mode, format, etag,
+            unchanged and the source_width/source_height of the captured area.
+            Unchanged frames return (b'', {'unchanged': True, 'etag': etag});
+            failures return (b'', {}).
+        """
+        data = {k: v for k, v in options.items() if v is not None}
+        if region:
+            data['crop'] = list(region)
+        headers = {'If-None-Match': f'"{etag}"'} if etag else None
+        
+        try:
+            response = self._send("POST", "/screenshot/raw", json=data, headers=headers)
+        except Exception as e:
+            self._count('errors')
+            print(f"Error: {e}")
+            return b'', {}
+        
+        if response.status_code == 304:
+            return b'', {'unchanged': True, 'etag': etag}
+        
+        headers = response.headers
+        width = int(headers.get('X-Image-Width', 0))
+        height = int(headers.get('X-Image-Height', 0))
+        info = {
+            'width': width,
+            'height': height,
+            'mode': headers.get('X-Image-Mode', 'RGB'),
+            'format': headers.get('X-Image-Format', 'png'),
+            'source_width': int(headers.get('X-Source-Width', width)),
+            'source_height': int(headers.get('X-Source-Height', height)),
+            'etag': headers.get('ETag', '').strip('"') or None,
+            'unchanged': False
+        }
+        return response.content, info
+    
+    def screenshot_if_changed(self, etag: Optional[str], region: Optional[Tuple[int, int, int, int]] = None,
+                              **options) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        """Cheap "has anything changed?" capture
+        
+        Returns (None, info) when the frame still matches etag, otherwise the
+        new bytes and info (keep info['etag'] for the next call).
+        """
+        img_data, info = self.screenshot_raw(region, etag=etag, **options)
+        if info.get('unchanged'):
+            return None, info
+        return img_data, info
+    
+    def screenshot_bytes(self, region: Optional[Tuple[int, int, int, int]] = None, **options) -> bytes:
+        """Take screenshot as encoded image bytes (see screenshot_raw for options)"""
+        return self.screenshot_raw(region, **options)[0]
+    
+    def screenshot_image(self, region: Optional[Tuple[int, int, int, int]] = None, **options):
+        """Take screenshot as a PIL Image (None on failure)"""
+        from io import BytesIO
+        from PIL import Image
+        
+        img_data, info = self.screenshot_raw(region, **options)
+        if not img_data:
+            return None
+        if info['format'] == 'raw':
+            return Image.frombytes(info['mode'], (info['width'], info['height']), img_data)
+        image = Image.open(BytesIO(img_data))
+        image.load()
+        return image
+    
+    def screenshot_array(self, region: Optional[Tuple[int, int, int, int]] = None, **options):
+        """Take screenshot as a NumPy array of shape (height, width[, channels])"""
+        import numpy as np
+        
+        if options.get('format') == 'raw':
+            img_data, info = self.screenshot_raw(region, **options)
+            if not img_data:
+                return None
+            channels = len(info['mode'])
+            shape = (info['height'], info['width']) if channels == 1 else (info['height'], info['width'], channels)
+            return np.frombuffer(img_data, dtype=np.uint8).reshape(shape)
+        
+        image = self.screenshot_image(region, **options)
+        return np.asarray(image) if image is not None else None
+    
+    def screenshot_delta(self, session: Optional[str] = None, tile_size: int = 64,
+                         region: Optional[Tuple[int, int, int, int]] = None, **options):
+        """Take screenshot transferring only tiles changed since this session's last frame
+        
+        The agent remembers which frame each session holds and sends changed
+        tiles; the full frame is rebuilt locally. Accepts the screenshot_raw
+        processing options.
+        
+        Returns:
+            (PIL Image, info) where info has frame_id, keyframe, changed_tiles
+            and total_tiles; (None, {}) on failure.
+        """
+        from io import BytesIO
+        from PIL import Image
+        
+        session = session or self.delta_session
+        state = self._delta_frames.get(session)
+        data = {k: v for k, v in options.items() if v is not None}
+        data.update({'session': session, 'tile_size': tile_size,
+                     'base': state['frame_id'] if state else None})
+        if region:
+            data['crop'] = list(region)
+        
+        try:
+            response = self._send("POST", "/screenshot/delta", record=False, json=data)
+        except Exception as e:
+            self._count('errors')
+            print(f"Error: {e}")
+            return None, {}
+        body = response.content
+        decode_start = time.perf_counter()
+        
+        header_len = struct.unpack('>I', body[:4])[0]
+        meta = json.loads(body[4:4 + header_len])
+        size = (meta['width'], meta['height'])
+        
+        if meta['keyframe'] or state is None:
+            frame = Image.new(meta['mode'], size)
+        elif meta['tiles']:
+            # Patch a copy so images returned earlier never change under the caller
+            frame = state['image'].copy()
+        else:
+            frame = state['image']
+        
+        offset = 4 + header_len
+        for x, y, width, height, length in meta['tiles']:
+            payload = body[offset:offset + length]
+            offset += length
+            if meta['format'] == 'raw':
+                tile = Image.frombytes(meta['mode'], (width, height), payload)
+            else:
+                tile = Image.open(BytesIO(payload))
+            frame.paste(tile, (x, y))
+        
+        self._delta_frames[session] = {'frame_id': meta['frame_id'], 'image': frame}
+        self._record(response.timing, decode_start)
+        columns = -(-meta['width'] // meta['tile_size'])
+        rows = -(-meta['height'] // meta['tile_size'])
+        info = {
+            'frame_id': meta['frame_id'],
+            'keyframe': meta['keyframe'],
+            'changed_tiles': len(meta['tiles']),
+            'total_tiles': columns * rows,
+            'bytes': len(body),
+            'source_width': meta['source_width'],
+            'source_height': meta['source_height']
+        }
+        return frame, info
+    
     def click(self, x: int, y: int, button: str = "left"):
         """Click at coordinates"""
         result = self._request("POST", "/mouse/click", 
@@ -82,12 +798,26 @@ class WindowsControl:
             print(f"Moved to ({x}, {y})")
         return result
     
-    def type(self, text: str):
-        """Type text"""
-        result = self._request("POST", "/keyboard/type", 
-                             json={"text": text})
+    def type(self, text: str, mode: Optional[str] = None, interval: Optional[float] = None,
+             settle: Optional[float] = None):
+        """Type text
+        
+        mode: 'auto' (default: paste long text, Unicode input for short text),
+        'keys' (one key at a time, `interval` seconds apart), 'unicode' or 'paste'.
+        settle: seconds a paste waits for the target to read the clipboard
+        before the previous contents are restored (agent default 0.05);
+        raise it for slow targets such as remote desktops.
+        """
+        data = {"text": text}
+        if mode:
+            data["mode"] = mode
+        if interval is not None:
+            data["interval"] = interval
+        if settle is not None:
+            data["settle"] = settle
+        result = self._request("POST", "/keyboard/type", json=data)
         if result.get('success'):
-            print(f"Typed: {text[:50]}...")
+            print(f"Typed: {text[:50]}... ({result.get('mode', 'keys')}, {result.get('duration_ms', 0):.0f}ms)")
         return result
     
     def key(self, keys: str | List[str]):
@@ -100,12 +830,15 @@ class WindowsControl:
     
     def powershell(self, command: str) -> str:
         """Run PowerShell command"""
-        result = self._request("POST", "/powershell", 
-                             json={"command": command})
+        result = self.powershell_result(command)
         if result.get('success'):
             return result.get('stdout', '')
         return result.get('error', 'Command failed')
     
+    def powershell_result(self, command: str) -> Dict:
+        """Run PowerShell command; full agent reply (success, stdout, stderr, returncode)"""
+        return self._request("POST", "/powershell", json={"command": command})
+    
     def processes(self) -> List[Dict]:
         """List processes"""
         result = self._request("GET", "/process/list")
@@ -120,87 +853,433 @@ class WindowsControl:
         return result
     
     def read_file(self, path: str) -> str:
-        """Read Windows file"""
+        """Read Windows file (through the WSL mount when it is there)"""
+        local = self._direct_path(path)
+        if local:
+            try:
+                # Universal newlines, as the agent reads text on Windows
+                with self._direct_call('/file/read') as timing, open(local, encoding='utf-8') as f:
+                    content = f.read()
+                    timing['bytes'] = len(content)
+                return content
+            except (OSError, ValueError):
+                pass  # Let the agent try, or report why it can't
         result = self._request("POST", "/file/read", 
                              json={"path": path})
         return result.get('content', '')
     
     def write_file(self, path: str, content: str):
-        """Write Windows file"""
+        """Write Windows file (through the WSL mount when it is writable)
+        
+        The result's 'via' is 'wsl' or 'agent'.
+        """
+        local = self._direct_path(path, write=True)
+        if local:
+            try:
+                with self._direct_call('/file/write') as timing:
+                    os.makedirs(os.path.dirname(local), exist_ok=True)
+                    # CRLF line endings, as the agent writes text on Windows
+                    with open(local, 'w', encoding='utf-8', newline='\r\n') as f:
+                        f.write(content)
+                    timing['bytes'] = len(content)
+                print(f"Wrote to: {path}")
+                return {'success': True, 'path': path, 'size': len(content), 'via': 'wsl'}
+            except (OSError, ValueError):
+                pass
         result = self._request("POST", "/file/write", 
                              json={"path": path, "content": content})
+        result['via'] = 'agent'
         if result.get('success'):
             print(f"Wrote to: {path}")
         return result
     
+    def download(self, remote_path: str, local_path: str, resume: bool = False,
+                 chunk_size: int = DOWNLOAD_CHUNK) -> Dict[str, Any]:
+        """Stream a Windows file (any size, binary) to a local file in constant memory
+        
+        With resume=True an existing local file is treated as a partial
+        download and only the missing bytes are requested.
+        Returns success, path, bytes received, size, elapsed_ms and via
+        ('wsl' when copied straight from the WSL mount, else 'agent').
+        """
+        offset = os.path.getsize(local_path) if resume and os.path.exists(local_path) else 0
+        source = self._direct_path(remote_path)
+        if source:
+            start = time.perf_counter()
+            try:
+                with self._direct_call('/file/download') as timing:
+                    with open(source, 'rb') as src, open(local_path, 'ab' if offset else 'wb') as dst:
+                        src.seek(offset)
+                        shutil.copyfileobj(src, dst, chunk_size)
+                        received = dst.tell() - offset
+                        size = os.fstat(src.fileno()).st_size
+                    timing['bytes'] = received
+                print(f"Downloaded {remote_path} -> {local_path} ({received} bytes)")
+                return {'success': True, 'path': local_path, 'bytes': received, 'size': size,
+                        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2), 'via': 'wsl'}
+            except (OSError, ValueError):
+                pass
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        start = time.perf_counter()
+        try:
+            response = self._send("GET", "/file/download", record=False, params={'path': remote_path},
+                                  headers=headers, stream=True)
+        except requests.HTTPError as e:
+            if offset and e.response is not None and e.response.status_code == 416:
+                # Nothing past what we already have
+                return {'success': True, 'path': local_path, 'bytes': 0, 'size': offset,
+                        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2), 'via': 'agent'}
+            self._count('errors')
+            try:
+                return e.response.json()
+            except ValueError:
+                return {'success': False, 'error': str(e)}
+        except Exception as e:
+            self._count('errors')
+            return {'success': False, 'error': str(e)}
+        
+        timing = response.timing
+        # 200 instead of 206: the agent sent the whole file, so start over
+        append = offset and response.status_code == 206
+        received = 0
+        body_start = time.perf_counter()
+        try:
+            with response, open(local_path, 'ab' if append else 'wb') as f:
+                for block in response.iter_content(chunk_size):
+                    f.write(block)
+                    received += len(block)
+        except Exception as e:
+            timing['error'] = type(e).__name__
+            self._record(timing)
+            self._count('errors')
+            return {'success': False, 'error': str(e), 'bytes': received}
+        timing['download_ms'] += (time.perf_counter() - body_start) * 1000
+        timing['bytes'] = received
+        self._record(timing)
+        print(f"Downloaded {remote_path} -> {local_path} ({received} bytes)")
+        
+        return {
+            'success': True,
+            'path': local_path,
+            'bytes': received,
+            'size': int(response.headers.get('X-File-Size', (offset if append else 0) + received)),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            'via': 'agent'
+        }
+    
+    def upload(self, local_path: str, remote_path: str, chunk_size: int = UPLOAD_CHUNK) -> Dict[str, Any]:
+        """Stream a local file (any size, binary) to Windows in chunks of chunk_size bytes
+        
+        Only one chunk is in memory at a time. Each chunk is written at its
+        offset, so a chunk that fails in transit is simply sent again, and
+        the file only replaces remote_path once the last chunk has arrived.
+        Through the WSL mount, when it is writable, the file is copied
+        directly (same replace-at-the-end behaviour; via is 'wsl').
+        """
+        size = os.path.getsize(local_path)
+        start = time.perf_counter()
+        target = self._direct_path(remote_path, write=True)
+        if target:
+            try:
+                with self._direct_call('/file/upload') as timing:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(local_path, target + '.upload')
+                    os.replace(target + '.upload', target)
+                    timing['bytes'] = size
+                print(f"Uploaded {local_path} -> {remote_path} ({size} bytes)")
+                return {'success': True, 'path': remote_path, 'bytes': size, 'chunks': 1,
+                        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2), 'via': 'wsl'}
+            except (OSError, ValueError):
+                pass
+        offset = 0
+        upload_id = uuid.uuid4().hex
+        result: Dict[str, Any] = {}
+        with open(local_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                final = offset + len(chunk) >= size
+                result = self._request("POST", "/file/upload", data=chunk,
+                                       params={'path': remote_path, 'offset': offset, 'final': int(final),
+                                               'upload_id': upload_id},
+                                       headers={'Content-Type': 'application/octet-stream'})
+                if not result.get('success'):
+                    return result
+                offset += len(chunk)
+                if final:
+                    break
+        print(f"Uploaded {local_path} -> {remote_path} ({offset} bytes)")
+        return {
+            'success': True,
+            'path': result.get('path', remote_path),
+            'bytes': offset,
+            'chunks': -(-size // chunk_size) or 1,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            'via': 'agent'
+        }
+    
+    def list_files(self, path: str, recursive: bool = False, limit: Optional[int] = None,
+                   cursor: Optional[str] = None, **filters) -> Dict[str, Any]:
+        """One page of a directory listing, filtered on the agent
+        
+        Args:
+            path: Windows directory
+            recursive: Walk subdirectories too (max_depth limits how far)
+            limit: Entries per page; pass the reply's next_cursor as cursor
+                for the next one (None when the listing is complete)
+            **filters: max_depth, pattern (glob on the name, or on the
+                relative path if it has a '/'), extensions, min_size,
+                max_size, modified_after, modified_before, type
+                ('file', 'dir' or 'all')
+        
+        Returns:
+            success, items (name, path, rel, is_dir, size, modified),
+            count, scanned, errors and next_cursor.
+        """
+        data = {'path': path, 'recursive': recursive, 'limit': limit, 'cursor': cursor, **filters}
+        return self._request("POST", "/file/list", json={k: v for k, v in data.items() if v is not None})
+    
+    def iter_files(self, path: str, recursive: bool = False, **filters) -> Iterator[Dict[str, Any]]:
+        """Yield listing entries as the agent walks the tree (NDJSON stream, constant memory)
+        
+        Takes the same filters as list_files; raises on a failed request.
+        The stream's summary line is kept in self.last_listing.
+        """
+        data = {'path': path, 'recursive': recursive, 'stream': True, **filters}
+        response = self._send("POST", "/file/list", record=False, stream=True,
+                              json={k: v for k, v in data.items() if v is not None})
+        timing = response.timing
+        body_start = time.perf_counter()
+        received = 0
+        try:
+            with response:
+                for line in response.iter_lines(chunk_size=64 * 1024):
+                    if not line:
+                        continue
+                    received += len(line) + 1
+                    entry = json.loads(line)
+                    if entry.get('done'):
+                        self.last_listing = entry
+                        if entry.get('success') is False:
+                            raise RuntimeError(f"Listing failed: {entry.get('error')}")
+                        continue
+                    yield entry
+        finally:
+            timing['download_ms'] += (time.perf_counter() - body_start) * 1000
+            timing['bytes'] = received
+            self._record(timing)
+    
+    def find_files(self, query: str, under: Optional[str] = None, type: str = 'all', limit: int = 100,
+                   refresh: bool = False, mode: str = 'auto') -> List[Dict]:
+        """Find files by name in the agent's index (milliseconds, no directory walk)
+        
+        Args:
+            query: Glob ('Discord.exe', 'app-*') or substring ('discord');
+                case-insensitive. mode='glob' or 'substring' forces one.
+            under: Only paths inside this Windows directory
+            type: 'file', 'dir' or 'all'
+            limit: Most matches returned
+            refresh: Bring the index up to date first (rescans only
+                directories that changed)
+        
+        Returns:
+            Matches (name, path, is_dir, size, modified); only the indexed
+            roots are searched, see file_index(). The full reply (total,
+            truncated, indexed_at) is kept in self.last_search.
+        """
+        data = {'query': query, 'under': under, 'type': type, 'limit': limit, 'refresh': refresh, 'mode': mode}
+        result = self._request("POST", "/file/search", json={k: v for k, v in data.items() if v is not None})
+        self.last_search = result
+        if not result.get('success'):
+            print(f"Search failed: {result.get('error')}")
+        return result.get('matches', [])
+    
+    def file_index(self, roots: Optional[List[str]] = None, add: Optional[List[str]] = None,
+                   remove: Optional[List[str]] = None, refresh: bool = False,
+                   full: bool = False) -> Dict[str, Any]:
+        """Status of the agent's file index; roots replaces, add/remove edit the indexed roots
+        
+        refresh brings it up to date now (full=True reads every directory
+        again rather than only those whose modification time changed).
+        """
+        if roots is None and add is None and remove is None and not refresh:
+            return self._request("GET", "/file/index")
+        data = {'roots': roots, 'add': add, 'remove': remove, 'refresh': refresh, 'full': full}
+        return self._request("POST", "/file/index", json={k: v for k, v in data.items() if v is not None})
+    
+    def file_signatures(self, root: str, files: Dict[str, Dict[str, float]],
+                        checksum: bool = False) -> Dict[str, Any]:
+        """Block signatures of files under a Windows directory (see win_sync.py)
+        
+        files maps '/'-separated relative paths to {'size', 'mtime'}; each
+        comes back as 'missing', 'same' or its block signature.
+        """
+        return self._request("POST", "/sync/signature",
+                             json={"root": root, "files": files, "checksum": checksum})
+    
+    def patch_file(self, root: str, rel: str, body, size: int, digest: str, mtime: Optional[float] = None,
+                   block_size: Optional[int] = None, whole: bool = False) -> Dict[str, Any]:
+        """Rebuild root/rel on Windows from a patch (or, with whole=True, the full content)
+        
+        body is bytes or an open binary file; the agent checks the result
+        against size and digest before replacing the file.
+        """
+        params = {'root': root, 'rel': rel, 'size': size, 'digest': digest, 'whole': int(whole)}
+        if mtime is not None:
+            params['mtime'] = repr(mtime)
+        if block_size:
+            params['block_size'] = block_size
+        return self._request("POST", "/sync/patch", params=params, data=body,
+                             headers={'Content-Type': 'application/octet-stream'})
+    
+    def sync(self, local_dir: str, remote_dir: str, workers: int = 4, checksum: bool = False) -> Dict[str, Any]:
+        """Make a Windows directory match a local one, sending only changed blocks and new files"""
+        import win_sync
+        return win_sync.sync_tree(self, local_dir, remote_dir, workers=workers, checksum=checksum)
+    
     def list_windows(self) -> List[Dict]:
         """List all visible windows"""
         result = self._request("GET", "/window/list")
         return result.get('windows', [])
     
-    def focus_window(self, title: Optional[str] = None, pid: Optional[int] = None):
-        """Bring window to foreground"""
+    def _window_data(self, title: Optional[str], pid: Optional[int], hwnd: Optional[int]) -> Dict:
+        """Window selector for /window/* requests; hwnd wins over title and pid"""
+        if hwnd:
+            return {'hwnd': hwnd}
         data = {}
         if title:
             data['title'] = title
         if pid:
             data['pid'] = pid
-        
+        return data
+    
+    def focus_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                     hwnd: Optional[int] = None):
+        """Bring window to foreground"""
+        data = self._window_data(title, pid, hwnd)
         result = self._request("POST", "/window/focus", json=data)
         if result.get('success'):
             print(f"Focused: {result.get('title', 'window')}")
         return result
     
-    def maximize_window(self, title: Optional[str] = None, pid: Optional[int] = None):
+    def maximize_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                        hwnd: Optional[int] = None):
         """Maximize window"""
-        data = {}
-        if title:
-            data['title'] = title
-        if pid:
-            data['pid'] = pid
-        
+        data = self._window_data(title, pid, hwnd)
         result = self._request("POST", "/window/maximize", json=data)
         if result.get('success'):
             print(f"Maximized: {result.get('title', 'window')}")
         return result
     
-    def minimize_window(self, title: Optional[str] = None, pid: Optional[int] = None):
+    def minimize_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                        hwnd: Optional[int] = None):
         """Minimize window"""
-        data = {}
-        if title:
-            data['title'] = title
-        if pid:
-            data['pid'] = pid
-        
+        data = self._window_data(title, pid, hwnd)
         result = self._request("POST", "/window/minimize", json=data)
         if result.get('success'):
             print(f"Minimized: {result.get('title', 'window')}")
         return result
     
-    def restore_window(self, title: Optional[str] = None, pid: Optional[int] = None):
+    def restore_window(self, title: Optional[str] = None, pid: Optional[int] = None,
+                       hwnd: Optional[int] = None):
         """Restore window to normal size"""
-        data = {}
-        if title:
-            data['title'] = title
-        if pid:
-            data['pid'] = pid
-        
+        data = self._window_data(title, pid, hwnd)
         result = self._request("POST", "/window/restore", json=data)
         if result.get('success'):
             print(f"Restored: {result.get('title', 'window')}")
         return result
     
-    def window_state(self, title: Optional[str] = None, pid: Optional[int] = None) -> Dict:
+    def window_state(self, title: Optional[str] = None, pid: Optional[int] = None,
+                     hwnd: Optional[int] = None) -> Dict:
         """Get window state"""
-        data = {}
-        if title:
-            data['title'] = title
-        if pid:
-            data['pid'] = pid
+        return self._request("POST", "/window/state", json=self._window_data(title, pid, hwnd))
+    
+    def register_template(self, template_id: str, image: str | Path | bytes) -> Dict:
+        """Register an image (file path or encoded bytes) on the agent for find_template"""
+        data = Path(image).read_bytes() if isinstance(image, (str, Path)) else image
+        self._templates[template_id] = data
+        return self._request("POST", "/find/template/register",
+                             json={"id": template_id, "image": base64.b64encode(data).decode('ascii')})
+    
+    def _find(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """POST /find/template, re-registering templates the agent doesn't know (e.g. after a restart)"""
+        for attempt in range(2):
+            try:
+                return self._send("POST", "/find/template", json=data).json()
+            except requests.HTTPError as e:
+                unknown = []
+                if e.response.status_code == 404:
+                    try:
+                        unknown = e.response.json().get('unknown', [])
+                    except ValueError:
+                        pass
+                if attempt == 0 and unknown and all(u in self._templates for u in unknown):
+                    for template_id in unknown:
+                        self.register_template(template_id, self._templates[template_id])
+                    continue
+                error = e
+            except Exception as e:
+                error = e
+            self._count('errors')
+            print(f"Error: {error}")
+            return {"success": False, "error": str(error)}
+    
+    def find_template(self, template_id: str, region: Optional[Tuple[int, int, int, int]] = None,
+                      threshold: float = 0.8, max_matches: int = 5) -> List[Dict]:
+        """Ranked on-screen matches of a registered template
+        
+        Only coordinates come back: [{x, y, width, height, center: [cx, cy], score}, ...].
+        region: (x, y, width, height) to search instead of the whole screen.
+        """
+        data = {"id": template_id, "threshold": threshold, "max_matches": max_matches}
+        if region:
+            data["region"] = list(region)
+        return self._find(data).get('matches', [])
+    
+    def find_templates(self, template_ids: List[str], region: Optional[Tuple[int, int, int, int]] = None,
+                       threshold: float = 0.8, max_matches: int = 5) -> Dict[str, List[Dict]]:
+        """Matches for several templates from one capture, keyed by template id"""
+        data = {"ids": list(template_ids), "threshold": threshold, "max_matches": max_matches}
+        if region:
+            data["region"] = list(region)
+        return self._find(data).get('matches', {})
+    
+    def wait_for(self, *conditions: Dict[str, Any], timeout: float = 10.0,
+                 interval: Optional[float] = None) -> Dict:
+        """Block until any condition holds on the agent (or timeout passes)
         
-        result = self._request("POST", "/window/state", json=data)
+        Conditions are dicts checked locally by the agent at high frequency:
+          {'type': 'pixel', 'x': 10, 'y': 10, 'color': '#00ff00', 'tolerance': 8}
+          {'type': 'region_change', 'region': [x, y, width, height], 'fraction': 0.01}
+          {'type': 'window', 'title': 'Steam', 'state': 'appears'}   # or pattern= (regex);
+              states: appears, gone, changed, minimized, maximized, normal
+          {'type': 'process', 'name': 'notepad.exe', 'state': 'started'}  # running, started, exited
+        Returns met, index/type/details of the condition that held and elapsed_ms.
+        """
+        # The agent holds the request open for up to `timeout` seconds
+        read_timeout = self.timeouts.get('/wait', DEFAULT_TIMEOUT) + timeout
+        data = {"conditions": list(conditions), "timeout": timeout}
+        if interval is not None:
+            data["interval"] = interval
+        result = self._request("POST", "/wait", timeout=(CONNECT_TIMEOUT, read_timeout), json=data)
+        if result.get('success'):
+            if result.get('met'):
+                print(f"Condition met: {result['type']} after {result['elapsed_ms']:.0f}ms")
+            else:
+                print(f"Timed out after {timeout}s")
         return result
     
+    def metrics(self) -> Dict:
+        """Agent route latencies, error counts and stage timings (JSON form of /metrics)"""
+        return self._request("GET", "/metrics", params={'format': 'json'})
+    
+    def scheduler_stats(self) -> Dict:
+        """Queue depth and wait times of the agent's scheduler lanes"""
+        return self._request("GET", "/scheduler/stats").get('lanes', {})
+    
+    def health(self) -> Dict:
+        """Agent health check (status, version, uptime)"""
+        return self._request("GET", "/health")
+    
     def version(self) -> Dict:
         """Get version information"""
         result = self._request("GET", "/version")
@@ -244,8 +1323,28 @@ class WindowsControl:
         return result
 
 # CLI Interface
-def main():
-    if len(sys.argv) < 2:
+def print_timing_summary(summary: Dict[str, Dict[str, Any]]):
+    """Print p50/p95 total time and the p50 breakdown per endpoint"""
+    columns = [('connect', 'connect_ms'), ('send', 'send_ms'), ('queue', 'queue_ms'), ('server', 'server_ms'),
+               ('network', 'network_ms'), ('download', 'download_ms'), ('decode', 'decode_ms')]
+    print(f"{'endpoint':28} {'calls':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8}   "
+          + ' '.join(f'{name:>8}' for name, _ in columns))
+    for name, entry in summary.items():
+        total = entry.get('total_ms', {})
+        row = f"{name[:28]:28} {entry['count']:5} {entry['errors']:4} " \
+              f"{total.get('p50', 0):8.1f} {total.get('p95', 0):8.1f} {total.get('p99', 0):8.1f}   "
+        row += ' '.join(f"{entry[key]['p50']:8.1f}" if key in entry else f"{'-':>8}" for _, key in columns)
+        print(row)
+    print("(ms; breakdown columns are p50)")
+
+def main(argv: Optional[List[str]] = None, win: Optional['WindowsControl'] = None):
+    """Run one `win` command; argv defaults to sys.argv, win to a new client
+    
+    Returns the exit status: 0 on success, 1 when the command failed,
+    2 for usage errors and unknown commands.
+    """
+    argv = argv or sys.argv
+    if len(argv) < 2:
         print("""Windows Control - Usage:
         
 Commands:
@@ -259,6 +1358,14 @@ Commands:
   kill <pid>           Kill process by PID
   read <path>          Read file from Windows
   write <path> <text>  Write text to Windows file
+  download <path> [local] [--resume]
+                       Stream a Windows file (binary, any size) to disk
+  upload <local> <path>
+                       Stream a local file (binary, any size) to Windows
+  ls <path> [glob] [-r]  List a Windows directory (-r: whole tree, streamed)
+  find <name> [under]  Find files by name in the agent's index (glob or text)
+  sync <dir> <windows-dir> [-j N] [--checksum]
+                       Send only new files and changed blocks of a tree
   
 Window Management:
   windows              List all visible windows
@@ -268,6 +1375,14 @@ Window Management:
   restore <title>      Restore window to normal size
   window <title>       Combined: focus and maximize window
 
+Diagnostics:
+  stats [trace.jsonl]  Per-endpoint latency percentiles from a trace file
+                       (WIN_TRACE=1 or WIN_TRACE=<path> records one), or
+                       from a short live probe when there is no trace
+  daemon start|stop|status
+                       Resident client on a Unix socket that keeps the
+                       agent connection warm between commands
+
 Version & Updates:
   version              Show agent version and features
   update check         Check for updates
@@ -286,53 +1401,62 @@ Examples:
   win maximize "Steam"
   win window "Steam"    # Focus and maximize
   win version
+  WIN_TRACE=1 win click 500 300 && win stats
   win update check
 """)
-        return
+        return 2
     
     try:
-        win = WindowsControl()
-        cmd = sys.argv[1].lower()
+        win = win or WindowsControl()
+        cmd = argv[1].lower()
         
         if cmd == "screenshot":
-            path = sys.argv[2] if len(sys.argv) > 2 else None
-            win.screenshot(path)
+            path = argv[2] if len(argv) > 2 else None
+            if not win.screenshot(path):
+                return 1
             
         elif cmd == "click":
-            if len(sys.argv) < 4:
+            if len(argv) < 4:
                 print("Usage: win click <x> <y>")
-                return
-            win.click(int(sys.argv[2]), int(sys.argv[3]))
+                return 2
+            return 0 if win.click(int(argv[2]), int(argv[3])).get('success') else 1
             
         elif cmd == "move":
-            if len(sys.argv) < 4:
+            if len(argv) < 4:
                 print("Usage: win move <x> <y>")
-                return
-            win.move(int(sys.argv[2]), int(sys.argv[3]))
+                return 2
+            return 0 if win.move(int(argv[2]), int(argv[3])).get('success') else 1
             
         elif cmd == "type":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win type <text>")
-                return
-            text = ' '.join(sys.argv[2:])
-            win.type(text)
+                return 2
+            text = ' '.join(argv[2:])
+            return 0 if win.type(text).get('success') else 1
             
         elif cmd == "key":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win key <key>")
-                return
-            keys = sys.argv[2]
+                return 2
+            keys = argv[2]
             if '+' in keys:
                 keys = keys.split('+')
-            win.key(keys)
+            return 0 if win.key(keys).get('success') else 1
             
         elif cmd == "ps" or cmd == "powershell":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win ps <command>")
-                return
-            cmd = ' '.join(sys.argv[2:])
-            output = win.powershell(cmd)
-            print(output)
+                return 2
+            cmd = ' '.join(argv[2:])
+            result = win.powershell_result(cmd)
+            if not result.get('success'):
+                print(result.get('error', 'Command failed'))
+                return 1
+            print(result.get('stdout', ''))
+            if result.get('stderr'):
+                print(result['stderr'], end='', file=sys.stderr)
+            # powershell.exe's own exit status, as from a local shell
+            return result.get('returncode') or 0
             
         elif cmd == "processes":
             procs = win.processes()
@@ -340,25 +1464,74 @@ Examples:
                 print(f"{p['pid']:8} {p['name']}")
                 
         elif cmd == "kill":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win kill <pid>")
-                return
-            win.kill(int(sys.argv[2]))
+                return 2
+            return 0 if win.kill(int(argv[2])).get('success') else 1
             
         elif cmd == "read":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win read <path>")
-                return
-            content = win.read_file(sys.argv[2])
+                return 2
+            content = win.read_file(argv[2])
             print(content)
             
         elif cmd == "write":
-            if len(sys.argv) < 4:
+            if len(argv) < 4:
                 print("Usage: win write <path> <content>")
-                return
-            path = sys.argv[2]
-            content = ' '.join(sys.argv[3:])
-            win.write_file(path, content)
+                return 2
+            path = argv[2]
+            content = ' '.join(argv[3:])
+            return 0 if win.write_file(path, content).get('success') else 1
+            
+        elif cmd == "download":
+            args = [a for a in argv[2:] if a != '--resume']
+            if not args:
+                print("Usage: win download <path> [local] [--resume]")
+                return 2
+            local = args[1] if len(args) > 1 else os.path.basename(args[0].replace('\\', '/'))
+            result = win.download(args[0], local, resume='--resume' in argv)
+            if not result.get('success'):
+                print(f"Download failed: {result.get('error')}")
+                return 1
+            
+        elif cmd == "ls":
+            args = [a for a in argv[2:] if a != '-r']
+            if not args:
+                print("Usage: win ls <path> [glob] [-r]")
+                return 2
+            pattern = args[1] if len(args) > 1 else None
+            for entry in win.iter_files(args[0], recursive='-r' in argv, pattern=pattern):
+                kind = '<DIR>' if entry['is_dir'] else f"{entry['size']:>12}"
+                print(f"{kind:>12}  {entry['rel']}")
+            if win.last_listing.get('errors'):
+                print(f"({win.last_listing['errors']} entries could not be read)")
+            
+        elif cmd == "find":
+            if len(argv) < 3:
+                print("Usage: win find <name> [under]")
+                return 2
+            matches = win.find_files(argv[2], under=argv[3] if len(argv) > 3 else None)
+            for entry in matches:
+                kind = '<DIR>' if entry['is_dir'] else f"{entry['size']:>12}"
+                print(f"{kind:>12}  {entry['path']}")
+            if win.last_search.get('truncated'):
+                print(f"({win.last_search['total']} matches; showing the first {len(matches)})")
+            if win.last_search.get('success') is False:
+                return 1
+            
+        elif cmd == "sync":
+            import win_sync
+            return win_sync.main(argv[2:], win)
+            
+        elif cmd == "upload":
+            if len(argv) < 4:
+                print("Usage: win upload <local> <path>")
+                return 2
+            result = win.upload(argv[2], argv[3])
+            if not result.get('success'):
+                print(f"Upload failed: {result.get('error')}")
+                return 1
             
         elif cmd == "windows":
             windows = win.list_windows()
@@ -367,72 +1540,104 @@ Examples:
                 print(f"{w['pid']:8} [{state:10}] {w['title']}")
                 
         elif cmd == "focus":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win focus <title>")
-                return
-            title = ' '.join(sys.argv[2:])
-            win.focus_window(title=title)
+                return 2
+            title = ' '.join(argv[2:])
+            return 0 if win.focus_window(title=title).get('success') else 1
             
         elif cmd == "maximize":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win maximize <title>")
-                return
-            title = ' '.join(sys.argv[2:])
-            win.maximize_window(title=title)
+                return 2
+            title = ' '.join(argv[2:])
+            return 0 if win.maximize_window(title=title).get('success') else 1
             
         elif cmd == "minimize":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win minimize <title>")
-                return
-            title = ' '.join(sys.argv[2:])
-            win.minimize_window(title=title)
+                return 2
+            title = ' '.join(argv[2:])
+            return 0 if win.minimize_window(title=title).get('success') else 1
             
         elif cmd == "restore":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win restore <title>")
-                return
-            title = ' '.join(sys.argv[2:])
-            win.restore_window(title=title)
+                return 2
+            title = ' '.join(argv[2:])
+            return 0 if win.restore_window(title=title).get('success') else 1
             
         elif cmd == "window":
             # Combined focus and maximize
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win window <title>")
-                return
-            title = ' '.join(sys.argv[2:])
-            win.focus_window(title=title)
-            time.sleep(0.2)  # Small delay to ensure window is focused
-            win.maximize_window(title=title)
+                return 2
+            title = ' '.join(argv[2:])
+            with win.batch() as b:
+                b.focus_window(title=title)
+                b.wait(0.2)  # Small delay to ensure window is focused
+                b.maximize_window(title=title)
+            for step in b.results:
+                if step['action'] == 'wait':
+                    continue
+                if step.get('success'):
+                    print(f"{step['action'].capitalize()}: {step.get('title', 'window')} ({step['elapsed_ms']} ms)")
+                else:
+                    print(f"{step['action'].capitalize()} failed: {step.get('error')}")
+            if not b.result.get('results') and b.result.get('error'):
+                print(f"Error: {b.result['error']}")
+            actions = [step for step in b.results if step['action'] != 'wait']
+            return 0 if actions and all(step.get('success') for step in actions) else 1
+            
+        elif cmd == "stats":
+            path = argv[2] if len(argv) > 2 else win.timings.trace_path or str(DEFAULT_TRACE_PATH)
+            if os.path.exists(path):
+                records = load_trace(path)
+                print(f"{len(records)} calls from {path}")
+            else:
+                # No trace yet: time a few cheap calls right now
+                for _ in range(20):
+                    win._request("GET", "/health")
+                for _ in range(3):
+                    win.screenshot_raw(max_pixels=320 * 240, format='jpeg')
+                records = win.timings.records()
+                print(f"{len(records)} probe calls (no trace at {path})")
+            print_timing_summary(timing_summary(records))
             
         elif cmd == "version":
             win.version()
             
         elif cmd == "update":
-            if len(sys.argv) < 3:
+            if len(argv) < 3:
                 print("Usage: win update <check|download|apply|status>")
-                return
+                return 2
             
-            subcmd = sys.argv[2].lower()
+            subcmd = argv[2].lower()
             if subcmd == "check":
-                win.update_check()
+                result = win.update_check()
             elif subcmd == "download":
-                win.update_download()
+                result = win.update_download()
             elif subcmd == "apply":
-                win.update_apply()
+                result = win.update_apply()
             elif subcmd == "status":
-                status = win.update_status()
-                if status.get('success', True):
-                    print(f"Version: {status.get('current_version')}")
-                    print(f"Backup exists: {status.get('backup_exists')}")
-                    print(f"Update pending: {status.get('update_pending')}")
+                result = win.update_status()
+                if result.get('success', True):
+                    print(f"Version: {result.get('current_version')}")
+                    print(f"Backup exists: {result.get('backup_exists')}")
+                    print(f"Update pending: {result.get('update_pending')}")
             else:
                 print(f"Unknown update command: {subcmd}")
+                return 2
+            return 0 if result.get('success') else 1
             
         else:
             print(f"Unknown command: {cmd}")
+            return 2
             
     except Exception as e:
         print(f"Error: {e}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
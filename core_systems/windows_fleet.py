@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Fleet control for several Windows hosts
+One pooled WindowsControl per agent; commands fan out to all or some hosts
+concurrently and come back per host, with a deadline per call so one slow
+or dead box can't hold up the rest
+
+Inventory (JSON):
+    {"hosts": {"gaming-pc": {"host": "172.20.0.1", "port": 8765, "token": "..."},
+               "htpc": {"info_file": "/mnt/htpc/Users/me/.claude_agent_info"}}}
+or a plain list of .claude_agent_info paths.
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
+
+from windows_control import WindowsControl
+
+DEFAULT_INVENTORY = Path.home() / ".config" / "sekizos" / "fleet.json"
+DEFAULT_HOST_TIMEOUT = 30.0
+
+def _read_info(path: str) -> Dict:
+    with open(os.path.expanduser(path)) as f:
+        return json.load(f)
+
+def load_inventory(path: Optional[str] = None) -> Dict[str, Dict]:
+    """Agent info per host name from an inventory file ($WIN_FLEET or DEFAULT_INVENTORY)"""
+    path = path or os.environ.get('WIN_FLEET') or DEFAULT_INVENTORY
+    with open(os.path.expanduser(str(path))) as f:
+        inventory = json.load(f)
+
+    if isinstance(inventory, list):
+        # Bare list of agent info files, named after their host:port
+        agents = {}
+        for info_path in inventory:
+            info = _read_info(info_path)
+            agents[f"{info['host']}:{info['port']}"] = info
+        return agents
+
+    agents = {}
+    for name, entry in inventory.get('hosts', {}).items():
+        agents[name] = _read_info(entry['info_file']) if 'info_file' in entry else entry
+    return agents
+
+def host_failed(result: Dict[str, Any]) -> bool:
+    """True for a host that raised, timed out or got success: false back"""
+    if not result['ok']:
+        return True
+    value = result['result']
+    return isinstance(value, dict) and value.get('success') is False
+
+class WindowsFleet:
+    """Run WindowsControl calls on many agents at once
+
+    Every fan-out returns {host: {'ok', 'result' or 'error', 'elapsed_ms'}}.
+    A host that doesn't answer within the timeout is reported as failed;
+    its requests are cut off at the same deadline, so a dead host can't
+    keep fan-out threads busy into the next call. The other hosts' results
+    are kept.
+    """
+
+    def __init__(self, agents: Optional[Dict[str, Dict]] = None, inventory: Optional[str] = None,
+                 timeout: float = DEFAULT_HOST_TIMEOUT, max_workers: Optional[int] = None,
+                 **client_options):
+        """
+        Args:
+            agents: Agent info (host, port, token) per host name
+            inventory: Inventory file to load when agents is not given
+            timeout: Default per-host deadline for one fan-out, in seconds
+            max_workers: Threads for fan-out (default: two per host)
+            **client_options: Passed to every WindowsControl (pool_size, timeouts, retries, ...)
+        """
+        agents = agents if agents is not None else load_inventory(inventory)
+        if not agents:
+            raise ValueError("Fleet has no hosts")
+        self.timeout = timeout
+        self.clients: Dict[str, WindowsControl] = {
+            name: WindowsControl(agent_info=info, **client_options) for name, info in agents.items()
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or 2 * len(self.clients),
+                                            thread_name_prefix='fleet')
+
+    @classmethod
+    def from_info_files(cls, paths: List[str], **options) -> 'WindowsFleet':
+        """Fleet from .claude_agent_info files, hosts named host:port"""
+        agents = {}
+        for path in paths:
+            info = _read_info(path)
+            agents[f"{info['host']}:{info['port']}"] = info
+        return cls(agents=agents, **options)
+
+    @property
+    def hosts(self) -> List[str]:
+        return list(self.clients)
+
+    def close(self):
+        """Close every host's pooled connections"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for client in self.clients.values():
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _select(self, hosts: Optional[List[str]]) -> List[str]:
+        if hosts is None:
+            return self.hosts
+        unknown = [h for h in hosts if h not in self.clients]
+        if unknown:
+            raise ValueError(f"Unknown hosts: {', '.join(unknown)}")
+        return list(hosts)
+
+    def run(self, fn: Callable[[WindowsControl], Any], hosts: Optional[List[str]] = None,
+            timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Call fn(client) for every selected host concurrently"""
+        return self._fan_out(lambda name: fn(self.clients[name]), hosts, timeout)
+
+    def _fan_out(self, fn: Callable[[str], Any], hosts: Optional[List[str]],
+                 timeout: Optional[float]) -> Dict[str, Dict[str, Any]]:
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        finished: Dict[str, float] = {}
+
+        def call(name: str):
+            try:
+                # Give up on the host's requests when the fan-out stops waiting for it
+                with self.clients[name].deadline(timeout - (time.perf_counter() - start)):
+                    return fn(name)
+            finally:
+                finished[name] = time.perf_counter()
+
+        futures = {name: self._executor.submit(call, name) for name in self._select(hosts)}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                results[name] = {'ok': False, 'error': f'Timed out after {timeout}s',
+                                 'elapsed_ms': round(timeout * 1000, 1)}
+                continue
+            elapsed_ms = round((finished.get(name, time.perf_counter()) - start) * 1000, 1)
+            error = future.exception()
+            if error is not None:
+                results[name] = {'ok': False, 'error': f'{type(error).__name__}: {error}', 'elapsed_ms': elapsed_ms}
+            else:
+                results[name] = {'ok': True, 'result': future.result(), 'elapsed_ms': elapsed_ms}
+        return results
+
+    def call(self, method: str, *args, hosts: Optional[List[str]] = None, timeout: Optional[float] = None,
+             **kwargs) -> Dict[str, Dict[str, Any]]:
+        """Call one WindowsControl method with the same arguments on every selected host"""
+        return self.run(lambda client: getattr(client, method)(*args, **kwargs), hosts, timeout)
+
+    def health(self, hosts: Optional[List[str]] = None, timeout: float = 5.0) -> Dict[str, Dict[str, Any]]:
+        return self.call('health', hosts=hosts, timeout=timeout)
+
+    def screenshot_all(self, directory: str, hosts: Optional[List[str]] = None,
+                       timeout: Optional[float] = None, **options) -> Dict[str, Dict[str, Any]]:
+        """Save <directory>/<host>.<format> for every selected host
+
+        options are screenshot_raw's (target_width, format, quality, ...)
+        """
+        Path(directory).mkdir(parents=True, exist_ok=True)
+
+        def grab(name: str):
+            image, info = self.clients[name].screenshot_raw(**options)
+            if not image:
+                raise RuntimeError("Screenshot failed")
+            path = Path(directory) / f"{name.replace(':', '_')}.{info.get('format', 'png')}"
+            path.write_bytes(image)
+            return str(path)
+
+        return self._fan_out(grab, hosts, timeout)
+
+    def powershell(self, command: str, hosts: Optional[List[str]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Run a PowerShell command everywhere; results are the agents' replies"""
+        return self.call('powershell_result', command, hosts=hosts, timeout=timeout)
+
+    def launch_app(self, app_name: str, page: Optional[str] = None, hosts: Optional[List[str]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Launch an app from allowed_apps.json on every selected host"""
+        from app_launcher import AppLauncher
+        apps_config = AppLauncher.load_config()
+        if app_name.split(':', 1)[0] not in apps_config:
+            raise ValueError(f"'{app_name}' not found in allowed apps")
+
+        def launch(client: WindowsControl):
+            if not AppLauncher(client, apps_config).launch(app_name, page):
+                raise RuntimeError(f"Could not launch {app_name}")
+            return True
+
+        return self.run(launch, hosts, timeout)
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    """One line per host: status, time and a short result"""
+    for name, result in results.items():
+        status = 'FAIL' if host_failed(result) else 'ok'
+        detail = result.get('error') if not result['ok'] else result['result']
+        if isinstance(detail, dict):
+            detail = detail.get('error') if detail.get('success') is False else detail.get('stdout', detail)
+        detail = str(detail).strip().replace('\n', ' ')
+        print(f"{name:24} {status:4} {result['elapsed_ms']:8.1f}ms  {detail[:80]}")
+    failed = sum(host_failed(r) for r in results.values())
+    print(f"{len(results) - failed}/{len(results)} hosts succeeded")
+
+def main():
+    """CLI: windows_fleet.py [-i inventory] [--hosts a,b] <health|screenshot DIR|ps CMD|launch APP>"""
+    import argparse
+    parser = argparse.ArgumentParser(description='Run win commands on several Windows hosts')
+    parser.add_argument('-i', '--inventory', help=f'Inventory file (default: $WIN_FLEET or {DEFAULT_INVENTORY})')
+    parser.add_argument('--hosts', help='Comma-separated subset of hosts')
+    parser.add_argument('-t', '--timeout', type=float, default=DEFAULT_HOST_TIMEOUT, help='Per-host timeout in seconds')
+    parser.add_argument('command', choices=['health', 'screenshot', 'ps', 'launch'])
+    parser.add_argument('args', nargs='*')
+    args = parser.parse_args()
+
+    hosts = args.hosts.split(',') if args.hosts else None
+    try:
+        fleet = WindowsFleet(inventory=args.inventory, timeout=args.timeout)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading fleet inventory: {e}")
+        sys.exit(2)
+
+    with fleet:
+        try:
+            if args.command == 'health':
+                results = fleet.health(hosts)
+            elif args.command == 'screenshot':
+                results = fleet.screenshot_all(args.args[0] if args.args else 'fleet_screenshots', hosts)
+            elif args.command == 'ps':
+                results = fleet.powershell(' '.join(args.args), hosts)
+            else:
+                if not args.args:
+                    parser.error("launch needs an app name")
+                results = fleet.launch_app(args.args[0], hosts=hosts)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(2)
+        print_results(results)
+    sys.exit(1 if any(host_failed(r) for r in results.values()) else 0)
+
+if __name__ == "__main__":
+    main()